@@ -136,6 +136,13 @@ class Application:
             except Exception as error:
                 logger.warn(f'关闭数据库连接时出错: {error}')
             
+            # 落盘Token审计日志
+            try:
+                from core.token_manager import get_token_manager
+                get_token_manager().close()
+            except Exception as error:
+                logger.warn(f'关闭Token审计日志时出错: {error}')
+            
             # 关闭日志系统
             await logger.close()
             
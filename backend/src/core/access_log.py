@@ -0,0 +1,103 @@
+"""
+HMML Access Log
+访问日志 - 按路由采样并输出结构化字段的请求日志
+"""
+
+import random
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .config import AccessLogConfig
+from .logger import logger
+
+
+class AccessLogSampler:
+    """访问日志采样器
+
+    决策顺序:
+        1. 错误请求 (>=400) 与慢请求总是记录
+        2. 排除路径 (健康检查/静态资源等) 不记录
+        3. 按路由模板精确匹配 -> 路径最长前缀匹配 -> 默认采样率
+    """
+
+    def __init__(self, config: AccessLogConfig):
+        self.config = config
+        self.enabled = config.enabled
+        self._exclude_prefixes = tuple(p.rstrip('/') or '/' for p in config.exclude_paths)
+        self._route_rates = dict(config.route_sample_rates)
+        # 前缀按长度倒序，保证最长前缀优先命中
+        self._prefix_rates = sorted(
+            self._route_rates.items(), key=lambda item: len(item[0]), reverse=True
+        )
+
+    def is_excluded(self, path: str) -> bool:
+        """检查路径是否在排除列表中"""
+        for prefix in self._exclude_prefixes:
+            if path == prefix or path.startswith(prefix + '/'):
+                return True
+        return False
+
+    def get_sample_rate(self, path: str, route: Optional[str]) -> float:
+        """获取路由对应的采样率"""
+        if route is not None and route in self._route_rates:
+            return self._route_rates[route]
+        for prefix, rate in self._prefix_rates:
+            if path.startswith(prefix):
+                return rate
+        return self.config.sample_rate
+
+    def should_log(self, path: str, route: Optional[str], status: int, duration_ms: float) -> bool:
+        """判断本次请求是否需要记录"""
+        if status >= 400 and self.config.always_log_errors:
+            return True
+        if duration_ms >= self.config.slow_threshold_ms:
+            return True
+        if self.is_excluded(path):
+            return False
+
+        rate = self.get_sample_rate(path, route)
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        return random.random() < rate
+
+
+def get_route_template(request: Request) -> Optional[str]:
+    """获取请求命中的路由模板（如 /api/pluginMarket/get/{plugin_id}）"""
+    # 新版 FastAPI 的 include_router 不再展开前缀，完整模板记录在 effective_route_context 中
+    effective = (request.scope.get('fastapi') or {}).get('effective_route_context')
+    if effective is not None and getattr(effective, 'path', None):
+        return effective.path
+    route = request.scope.get('route')
+    return getattr(route, 'path', None)
+
+
+def log_access(request: Request, response: Optional[Response], status: int, duration_ms: float) -> None:
+    """输出一条结构化访问日志"""
+    route = get_route_template(request)
+    content_length = response.headers.get('content-length') if response is not None else None
+    fields = {
+        'method': request.method,
+        'path': request.url.path,
+        'route': route or request.url.path,
+        'status': status,
+        'duration_ms': round(duration_ms, 2),
+        'bytes': int(content_length) if content_length and content_length.isdigit() else None,
+        'client': request.client.host if request.client else None,
+    }
+
+    if status >= 500:
+        log = logger.error
+    elif status >= 400:
+        log = logger.warning
+    else:
+        log = logger.info
+
+    log(
+        '%s %s - %d - %.1fms',
+        fields['method'], fields['route'], status, duration_ms,
+        extra={'access': fields}
+    )
@@ -0,0 +1,120 @@
+"""
+HMML Authentication
+认证依赖 - 校验 verifyToken 成功后签发的会话凭据
+"""
+
+import math
+import time
+from typing import Optional
+
+from fastapi import HTTPException, WebSocketException, status
+from starlette.requests import HTTPConnection
+
+from .config import SecurityConfig, config_manager
+from .rate_limiter import TokenBucketLimiter
+from .token_manager import get_token_manager
+
+SESSION_COOKIE_NAME = "hmml_session"
+SESSION_HEADER_NAME = "x-hmml-session"
+SESSION_QUERY_NAME = "session"  # 仅供 WebSocket / EventSource 等无法自定义请求头的客户端使用
+
+# 会话校验失败限流（首次使用时按配置创建）
+_session_failure_limiter: Optional[TokenBucketLimiter] = None
+
+
+def _allows_query_session(conn: HTTPConnection) -> bool:
+    """是否接受查询参数中的会话凭据（仅 WebSocket 与 SSE 请求）"""
+    if conn.scope.get("type") == "websocket":
+        return True
+    return "text/event-stream" in conn.headers.get("accept", "")
+
+
+def extract_session(conn: HTTPConnection) -> Optional[str]:
+    """从请求中提取会话凭据（Authorization Bearer / 自定义头 / Cookie / WebSocket 与 SSE 的查询参数）"""
+    authorization = conn.headers.get("authorization")
+    if authorization and authorization[:7].lower() == "bearer ":
+        return authorization[7:].strip()
+
+    header_value = conn.headers.get(SESSION_HEADER_NAME)
+    if header_value:
+        return header_value.strip()
+
+    cookie_value = conn.cookies.get(SESSION_COOKIE_NAME)
+    if cookie_value:
+        return cookie_value
+
+    if _allows_query_session(conn):
+        return conn.query_params.get(SESSION_QUERY_NAME)
+    return None
+
+
+def get_client_host(conn: HTTPConnection) -> str:
+    """
+    获取客户端地址
+
+    反向代理模式下从 X-Forwarded-For 右侧数第 trusted_proxy_hops 个地址：
+    左侧的地址由客户端自行填写，不可信；右侧的地址由受信任的代理逐层追加。
+    """
+    try:
+        server = config_manager.get().server
+        reverse_proxy_mode, trusted_hops = server.reverse_proxy_mode, server.trusted_proxy_hops
+    except RuntimeError:
+        reverse_proxy_mode, trusted_hops = False, 1
+    if reverse_proxy_mode and trusted_hops > 0:
+        forwarded_for = conn.headers.get("x-forwarded-for")
+        if forwarded_for:
+            hops = [address.strip() for address in forwarded_for.split(",") if address.strip()]
+            if hops:
+                return hops[-min(trusted_hops, len(hops))]
+    return conn.client.host if conn.client else "unknown"
+
+
+def _get_session_failure_limiter() -> TokenBucketLimiter:
+    global _session_failure_limiter
+    if _session_failure_limiter is None:
+        try:
+            security = config_manager.get().security
+        except RuntimeError:
+            security = SecurityConfig()
+        _session_failure_limiter = TokenBucketLimiter(
+            rate=security.session_failure_rate_per_minute / 60,
+            capacity=security.session_failure_burst
+        )
+    return _session_failure_limiter
+
+
+async def require_session(conn: HTTPConnection) -> None:
+    """路由依赖: 要求请求携带有效会话凭据; 同一客户端连续校验失败过多时返回 429"""
+    tm = get_token_manager()
+    session = extract_session(conn)
+    if session and tm.validate_session(session):
+        return
+
+    client = get_client_host(conn)
+    tm.record_session_failure(client)
+    allowed, retry_after = _get_session_failure_limiter().try_acquire(client)
+    is_websocket = conn.scope.get("type") == "websocket"
+
+    if not allowed:
+        if is_websocket:
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="认证失败次数过多，请稍后再试")
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "status": 429,
+                "message": "认证失败次数过多，请稍后再试",
+                "time": int(time.time() * 1000)
+            },
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+    if is_websocket:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="未认证或会话已过期")
+    raise HTTPException(
+        status_code=401,
+        detail={
+            "status": 401,
+            "message": "未认证或会话已过期，请重新验证Token",
+            "time": int(time.time() * 1000)
+        }
+    )
@@ -8,12 +8,24 @@ from pathlib import Path
 from typing import Optional
 from pydantic import BaseModel, Field
 
+from utils.atomic_file import atomic_write_text
+
 
 class ServerConfig(BaseModel):
     port: int = 7999
     host: str = "0.0.0.0"
     prefix: str = ""
     reverse_proxy_mode: bool = False
+    trusted_proxy_hops: int = 1  # 反向代理模式下受信任的代理层数（从 X-Forwarded-For 右侧数起）
+
+
+class AccessLogConfig(BaseModel):
+    enabled: bool = True
+    sample_rate: float = 1.0  # 默认采样率 0.0-1.0
+    route_sample_rates: dict[str, float] = Field(default_factory=dict)  # 路由模板或路径前缀 -> 采样率
+    slow_threshold_ms: int = 1000  # 超过该耗时的请求总是记录
+    always_log_errors: bool = True  # 状态码 >= 400 的请求总是记录
+    exclude_paths: list[str] = ["/api/health", "/metrics", "/static", "/favicon.ico"]
 
 
 class LoggerConfig(BaseModel):
@@ -22,6 +34,7 @@ class LoggerConfig(BaseModel):
     enable_file: bool = True
     max_file_size: int = 10
     max_files: int = 5
+    access_log: AccessLogConfig = Field(default_factory=AccessLogConfig)
 
 
 class SecurityConfig(BaseModel):
@@ -29,6 +42,31 @@ class SecurityConfig(BaseModel):
     cors_enabled: bool = True
     cors_origins: list[str] = ["*"]
     max_request_size: str = "10mb"
+    auth_enabled: bool = True  # 是否要求 /api 路由携带会话凭据
+    session_ttl: int = 86400  # 会话有效期（秒）
+    verify_rate_per_minute: int = 10  # 每个客户端每分钟允许的 Token 验证次数
+    verify_burst: int = 5  # 每个客户端允许的突发验证次数
+    verify_max_concurrency: int = 2  # 全局同时进行的 Argon2 验证上限
+    session_failure_rate_per_minute: int = 60  # 每个客户端每分钟允许的会话校验失败次数，超出后返回 429
+    session_failure_burst: int = 30  # 每个客户端允许的突发会话校验失败次数
+
+
+class HttpClientConfig(BaseModel):
+    http2: bool = True  # 安装了 h2 时启用 HTTP/2
+    max_connections: int = 100  # 连接池总连接数上限
+    max_keepalive_connections: int = 20  # 保持的空闲长连接数量
+    keepalive_expiry: float = 30.0  # 空闲长连接保留时间（秒）
+    max_connections_per_host: int = 10  # 单个主机的并发请求上限
+    connect_timeout: float = 10.0  # 建立连接超时（秒）
+    read_timeout: float = 30.0  # 读取超时（秒）
+    retries: int = 2  # 幂等请求在网络错误或 429/5xx 时的重试次数
+    retry_backoff: float = 0.5  # 重试退避基数（秒），按指数增长并加入随机抖动
+    retry_max_backoff: float = 8.0  # 单次重试等待上限（秒）
+
+
+class PluginJobConfig(BaseModel):
+    max_workers: int = 2  # 同时执行的插件安装/更新任务数
+    max_history: int = 100  # 保留的已结束任务数量
 
 
 class AppConfig(BaseModel):
@@ -42,6 +80,8 @@ class Config(BaseModel):
     server: ServerConfig = Field(default_factory=ServerConfig)
     logger: LoggerConfig = Field(default_factory=LoggerConfig)
     security: SecurityConfig = Field(default_factory=SecurityConfig)
+    http_client: HttpClientConfig = Field(default_factory=HttpClientConfig)
+    plugin_jobs: PluginJobConfig = Field(default_factory=PluginJobConfig)
     app: AppConfig = Field(default_factory=AppConfig)
 
 
@@ -79,8 +119,7 @@ class ConfigManager:
         # 确保配置目录存在
         self.config_dir.mkdir(parents=True, exist_ok=True)
         
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(self._config.model_dump(), f, indent=2, ensure_ascii=False)
+        atomic_write_text(self.config_file, json.dumps(self._config.model_dump(), indent=2, ensure_ascii=False))
     
     def get(self) -> Config:
         """获取当前配置"""
@@ -0,0 +1,231 @@
+"""
+HMML Config Watcher
+配置文件监听 - 轮询 MaiBot 主程序与适配器的配置文件，
+检测到外部修改后经防抖推送变更事件（变更的文件与配置键）给订阅者
+"""
+
+import asyncio
+import glob
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .logger import logger
+from .path_cache_manager import path_cache_manager
+from utils.config_cache import config_file_cache
+from utils.config_history import structural_diff
+
+# 轮询间隔（秒）：只做 stat，开销很小
+POLL_INTERVAL = 1.0
+# 防抖时间（秒）：文件在该时间内不再变化才推送，合并编辑器的多次写入
+DEBOUNCE_SECONDS = 0.5
+# 单个事件最多携带的变更键数量
+MAX_EVENT_CHANGES = 50
+# 每个订阅者的事件队列长度，满时丢弃最旧的事件
+SUBSCRIBER_QUEUE_SIZE = 100
+
+FileSignature = Tuple[int, int]
+
+
+class WatchTarget:
+    """被监听的配置文件"""
+
+    def __init__(self, path: str, scope: str, name: str):
+        self.path = path
+        self.scope = scope  # main / adapter
+        self.name = name    # 文件名或适配器名称
+
+
+def _collect_targets() -> Dict[str, WatchTarget]:
+    """根据路径缓存收集需要监听的配置文件"""
+    targets: Dict[str, WatchTarget] = {}
+
+    main_root = path_cache_manager.get_main_root()
+    if main_root:
+        for path in glob.glob(os.path.join(main_root, 'config', '*.toml')):
+            targets[path] = WatchTarget(path, 'main', os.path.basename(path))
+
+    for adapter in path_cache_manager.get_all_adapters():
+        path = os.path.join(adapter.root_path, 'config.toml')
+        targets[path] = WatchTarget(path, 'adapter', adapter.adapter_name)
+
+    return targets
+
+
+def _stat_targets(paths: List[str]) -> Dict[str, Optional[FileSignature]]:
+    """获取文件签名 (mtime_ns, size)，文件不存在时为 None"""
+    signatures: Dict[str, Optional[FileSignature]] = {}
+    for path in paths:
+        try:
+            stat_result = os.stat(path)
+            signatures[path] = (stat_result.st_mtime_ns, stat_result.st_size)
+        except OSError:
+            signatures[path] = None
+    return signatures
+
+
+def _load_data(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        return config_file_cache.load(path).data
+    except Exception:
+        return None
+
+
+class ConfigWatcher:
+    """
+    配置文件监听器
+
+    有订阅者时才启动轮询任务，最后一个订阅者断开后自动停止。
+    """
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL, debounce: float = DEBOUNCE_SECONDS):
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._signatures: Dict[str, Optional[FileSignature]] = {}
+        self._data: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._pending: Dict[str, float] = {}
+        self._targets: Dict[str, WatchTarget] = {}
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    # ---------------- 订阅 ----------------
+    def subscribe(self) -> asyncio.Queue:
+        """订阅配置变更事件"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info('配置文件监听已启动')
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """取消订阅"""
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            logger.info('配置文件监听已停止（无订阅者）')
+
+    async def stop(self) -> None:
+        """停止监听（应用关闭时调用）"""
+        self._subscribers.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    def _publish(self, event: Dict[str, Any]) -> None:
+        for queue in list(self._subscribers):
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(event)
+
+    # ---------------- 轮询 ----------------
+    async def _snapshot(self) -> None:
+        """记录当前所有文件的签名与内容，作为后续对比的基准"""
+        self._targets = _collect_targets()
+        paths = list(self._targets)
+        self._signatures = await asyncio.to_thread(_stat_targets, paths)
+        self._data = {}
+        for path in paths:
+            if self._signatures[path] is not None:
+                self._data[path] = await asyncio.to_thread(_load_data, path)
+        self._pending.clear()
+
+    async def _run(self) -> None:
+        try:
+            await self._snapshot()
+            while True:
+                await asyncio.sleep(self.poll_interval)
+                await self._poll()
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            logger.error(f'配置文件监听异常退出: {error}')
+
+    async def _poll(self) -> None:
+        # 路径缓存可能被修改（新增/删除适配器），每轮重新收集目标
+        targets = _collect_targets()
+        for path in set(self._signatures) - set(targets):
+            self._signatures.pop(path, None)
+            self._data.pop(path, None)
+            self._pending.pop(path, None)
+        self._targets = targets
+
+        signatures = await asyncio.to_thread(_stat_targets, list(targets))
+        now = time.monotonic()
+
+        for path, signature in signatures.items():
+            if path not in self._signatures:
+                # 新加入的监听目标只记录基准，不推送
+                self._signatures[path] = signature
+                if signature is not None:
+                    self._data[path] = await asyncio.to_thread(_load_data, path)
+                continue
+            if signature != self._signatures[path]:
+                self._signatures[path] = signature
+                self._pending[path] = now
+
+        for path, changed_at in list(self._pending.items()):
+            if now - changed_at < self.debounce:
+                continue
+            del self._pending[path]
+            await self._emit(path, signatures.get(path))
+
+    async def _emit(self, path: str, signature: Optional[FileSignature]) -> None:
+        target = self._targets.get(path)
+        if target is None:
+            return
+
+        previous = self._data.get(path)
+        event: Dict[str, Any] = {
+            'type': 'config_changed',
+            'scope': target.scope,
+            'name': target.name,
+            'path': path,
+            'time': int(time.time() * 1000)
+        }
+
+        if signature is None:
+            self._data.pop(path, None)
+            event['action'] = 'deleted'
+        else:
+            current = await asyncio.to_thread(_load_data, path)
+            self._data[path] = current
+            if current is None:
+                event['action'] = 'invalid'
+            elif previous is None:
+                event['action'] = 'created'
+            else:
+                changes = structural_diff(previous, current)
+                if not changes:
+                    # 只是被重新写入（如保存了相同内容），无需推送
+                    return
+                event['action'] = 'modified'
+                event['changeCount'] = len(changes)
+                event['changes'] = [
+                    {'op': change['op'], 'path': change['path']}
+                    for change in changes[:MAX_EVENT_CHANGES]
+                ]
+
+        logger.debug(f'配置文件变更: {path} ({event["action"]})')
+        self._publish(event)
+
+
+# 全局配置监听器实例
+config_watcher = ConfigWatcher()
+
+
+def get_config_watcher() -> ConfigWatcher:
+    """获取全局配置监听器"""
+    return config_watcher
@@ -0,0 +1,167 @@
+"""
+HMML HTTP Client
+共享异步HTTP客户端 - 应用级连接池（长连接、可选HTTP/2）、单主机并发限制、超时与带抖动的重试
+"""
+
+import asyncio
+import random
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from .config import HttpClientConfig
+from .logger import logger
+from .version import get_version
+
+# 可以安全重试的请求方法
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+# 需要重试的响应状态码
+RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+# 需要重试的网络异常
+RETRY_EXCEPTIONS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.ReadTimeout,
+    httpx.RemoteProtocolError,
+    httpx.PoolTimeout
+)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HttpClient:
+    """
+    共享异步HTTP客户端
+
+    所有出站请求复用同一个连接池；同一主机的并发请求数受限，
+    幂等请求遇到网络错误或 429/5xx 时按指数退避（带随机抖动）重试。
+    """
+
+    def __init__(self, config: Optional[HttpClientConfig] = None):
+        self.config = config or HttpClientConfig()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """底层 httpx 客户端（首次访问时创建）"""
+        if self._client is None or self._client.is_closed:
+            config = self.config
+            http2 = config.http2 and _http2_available()
+            self._client = httpx.AsyncClient(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=config.max_connections,
+                    max_keepalive_connections=config.max_keepalive_connections,
+                    keepalive_expiry=config.keepalive_expiry
+                ),
+                timeout=httpx.Timeout(config.read_timeout, connect=config.connect_timeout),
+                headers={'User-Agent': f'HMML/{get_version()}'},
+                follow_redirects=True
+            )
+            logger.debug(f'HTTP客户端已创建（HTTP/2: {"启用" if http2 else "未启用"}）')
+        return self._client
+
+    @property
+    def is_closed(self) -> bool:
+        return self._client is None or self._client.is_closed
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max(1, self.config.max_connections_per_host))
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """计算第 attempt 次重试前的等待时间（full jitter，优先遵循 Retry-After）"""
+        if response is not None:
+            retry_after = response.headers.get('retry-after')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.config.retry_max_backoff)
+        ceiling = min(self.config.retry_max_backoff, self.config.retry_backoff * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    async def request(self, method: str, url: str, *, retries: Optional[int] = None, **kwargs) -> httpx.Response:
+        """
+        发送请求
+
+        Args:
+            method: 请求方法
+            url: 请求地址
+            retries: 重试次数，为 None 时幂等请求使用配置值、其他请求不重试
+            **kwargs: 传给 httpx 的其他参数（headers、timeout 等）
+
+        Returns:
+            httpx.Response: 响应（不会因状态码抛出异常）
+        """
+        method = method.upper()
+        if retries is None:
+            retries = self.config.retries if method in IDEMPOTENT_METHODS else 0
+
+        semaphore = self._host_semaphore(url)
+        attempt = 0
+        while True:
+            try:
+                async with semaphore:
+                    response = await self.client.request(method, url, **kwargs)
+            except RETRY_EXCEPTIONS as error:
+                if attempt >= retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.debug(f'请求失败，{delay:.2f}s 后重试 ({attempt + 1}/{retries}): {method} {url} - {error}')
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                    return response
+                delay = self._backoff(attempt, response)
+                logger.debug(f'请求返回 {response.status_code}，{delay:.2f}s 后重试 ({attempt + 1}/{retries}): {method} {url}')
+                await response.aclose()
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """发送 GET 请求"""
+        return await self.request('GET', url, **kwargs)
+
+    async def close(self) -> None:
+        """关闭连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._host_semaphores.clear()
+
+
+# 全局HTTP客户端实例（在 FastAPI lifespan 中初始化）
+_http_client: Optional[HttpClient] = None
+
+
+def init_http_client(config: Optional[HttpClientConfig] = None) -> HttpClient:
+    """初始化全局HTTP客户端"""
+    global _http_client
+    _http_client = HttpClient(config)
+    return _http_client
+
+
+def get_http_client() -> HttpClient:
+    """获取全局HTTP客户端（未初始化时使用默认配置创建）"""
+    global _http_client
+    if _http_client is None:
+        _http_client = HttpClient()
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """关闭全局HTTP客户端"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.close()
+        _http_client = None
@@ -3,8 +3,8 @@ HMML HTTP Server
 HTTP服务器 - 基于FastAPI的Web服务器
 """
 
-import asyncio
-from fastapi import FastAPI, Request
+import time
+from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -17,6 +17,9 @@ from typing import Optional
 
 from .config import Config
 from .logger import logger
+from .access_log import AccessLogSampler, get_route_template, log_access
+from .auth import require_session
+from .http_client import init_http_client, close_http_client
 from .version import get_version, get_current_environment
 
 
@@ -36,8 +39,37 @@ class HttpServer:
             async def lifespan(app: FastAPI):
                 # 启动时执行
                 logger.info("FastAPI应用启动")
+                
+                # 创建共享HTTP客户端并注入需要出站请求的服务
+                from services.plugin_index_service import get_plugin_index_service
+                from routes.tool import tool_service
+                http_client = init_http_client(self.config.http_client)
+                plugin_index_service = get_plugin_index_service()
+                plugin_index_service.set_http_client(http_client)
+                tool_service.set_http_client(http_client)
+                
+                # 后台刷新插件广场索引
+                plugin_index_service.start_background_refresh()
+                
+                # 后台清理上次未删完的插件目录与中断的克隆临时目录（须在任务队列启动前）
+                from .path_cache_manager import path_cache_manager
+                from utils.trash import clean_stale_trash
+                main_root = path_cache_manager.get_main_root()
+                await clean_stale_trash([Path(main_root) / "plugins"] if main_root else [])
+                
+                # 启动插件安装任务队列（恢复未完成的任务）
+                from services.plugin_job_service import get_plugin_job_service
+                plugin_job_service = get_plugin_job_service()
+                plugin_job_service.configure(self.config.plugin_jobs)
+                await plugin_job_service.start()
+                
                 yield
                 # 关闭时执行
+                from .config_watcher import get_config_watcher
+                await get_config_watcher().stop()
+                await plugin_job_service.stop()
+                await plugin_index_service.stop_background_refresh()
+                await close_http_client()
                 logger.info("FastAPI应用关闭")
             
             self.app = FastAPI(
@@ -79,17 +111,30 @@ class HttpServer:
                 allowed_hosts=["*"]  # 在生产环境中应该限制具体的主机
             )
         
-        # 请求日志中间件
+        # 请求日志中间件（按路由采样，错误与慢请求总是记录）
+        access_sampler = AccessLogSampler(self.config.logger.access_log)
+        
         @self.app.middleware("http")
         async def log_requests(request: Request, call_next):
-            start_time = asyncio.get_event_loop().time()
-            response = await call_next(request)
-            process_time = asyncio.get_event_loop().time() - start_time
+            if not access_sampler.enabled:
+                return await call_next(request)
             
-            logger.info(
-                f"{request.method} {request.url.path} - "
-                f"{response.status_code} - {process_time:.4f}s"
-            )
+            start_time = time.perf_counter()
+            try:
+                response = await call_next(request)
+            except Exception:
+                duration_ms = (time.perf_counter() - start_time) * 1000
+                log_access(request, None, 500, duration_ms)
+                raise
+            duration_ms = (time.perf_counter() - start_time) * 1000
+            
+            if access_sampler.should_log(
+                request.url.path,
+                get_route_template(request),
+                response.status_code,
+                duration_ms
+            ):
+                log_access(request, response, response.status_code, duration_ms)
             return response
     
     def setup_error_handlers(self):
@@ -143,19 +188,24 @@ class HttpServer:
         from routes.person_info import router as person_info_router
         from routes.chat_stream import router as chat_stream_router
         from routes.system import router as system_router
+        from routes.system import public_router as system_public_router
         from routes.plugin_market import router as plugin_market_router
         from routes.tool import router as tool_router
         
+        # 认证依赖（除登录入口与健康检查外的所有 /api 路由）
+        auth = [Depends(require_session)] if self.config.security.auth_enabled else []
+        
         # 注册路由
-        self.app.include_router(path_cache_router, prefix="/api")
-        self.app.include_router(emoji_router, prefix="/api")
-        self.app.include_router(expression_router, prefix="/api")
-        self.app.include_router(config_router, prefix="/api")
-        self.app.include_router(person_info_router, prefix="/api")
-        self.app.include_router(chat_stream_router, prefix="/api")
-        self.app.include_router(system_router, prefix="/api")
-        self.app.include_router(plugin_market_router, prefix="/api")
-        self.app.include_router(tool_router, prefix="/api/tools")
+        self.app.include_router(system_public_router, prefix="/api")
+        self.app.include_router(path_cache_router, prefix="/api", dependencies=auth)
+        self.app.include_router(emoji_router, prefix="/api", dependencies=auth)
+        self.app.include_router(expression_router, prefix="/api", dependencies=auth)
+        self.app.include_router(config_router, prefix="/api", dependencies=auth)
+        self.app.include_router(person_info_router, prefix="/api", dependencies=auth)
+        self.app.include_router(chat_stream_router, prefix="/api", dependencies=auth)
+        self.app.include_router(system_router, prefix="/api", dependencies=auth)
+        self.app.include_router(plugin_market_router, prefix="/api", dependencies=auth)
+        self.app.include_router(tool_router, prefix="/api/tools", dependencies=auth)
         
         # 健康检查路由
         @self.app.get("/api/health")
@@ -186,7 +236,7 @@ class HttpServer:
             }
         
         # 服务信息路由
-        @self.app.get("/api/info")
+        @self.app.get("/api/info", dependencies=auth)
         async def service_info():
             import psutil
             import platform
@@ -0,0 +1,72 @@
+"""
+HMML Rate Limiter
+限流工具 - 按客户端的令牌桶限流与全局并发上限
+"""
+
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+
+class TokenBucketLimiter:
+    """按键（通常为客户端地址）划分的令牌桶限流器
+
+    每个键拥有容量为 capacity 的令牌桶，按 rate（个/秒）持续补充；
+    仅保留最近活跃的 max_keys 个桶，避免伪造地址耗尽内存。
+    """
+
+    def __init__(self, rate: float, capacity: int, max_keys: int = 4096):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated_at)
+
+    def try_acquire(self, key: str, cost: float = 1.0) -> Tuple[bool, float]:
+        """尝试消耗令牌
+
+        Returns:
+            (是否允许, 需要等待的秒数)
+        """
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (float(self.capacity), now))
+        tokens = min(float(self.capacity), tokens + (now - updated_at) * self.rate)
+
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        retry_after = 0.0 if allowed else (cost - tokens) / self.rate if self.rate > 0 else float('inf')
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        return allowed, retry_after
+
+    def reset(self, key: str) -> None:
+        """清除某个键的限流状态"""
+        self._buckets.pop(key, None)
+
+
+class ConcurrencyLimiter:
+    """非阻塞的全局并发上限（仅在事件循环线程中使用）"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._active = 0
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def try_acquire(self) -> bool:
+        """尝试占用一个并发槽位，已满时立即返回 False"""
+        if self._active >= self.limit:
+            return False
+        self._active += 1
+        return True
+
+    def release(self) -> None:
+        """释放槽位"""
+        if self._active > 0:
+            self._active -= 1
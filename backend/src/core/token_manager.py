@@ -7,6 +7,9 @@
 4. 提供一次性"再生+显示"方法, 旧 token 立即失效
 5. 失败/成功验证审计: 统计总尝试/成功/失败/最后一次时间与最近失败窗口
 6. 支持非交互模式，用于自动化部署和CI/CD环境
+7. Argon2 校验放入线程池执行; 校验成功的 token 以 HMAC 摘要形式短期缓存, 再生时立即失效
+8. 校验成功后签发会话凭据, 后续请求只做 HMAC + 字典查找 (微秒级), 无需再次 Argon2
+9. 审计日志先写入内存缓冲, 由后台线程按间隔/条数批量落盘, 并按大小轮转
 
 文件结构:
     config/token.token    -> JSON: {"hash":"<argon2 hash>", "created_at": <ts>, "updated_at": <ts>, "version": 1}
@@ -16,18 +19,31 @@
     - 不再读取旧版本格式; 若文件损坏将重新生成新 token 并提示
     - Argon2 参数可后续配置化
     - 非交互模式通过环境变量或命令行参数控制
+    - 已验证缓存仅保存 HMAC-SHA256(进程随机密钥, token) 摘要, 不保存明文
 """
 from __future__ import annotations
+import asyncio
+import hashlib
+import hmac
 import secrets
+import threading
+import atexit
 import json
 import time
 import re
 import os
 import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Dict, Any
 from argon2 import PasswordHasher, exceptions as argon_exc
 
+from core.rate_limiter import ConcurrencyLimiter
+
+from core.rate_limiter import ConcurrencyLimiter
+from utils.atomic_file import atomic_write_text
+
 TOKEN_FILE_PATH = Path('config') / 'token.token'
 AUDIT_LOG_PATH = Path('logs') / 'hmml-token-audit.log'
 
@@ -42,6 +58,25 @@ _ARGON_SALT_LEN = 16
 
 _DEFAULT_TOKEN_LENGTH = 64  # 比原32增加熵
 
+# 已验证 token 缓存 (命中后跳过 Argon2)
+_VERIFIED_CACHE_TTL = 300  # 秒
+_VERIFIED_CACHE_MAX_ENTRIES = 256
+
+# 会话凭据
+_SESSION_MAX_ENTRIES = 1024
+_SESSION_FAIL_AUDIT_INTERVAL = 60  # 秒, 会话校验失败审计的最小写入间隔
+
+# 审计日志缓冲与轮转
+_AUDIT_FLUSH_INTERVAL = 2.0  # 秒
+_AUDIT_FLUSH_SIZE = 200  # 缓冲条数达到该值时立即触发落盘
+_AUDIT_MAX_BYTES = 5 * 1024 * 1024
+_AUDIT_BACKUP_COUNT = 3
+
+_RECENT_FAILURE_WINDOW_MS = 3600_000  # 最近失败统计窗口: 1小时
+
+# Argon2 校验线程池 (每次校验占用 64MB, 限制并发线程数)
+_verify_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='hmml-argon2')
+
 _ph = PasswordHasher(
     time_cost=_ARGON_TIME_COST,
     memory_cost=_ARGON_MEMORY_COST,
@@ -50,6 +85,82 @@ _ph = PasswordHasher(
     salt_len=_ARGON_SALT_LEN
 )
 
+class VerifyBusyError(RuntimeError):
+    """需要执行 Argon2 校验但并发槽位已满"""
+
+
+class VerifyBusyError(RuntimeError):
+    """需要执行 Argon2 校验但并发槽位已满"""
+
+
+class _AuditWriter:
+    """缓冲审计日志写入器: 调用方只追加内存缓冲, 后台线程批量写入并按大小轮转"""
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._buffer: list[str] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._size: Optional[int] = None  # 当前文件大小, 首次落盘时读取
+
+    def write(self, event: str, detail: str):
+        line = f"{int(time.time()*1000)}\t{event}\t{detail}\n"
+        with self._lock:
+            if self._closed:
+                return
+            self._buffer.append(line)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='hmml-token-audit', daemon=True)
+                self._thread.start()
+            if len(self._buffer) >= _AUDIT_FLUSH_SIZE:
+                self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(_AUDIT_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            self.flush()
+            if self._closed:
+                return
+
+    def flush(self):
+        with self._lock:
+            if not self._buffer:
+                return
+            lines, self._buffer = self._buffer, []
+        try:
+            data = ''.join(lines).encode('utf-8')
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            if self._size is None:
+                self._size = self._path.stat().st_size if self._path.exists() else 0
+            if self._size and self._size + len(data) > _AUDIT_MAX_BYTES:
+                self._rotate()
+            with self._path.open('ab') as f:
+                f.write(data)
+            self._size += len(data)
+        except Exception:
+            pass
+
+    def _rotate(self):
+        for i in range(_AUDIT_BACKUP_COUNT - 1, 0, -1):
+            src = self._path.with_name(f'{self._path.name}.{i}')
+            if src.exists():
+                os.replace(src, self._path.with_name(f'{self._path.name}.{i + 1}'))
+        os.replace(self._path, self._path.with_name(f'{self._path.name}.1'))
+        self._size = 0
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        self._wakeup.set()
+        if thread is not None:
+            thread.join(timeout=5)
+        self.flush()
+
+
 class TokenManager:
     def __init__(self):
         self._hash: Optional[str] = None  # 仅保存哈希
@@ -60,8 +171,23 @@ class TokenManager:
             'success': 0,
             'failed': 0,
             'last_attempt_ts': None,
-            'recent_failures': []  # timestamps
+            'recent_failures': deque(),  # timestamps (升序)
+            'session_failed': 0,
+            'throttled': 0,  # 被限流拒绝的验证请求
+            'session_failed_unlogged': 0,  # 尚未写入审计日志的会话失败次数
+            'last_session_fail_audit': 0.0
         }
+        # 已验证 token 缓存: HMAC 摘要 -> 过期时间 (monotonic)
+        self._cache_key = secrets.token_bytes(32)
+        self._verified_cache: Dict[str, float] = {}
+        # 会话: HMAC 摘要 -> 过期时间 (monotonic)
+        self._sessions: Dict[str, float] = {}
+        # 再生代数: 每次清空缓存时递增, 校验期间发生再生的结果不写入缓存
+        self._generation = 0
+        self._cache_lock = threading.Lock()
+        # 审计计数在 Argon2 线程与事件循环中都会修改
+        self._audit_lock = threading.Lock()
+        self._audit_writer = _AuditWriter(AUDIT_LOG_PATH)
         # 检测非交互模式
         self._non_interactive = self._detect_non_interactive_mode()
 
@@ -97,13 +223,55 @@ class TokenManager:
         alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'
         return ''.join(secrets.choice(alphabet) for _ in range(length))
 
+    def _token_digest(self, token: str) -> str:
+        return hmac.new(self._cache_key, token.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def _cache_lookup(self, token: str) -> bool:
+        digest = self._token_digest(token)
+        now = time.monotonic()
+        with self._cache_lock:
+            expires_at = self._verified_cache.get(digest)
+            if expires_at is None:
+                return False
+            if expires_at <= now:
+                self._verified_cache.pop(digest, None)
+                return False
+            return True
+
+    def _cache_store(self, token: str, generation: int) -> bool:
+        """写入已验证缓存; 校验开始后 token 已再生 (代数变化) 时不写入并返回 False"""
+        digest = self._token_digest(token)
+        now = time.monotonic()
+        with self._cache_lock:
+            if generation != self._generation:
+                return False
+            if len(self._verified_cache) >= _VERIFIED_CACHE_MAX_ENTRIES:
+                # 先清理过期项, 仍然满则淘汰最早过期的一项
+                for key in [k for k, exp in self._verified_cache.items() if exp <= now]:
+                    del self._verified_cache[key]
+                if len(self._verified_cache) >= _VERIFIED_CACHE_MAX_ENTRIES:
+                    oldest = min(self._verified_cache, key=self._verified_cache.get)
+                    del self._verified_cache[oldest]
+            self._verified_cache[digest] = now + _VERIFIED_CACHE_TTL
+            return True
+
+    def _invalidate_cache(self, new_hash: Optional[str] = None):
+        """清空已验证缓存并吊销全部会话 (传入 new_hash 时同时原子地替换哈希)"""
+        with self._cache_lock:
+            if new_hash is not None:
+                self._hash = new_hash
+            self._generation += 1
+            self._verified_cache.clear()
+            self._sessions.clear()
+
     def _write_audit(self, event: str, detail: str):
-        try:
-            AUDIT_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-            with AUDIT_LOG_PATH.open('a', encoding='utf-8') as f:
-                f.write(f"{int(time.time()*1000)}\t{event}\t{detail}\n")
-        except Exception:
-            pass
+        self._audit_writer.write(event, detail)
+
+    def _prune_recent_failures(self, now_ms: int):
+        """清理窗口外的失败记录 (调用方需持有 _audit_lock)"""
+        failures = self._audit_cache['recent_failures']
+        while failures and now_ms - failures[0] >= _RECENT_FAILURE_WINDOW_MS:
+            failures.popleft()
 
     def _load_file(self):
         try:
@@ -125,13 +293,13 @@ class TokenManager:
             'updated_at': self._meta.get('updated_at'),
             'version': 1
         }
-        TOKEN_FILE_PATH.write_text(json.dumps(payload, ensure_ascii=False, separators=(',', ':')), encoding='utf-8')
+        atomic_write_text(TOKEN_FILE_PATH, json.dumps(payload, ensure_ascii=False, separators=(',', ':')))
 
     def _create_new(self, first: bool = False, note: str = '') -> str:
         plain = self._generate_token()
         hashed = _ph.hash(plain)
         now = int(time.time()*1000)
-        self._hash = hashed
+        self._invalidate_cache(hashed)  # 旧 token 的缓存与会话立即失效
         self._meta = {
             'hash': hashed,
             'created_at': now if first else self._meta.get('created_at', now),
@@ -203,31 +371,140 @@ class TokenManager:
                 break
 
     # ---------------- 功能接口 ----------------
+    def _record_attempt(self) -> int:
+        ts = int(time.time()*1000)
+        with self._audit_lock:
+            self._audit_cache['total_attempts'] += 1
+            self._audit_cache['last_attempt_ts'] = ts
+        return ts
+
+    def _record_cache_hit(self) -> None:
+        with self._audit_lock:
+            self._audit_cache['success'] += 1
+
     def verify_token(self, user_token: str) -> bool:
         if not self._initialized:
             self.initialize()
-        self._audit_cache['total_attempts'] += 1
-        self._audit_cache['last_attempt_ts'] = int(time.time()*1000)
+        ts = self._record_attempt()
+        if self._cache_lookup(user_token):
+            self._record_cache_hit()
+            return True
+        return self._verify_hashed(user_token, ts)
+
+    def _verify_hashed(self, user_token: str, ts: int) -> bool:
+        """执行 Argon2 校验 (阻塞操作, 不查询已验证缓存)"""
+        # 记录校验所针对的哈希与代数, 校验期间若发生再生则结果作废
+        with self._cache_lock:
+            hashed, generation = self._hash, self._generation
         try:
-            _ph.verify(self._hash, user_token)
-            self._audit_cache['success'] += 1
-            # 清理过期失败记录
-            self._audit_cache['recent_failures'] = [ts for ts in self._audit_cache['recent_failures'] if self._audit_cache['last_attempt_ts'] - ts < 3600_000]
+            _ph.verify(hashed, user_token)
+            if not self._cache_store(user_token, generation):
+                with self._audit_lock:
+                    self._audit_cache['failed'] += 1
+                self._write_audit('VERIFY_FAIL', 'regenerated_during_verify')
+                return False
+            with self._audit_lock:
+                self._audit_cache['success'] += 1
+                # 清理过期失败记录
+                self._prune_recent_failures(ts)
             self._write_audit('VERIFY_OK', 'success')
             return True
         except argon_exc.VerifyMismatchError:
-            self._audit_cache['failed'] += 1
-            ts = self._audit_cache['last_attempt_ts']
-            self._audit_cache['recent_failures'].append(ts)
-            # 只保留最近1小时
-            self._audit_cache['recent_failures'] = [t for t in self._audit_cache['recent_failures'] if ts - t < 3600_000]
+            with self._audit_lock:
+                self._audit_cache['failed'] += 1
+                self._audit_cache['recent_failures'].append(ts)
+                # 只保留最近1小时
+                self._prune_recent_failures(ts)
             self._write_audit('VERIFY_FAIL', 'mismatch')
             return False
         except Exception as e:
-            self._audit_cache['failed'] += 1
+            with self._audit_lock:
+                self._audit_cache['failed'] += 1
             self._write_audit('VERIFY_ERROR', repr(e))
             return False
 
+    async def verify_token_async(self, user_token: str, guard: Optional[ConcurrencyLimiter] = None) -> bool:
+        """
+        异步校验: 缓存命中直接返回, 否则在线程池中执行 Argon2, 不阻塞事件循环
+
+        Args:
+            user_token: 客户端提交的 token
+            guard: 可选的并发上限, 仅在需要执行 Argon2 时占用槽位 (与是否执行 Argon2 是同一次判断)
+
+        Raises:
+            VerifyBusyError: 需要执行 Argon2 但 guard 槽位已满
+        """
+        if not self._initialized:
+            self.initialize()
+        cache_hit = self._cache_lookup(user_token)
+        needs_slot = not cache_hit and guard is not None
+        if needs_slot and not guard.try_acquire():
+            raise VerifyBusyError('Token验证并发已满')
+        try:
+            ts = self._record_attempt()
+            if cache_hit:
+                self._record_cache_hit()
+                return True
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_verify_executor, self._verify_hashed, user_token, ts)
+        finally:
+            if needs_slot:
+                guard.release()
+
+    # ---------------- 会话 ----------------
+    def issue_session(self, ttl: int) -> str:
+        """签发会话凭据 (仅在 token 校验成功后调用), 只保存其 HMAC 摘要"""
+        session = secrets.token_urlsafe(32)
+        digest = self._token_digest(session)
+        now = time.monotonic()
+        with self._cache_lock:
+            if len(self._sessions) >= _SESSION_MAX_ENTRIES:
+                for key in [k for k, exp in self._sessions.items() if exp <= now]:
+                    del self._sessions[key]
+                if len(self._sessions) >= _SESSION_MAX_ENTRIES:
+                    oldest = min(self._sessions, key=self._sessions.get)
+                    del self._sessions[oldest]
+            self._sessions[digest] = now + ttl
+        return session
+
+    def validate_session(self, session: str) -> bool:
+        """校验会话凭据: 常量时间摘要 + 字典查找"""
+        if not session:
+            return False
+        digest = self._token_digest(session)
+        with self._cache_lock:
+            expires_at = self._sessions.get(digest)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                self._sessions.pop(digest, None)
+                return False
+            return True
+
+    def revoke_session(self, session: str):
+        digest = self._token_digest(session)
+        with self._cache_lock:
+            self._sessions.pop(digest, None)
+
+    def record_session_failure(self, client: str):
+        """记录会话校验失败; 审计日志按间隔汇总写入, 避免被刷爆"""
+        cache = self._audit_cache
+        now = time.monotonic()
+        with self._audit_lock:
+            cache['session_failed'] += 1
+            cache['session_failed_unlogged'] += 1
+            if now - cache['last_session_fail_audit'] < _SESSION_FAIL_AUDIT_INTERVAL:
+                return
+            count = cache['session_failed_unlogged']
+            cache['session_failed_unlogged'] = 0
+            cache['last_session_fail_audit'] = now
+        self._write_audit('SESSION_REJECT', f"{client}\tcount={count}")
+
+    def record_throttled(self):
+        """记录一次被限流拒绝的验证请求 (未进入 Argon2)"""
+        with self._audit_lock:
+            self._audit_cache['throttled'] += 1
+
     def regenerate(self) -> str:
         if not self._initialized:
             self.initialize()
@@ -238,13 +515,24 @@ class TokenManager:
     def get_audit_stats(self) -> Dict[str, Any]:
         if not self._initialized:
             self.initialize()
-        return {
-            'totalAttempts': self._audit_cache['total_attempts'],
-            'success': self._audit_cache['success'],
-            'failed': self._audit_cache['failed'],
-            'lastAttemptTs': self._audit_cache['last_attempt_ts'],
-            'recentFailuresLastHour': len(self._audit_cache['recent_failures'])
-        }
+        with self._audit_lock:
+            self._prune_recent_failures(int(time.time()*1000))
+            stats = {
+                'totalAttempts': self._audit_cache['total_attempts'],
+                'success': self._audit_cache['success'],
+                'failed': self._audit_cache['failed'],
+                'lastAttemptTs': self._audit_cache['last_attempt_ts'],
+                'recentFailuresLastHour': len(self._audit_cache['recent_failures']),
+                'sessionFailed': self._audit_cache['session_failed'],
+                'throttled': self._audit_cache['throttled']
+            }
+        with self._cache_lock:
+            stats['activeSessions'] = len(self._sessions)
+        return stats
+
+    def close(self):
+        """落盘剩余审计日志 (应用关闭时调用)"""
+        self._audit_writer.close()
 
     # 兼容旧调用 (如果有代码引用 get_token, 返回 None 表示不再提供明文)
     def get_token(self) -> Optional[str]:  # pragma: no cover - 明文不再暴露
@@ -252,6 +540,7 @@ class TokenManager:
 
 # 单例
 _token_manager = TokenManager()
+atexit.register(_token_manager.close)
 
 def get_token_manager() -> TokenManager:
     return _token_manager
@@ -82,6 +82,11 @@ class ModelDeleteData(BaseModel):
     name: str = Field(..., description="模型名称")
 
 
+class ConfigRollbackData(BaseModel):
+    """配置回滚数据"""
+    version: int = Field(..., description="要回滚到的版本号")
+
+
 class ConfigServiceOptions(BaseModel):
     """配置服务选项"""
     encoding: str = Field(default="utf-8", description="文件编码")
@@ -32,6 +32,11 @@ class GitProxyConfig(BaseModel):
     retry_delay: float = Field(default=2.0, description="重试延迟(秒)")
     fallback_to_original: bool = Field(default=True, description="是否fallback到原始地址")
     timeout: int = Field(default=300, description="克隆超时时间(秒)")
+    probe_before_clone: bool = Field(default=True, description="没有镜像统计数据时，克隆前先并发探测各镜像")
+    probe_timeout: int = Field(default=10, description="镜像探测超时时间(秒)")
+    race_top_mirrors: bool = Field(default=False, description="同时使用排名前两位的镜像克隆，先完成者胜出")
+    object_cache_enabled: bool = Field(default=True, description="克隆时使用本地Git对象缓存")
+    object_cache_max_size_mb: int = Field(default=1024, description="本地Git对象缓存大小上限(MB)")
     
     @validator('retry_count')
     def validate_retry_count(cls, v):
@@ -46,6 +51,12 @@ class GitProxyConfig(BaseModel):
         return v
 
 
+class GitProxyProbeRequest(BaseModel):
+    """镜像探测请求"""
+    repository_url: Optional[str] = Field(default=None, description="用于探测的仓库URL，为空时使用默认仓库")
+    is_onekey: bool = Field(default=False, description="是否为一键包环境")
+
+
 def get_default_git_proxy_config() -> GitProxyConfig:
     """获取默认的Git代理配置"""
     return GitProxyConfig(
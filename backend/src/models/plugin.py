@@ -39,6 +39,9 @@ class Plugin(BaseModel):
     id: str
     manifest: PluginManifest
     installed: bool = False
+    installed_folder: Optional[str] = None
+    installed_version: Optional[str] = None
+    update_available: bool = False
 
 
 class PluginListResponse(BaseModel):
@@ -51,6 +54,17 @@ class PluginInstallRequest(BaseModel):
     plugin_id: str
 
 
+class PluginBatchInstallRequest(BaseModel):
+    """插件批量安装请求"""
+    plugin_ids: List[str]
+    wait: bool = False
+
+
+class PluginUpdateRequest(BaseModel):
+    """插件更新请求"""
+    plugin_id: str
+
+
 class PluginInstallResponse(BaseModel):
     """插件安装响应"""
     id: int
@@ -11,6 +11,7 @@ class GetModelsRequest(BaseModel):
     """获取模型列表请求模型"""
     api_url: str = Field(..., description="API服务地址", example="https://api.siliconflow.cn/v1")
     api_key: str = Field(..., description="API密钥", example="sk-xxxx")
+    force_refresh: bool = Field(False, description="是否跳过缓存重新获取")
 
 
 class ModelInfo(BaseModel):
@@ -30,6 +31,7 @@ class ExternalModelsResponse(BaseModel):
 class GetModelsResponseData(BaseModel):
     """获取模型列表响应数据"""
     models: List[str] = Field(..., description="模型ID列表")
+    cached: bool = Field(False, description="是否来自缓存")
 
 
 class GetModelsResponse(BaseModel):
@@ -38,3 +40,30 @@ class GetModelsResponse(BaseModel):
     message: str = Field("获取模型成功", description="响应消息")
     data: GetModelsResponseData = Field(..., description="响应数据")
     time: int = Field(..., description="响应时间戳")
+
+
+class ProviderProbeResult(BaseModel):
+    """API服务商连通性检测结果"""
+    name: str = Field(..., description="服务商名称")
+    base_url: str = Field(..., description="API基础URL")
+    reachable: bool = Field(False, description="是否可以建立连接并收到响应")
+    ok: bool = Field(False, description="模型列表接口是否返回成功")
+    status_code: Optional[int] = Field(None, description="HTTP状态码")
+    latency_ms: Optional[float] = Field(None, description="响应延迟（毫秒）")
+    model_count: Optional[int] = Field(None, description="可用模型数量")
+    error: Optional[str] = Field(None, description="错误信息")
+
+
+class ProbeProvidersResponseData(BaseModel):
+    """服务商连通性检测响应数据"""
+    providers: List[ProviderProbeResult] = Field(..., description="各服务商检测结果")
+    total: int = Field(..., description="服务商数量")
+    reachable: int = Field(..., description="可连接的服务商数量")
+
+
+class ProbeProvidersResponse(BaseModel):
+    """服务商连通性检测响应模型"""
+    status: int = Field(200, description="状态码")
+    message: str = Field("检测完成", description="响应消息")
+    data: ProbeProvidersResponseData = Field(..., description="响应数据")
+    time: int = Field(..., description="响应时间戳")
@@ -4,23 +4,28 @@ Configuration Routes
 处理所有配置相关的API请求
 """
 
+import asyncio
+import json
 import time
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, Optional, List, Union
 
 from core.logger import logger
+from core.config_watcher import get_config_watcher
 from services.main_config_service import MainConfigService
 from services.model_config_service import ModelConfigService
 from services.adapter_config_service import AdapterConfigService
-from services.git_clone_service import get_git_clone_service, EnhancedGitCloneService
+from services.git_clone_service import get_git_clone_service, EnhancedGitCloneService, PROBE_REPOSITORY_URL
 from models.config import (
     ConfigUpdateData,
     ApiProviderData,
     ModelData,
     ProviderDeleteData,
-    ModelDeleteData
+    ModelDeleteData,
+    ConfigRollbackData
 )
-from models.git_proxy import GitProxyConfig, GitProxyMirror
+from models.git_proxy import GitProxyConfig, GitProxyMirror, GitProxyProbeRequest
 
 router = APIRouter(prefix='/config', tags=['配置管理'])
 
@@ -96,6 +101,31 @@ async def update_main_config(update_data: Dict[str, Any]):
         raise HTTPException(status_code=500, detail=str(error))
 
 
+@router.post('/main/patch')
+async def patch_main_config(patch: Union[List[Dict[str, Any]], Dict[str, Any]]):
+    """
+    增量更新主程序配置
+    支持 JSON-Patch 数组或 {"section.key": value} 形式的点分键差异
+    """
+    try:
+        await MainConfigService.patch_config(patch)
+        
+        return create_success_response(message='更新成功')
+        
+    except ValueError as error:
+        logger.error(f'主程序配置补丁验证失败: {error}')
+        raise HTTPException(status_code=400, detail=str(error))
+    except FileNotFoundError as error:
+        logger.error(f'主程序配置文件不存在: {error}')
+        raise HTTPException(status_code=404, detail=str(error))
+    except PermissionError as error:
+        logger.error(f'主程序配置文件权限错误: {error}')
+        raise HTTPException(status_code=403, detail=str(error))
+    except Exception as error:
+        logger.error(f'增量更新主程序配置失败: {error}')
+        raise HTTPException(status_code=500, detail=str(error))
+
+
 # 麦麦模型配置API
 @router.get('/model/get')
 async def get_model_config():
@@ -146,6 +176,31 @@ async def update_model_config(update_data: Dict[str, Any]):
         raise HTTPException(status_code=500, detail=str(error))
 
 
+@router.post('/model/patch')
+async def patch_model_config(patch: Union[List[Dict[str, Any]], Dict[str, Any]]):
+    """
+    增量更新模型配置
+    支持 JSON-Patch 数组或 {"section.key": value} 形式的点分键差异
+    """
+    try:
+        await ModelConfigService.patch_config(patch)
+        
+        return create_success_response(message='更新成功')
+        
+    except ValueError as error:
+        logger.error(f'模型配置补丁验证失败: {error}')
+        raise HTTPException(status_code=400, detail=str(error))
+    except FileNotFoundError as error:
+        logger.error(f'模型配置文件不存在: {error}')
+        raise HTTPException(status_code=404, detail=str(error))
+    except PermissionError as error:
+        logger.error(f'模型配置文件权限错误: {error}')
+        raise HTTPException(status_code=403, detail=str(error))
+    except Exception as error:
+        logger.error(f'增量更新模型配置失败: {error}')
+        raise HTTPException(status_code=500, detail=str(error))
+
+
 @router.post('/model/addProvider')
 async def add_api_provider(provider_data: ApiProviderData):
     """
@@ -280,7 +335,274 @@ async def update_qq_adapter_config(update_data: Dict[str, Any]):
         raise HTTPException(status_code=500, detail=str(error))
 
 
+@router.post('/adapter/qq/patch')
+async def patch_qq_adapter_config(patch: Union[List[Dict[str, Any]], Dict[str, Any]]):
+    """
+    增量更新QQ适配器配置
+    支持 JSON-Patch 数组或 {"section.key": value} 形式的点分键差异
+    """
+    try:
+        await AdapterConfigService.patch_config(patch)
+        
+        return create_success_response(message='更新成功')
+        
+    except ValueError as error:
+        logger.error(f'QQ适配器配置补丁验证失败: {error}')
+        raise HTTPException(status_code=400, detail=str(error))
+    except FileNotFoundError as error:
+        logger.error(f'QQ适配器配置文件不存在: {error}')
+        raise HTTPException(status_code=404, detail=str(error))
+    except PermissionError as error:
+        logger.error(f'QQ适配器配置文件权限错误: {error}')
+        raise HTTPException(status_code=403, detail=str(error))
+    except Exception as error:
+        logger.error(f'增量更新QQ适配器配置失败: {error}')
+        raise HTTPException(status_code=500, detail=str(error))
+
+
+# 配置变更历史API
+_HISTORY_SERVICES = {
+    'main': MainConfigService,
+    'model': ModelConfigService,
+    'adapter-qq': AdapterConfigService
+}
+
+
+def _get_history_service(kind: str):
+    """根据配置类型获取对应的配置服务"""
+    service = _HISTORY_SERVICES.get(kind)
+    if service is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"未知的配置类型: {kind}，可选值: {', '.join(_HISTORY_SERVICES)}"
+        )
+    return service
+
+
+@router.get('/history/{kind}')
+async def list_config_history(kind: str):
+    """
+    获取配置变更历史（只读取索引，不读取各版本内容）
+    kind: main / model / adapter-qq
+    """
+    service = _get_history_service(kind)
+    try:
+        versions = service.get_history().list_versions()
+        
+        return create_success_response(
+            data={'items': versions, 'total': len(versions)},
+            message='获取成功'
+        )
+        
+    except FileNotFoundError as error:
+        logger.error(f'配置文件不存在: {error}')
+        raise HTTPException(status_code=404, detail=str(error))
+    except Exception as error:
+        logger.error(f'获取配置变更历史失败: {error}')
+        raise HTTPException(status_code=500, detail=str(error))
+
+
+@router.get('/history/{kind}/diff')
+async def diff_config_history(
+    kind: str,
+    from_version: str = Query(..., alias='from', description="起始版本号"),
+    to_version: str = Query('current', alias='to', description="目标版本号，current 表示当前文件")
+):
+    """
+    对比两个配置版本的结构化差异
+    """
+    service = _get_history_service(kind)
+    try:
+        changes = service.get_history().diff(from_version, to_version)
+        
+        return create_success_response(
+            data={'from': from_version, 'to': to_version, 'changes': changes},
+            message='对比成功'
+        )
+        
+    except ValueError as error:
+        logger.error(f'对比配置版本失败: {error}')
+        raise HTTPException(status_code=400, detail=str(error))
+    except FileNotFoundError as error:
+        logger.error(f'配置版本文件不存在: {error}')
+        raise HTTPException(status_code=404, detail=str(error))
+    except Exception as error:
+        logger.error(f'对比配置版本失败: {error}')
+        raise HTTPException(status_code=500, detail=str(error))
+
+
+@router.post('/history/{kind}/rollback')
+async def rollback_config_history(kind: str, rollback_data: ConfigRollbackData):
+    """
+    回滚配置到指定版本（回滚本身也会记录为新版本）
+    """
+    service = _get_history_service(kind)
+    try:
+        generation = service.get_history().rollback(rollback_data.version)
+        logger.info(f'配置已回滚: {kind} -> 版本 {rollback_data.version}')
+        
+        return create_success_response(data=generation, message='回滚成功')
+        
+    except ValueError as error:
+        logger.error(f'回滚配置失败: {error}')
+        raise HTTPException(status_code=400, detail=str(error))
+    except FileNotFoundError as error:
+        logger.error(f'配置版本文件不存在: {error}')
+        raise HTTPException(status_code=404, detail=str(error))
+    except Exception as error:
+        logger.error(f'回滚配置失败: {error}')
+        raise HTTPException(status_code=500, detail=str(error))
+
+
+# 配置变更推送API
+# 心跳间隔（秒），防止反向代理因连接空闲而断开
+EVENT_HEARTBEAT_INTERVAL = 15.0
+
+
+@router.get('/events/stream')
+async def config_events_stream(request: Request):
+    """
+    以 SSE 推送配置文件变更事件（EventSource 可通过 ?session= 携带会话凭据）
+    """
+    watcher = get_config_watcher()
+    queue = watcher.subscribe()
+
+    async def event_generator():
+        try:
+            yield 'retry: 3000\n\n'
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENT_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                yield f'event: {event["type"]}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n'
+        finally:
+            watcher.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@router.websocket('/events/ws')
+async def config_events_websocket(websocket: WebSocket):
+    """
+    以 WebSocket 推送配置文件变更事件
+    """
+    await websocket.accept()
+    watcher = get_config_watcher()
+    queue = watcher.subscribe()
+
+    async def wait_disconnect():
+        # 客户端消息无需处理，只用于感知断开
+        while True:
+            message = await websocket.receive()
+            if message['type'] == 'websocket.disconnect':
+                return
+
+    receiver = asyncio.create_task(wait_disconnect())
+    try:
+        while True:
+            getter = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                getter.cancel()
+                break
+            await websocket.send_json(getter.result())
+    except WebSocketDisconnect:
+        pass
+    except Exception as error:
+        logger.error(f'配置变更推送连接异常: {error}')
+    finally:
+        receiver.cancel()
+        watcher.unsubscribe(queue)
+
+
 # Git代理配置API
+@router.get('/git-proxy/mirror-stats')
+async def get_git_proxy_mirror_stats():
+    """
+    获取Git镜像健康度统计（按当前排名）
+    """
+    git_service = get_git_clone_service()
+    return create_success_response(
+        data=git_service.get_mirror_stats(),
+        message='获取镜像统计成功'
+    )
+
+
+@router.get('/git-proxy/git-info')
+async def get_git_info(refresh: bool = False):
+    """
+    获取检测到的Git可执行文件、版本与支持的功能（refresh=true 时重新检测）
+    """
+    from routes.system import is_onekey_environment
+    info = await asyncio.to_thread(get_git_clone_service().detect_git, is_onekey_environment(), refresh)
+    if info is None:
+        raise HTTPException(status_code=404, detail='未找到Git可执行文件，请检查Git安装')
+    return create_success_response(
+        data=info.to_dict(),
+        message='获取Git信息成功'
+    )
+
+
+@router.get('/git-proxy/cache')
+async def get_git_object_cache_stats():
+    """
+    获取本地Git对象缓存统计
+    """
+    cache = get_git_clone_service().object_cache
+    return create_success_response(
+        data=await asyncio.to_thread(cache.stats),
+        message='获取Git缓存统计成功'
+    )
+
+
+@router.delete('/git-proxy/cache')
+async def clear_git_object_cache():
+    """
+    清空本地Git对象缓存（正在使用的缓存除外）
+    """
+    try:
+        cache = get_git_clone_service().object_cache
+        freed = await asyncio.to_thread(cache.clear)
+        return create_success_response(
+            data={'freedSize': freed},
+            message='Git缓存已清空'
+        )
+    except Exception as error:
+        logger.error(f'清空Git缓存失败: {error}')
+        raise HTTPException(status_code=500, detail=str(error))
+
+
+@router.post('/git-proxy/probe')
+async def probe_git_proxy_mirrors(data: GitProxyProbeRequest):
+    """
+    使用 git ls-remote 并发探测Git镜像，更新镜像健康度
+    """
+    try:
+        git_service = get_git_clone_service()
+        repository_url = data.repository_url or PROBE_REPOSITORY_URL
+        results = await git_service.probe_mirrors(repository_url, data.is_onekey)
+
+        return create_success_response(
+            data={
+                'results': results,
+                'stats': git_service.get_mirror_stats(repository_url)
+            },
+            message='镜像探测完成'
+        )
+
+    except RuntimeError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    except Exception as error:
+        logger.error(f'镜像探测失败: {error}')
+        raise HTTPException(status_code=500, detail=str(error))
+
+
 @router.get('/git-proxy/get')
 async def get_git_proxy_config():
     """
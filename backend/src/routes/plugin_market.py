@@ -1,22 +1,73 @@
 """
 插件广场API路由
 """
-from fastapi import APIRouter
+import asyncio
+import json
+import time
+from typing import Optional
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from core.logger import logger
+from models.database import ApiResponse
 from services.plugin_market_service import PluginMarketService
-from models.plugin import PluginInstallRequest
+from services.plugin_index_service import get_plugin_index_service
+from services.plugin_job_service import get_plugin_job_service
+from models.plugin import PluginBatchInstallRequest, PluginInstallRequest, PluginUpdateRequest
 
 router = APIRouter(prefix="/pluginMarket", tags=["插件广场"])
 
 
 @router.get("/get")
-async def get_all_plugins():
+async def get_all_plugins(refresh: bool = False):
     """
     获取所有插件列表
     
+    Args:
+        refresh: 是否跳过缓存重新拉取插件索引
+    
     Returns:
         ApiResponse: 包含所有插件信息的响应
     """
-    return await PluginMarketService.get_all_plugins()
+    return await PluginMarketService.get_all_plugins(force_refresh=refresh)
+
+
+@router.get("/search")
+async def search_plugins(
+    q: str = "",
+    category: Optional[str] = None,
+    author: Optional[str] = None,
+    status: Optional[str] = None,
+    sort: str = "relevance",
+    order: str = "asc",
+    page: int = 1,
+    page_size: int = 20
+):
+    """
+    搜索插件（分页）
+    
+    Args:
+        q: 关键词，匹配名称/关键词/描述
+        category: 分类筛选
+        author: 作者筛选
+        status: 安装状态筛选（installed / not-installed / update-available）
+        sort: 排序方式（relevance / name / author / version）
+        order: 排序方向（asc / desc）
+        page: 页码（从1开始）
+        page_size: 每页数量（最多100）
+        
+    Returns:
+        ApiResponse: 包含 items、total、page、pageSize 与 categories 的响应
+    """
+    return await PluginMarketService.search_plugins(
+        query=q,
+        category=category,
+        author=author,
+        install_status=status,
+        sort=sort,
+        order=order,
+        page=page,
+        page_size=page_size
+    )
 
 
 @router.get("/get/{plugin_id}")
@@ -36,12 +87,235 @@ async def get_plugin_by_id(plugin_id: str):
 @router.post("/install")
 async def install_plugin(request: PluginInstallRequest):
     """
-    安装插件
+    安装插件（加入后台任务队列，立即返回任务ID）
     
     Args:
         request: 插件安装请求
         
     Returns:
-        ApiResponse: 安装结果响应
+        ApiResponse: 包含任务信息的响应
     """
     return await PluginMarketService.install_plugin(request.plugin_id)
+
+
+@router.post("/install/batch")
+async def batch_install_plugins(request: PluginBatchInstallRequest):
+    """
+    批量安装插件（检查麦麦版本兼容性后并发安装）
+    
+    Args:
+        request: 插件批量安装请求，wait 为 true 时等待全部安装结束
+        
+    Returns:
+        ApiResponse: 每个插件的安装结果
+    """
+    return await PluginMarketService.batch_install_plugins(request.plugin_ids, request.wait)
+
+
+@router.get("/installed")
+async def get_installed_plugins(refresh: bool = False):
+    """
+    获取已安装插件列表及版本
+    
+    Args:
+        refresh: 是否立即检查插件目录（默认最多每2秒检查一次）
+        
+    Returns:
+        ApiResponse: 已安装插件列表
+    """
+    return await PluginMarketService.get_installed_plugins(force_refresh=refresh)
+
+
+@router.post("/update")
+async def update_plugin(request: PluginUpdateRequest):
+    """
+    更新已安装的插件（加入后台任务队列，立即返回任务ID）
+    
+    Args:
+        request: 插件更新请求
+        
+    Returns:
+        ApiResponse: 包含任务信息的响应
+    """
+    return await PluginMarketService.update_plugin(request.plugin_id)
+
+
+@router.get("/updates")
+async def check_plugin_updates():
+    """
+    检查所有已安装插件是否有更新
+    
+    Returns:
+        ApiResponse: 各插件的本地/远程提交与是否有更新
+    """
+    return await PluginMarketService.check_updates()
+
+
+@router.get("/mirrors")
+async def get_index_mirror_stats():
+    """
+    获取插件索引各镜像的延迟与成功率统计（按下次请求的尝试顺序排列）
+    
+    Returns:
+        ApiResponse: 镜像统计
+    """
+    return ApiResponse(
+        status=200,
+        message="查询成功",
+        data={"items": get_plugin_index_service().get_mirror_stats()},
+        time=int(time.time() * 1000)
+    )
+
+
+# 任务事件推送心跳间隔（秒），防止反向代理因连接空闲而断开
+JOB_EVENT_HEARTBEAT_INTERVAL = 15.0
+
+
+@router.get("/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """
+    获取插件任务列表（按创建时间倒序）
+    
+    Args:
+        status: 按状态筛选（queued/running/succeeded/failed/cancelled）
+        limit: 最多返回的任务数量
+        
+    Returns:
+        ApiResponse: 任务列表
+    """
+    jobs = get_plugin_job_service().list_jobs(status, limit)
+    return ApiResponse(
+        status=200,
+        message="查询成功",
+        data={"items": [job.to_dict() for job in jobs]},
+        time=int(time.time() * 1000)
+    )
+
+
+@router.get("/jobs/events/stream")
+async def job_events_stream(request: Request, job_id: Optional[str] = None):
+    """
+    以 SSE 推送插件任务状态与进度（EventSource 可通过 ?session= 携带会话凭据）
+    
+    Args:
+        job_id: 只订阅该任务，为空时订阅全部任务
+    """
+    job_service = get_plugin_job_service()
+    queue = job_service.subscribe(job_id)
+
+    async def event_generator():
+        try:
+            yield 'retry: 3000\n\n'
+            # 先推送当前状态，客户端无需再单独查询
+            job = job_service.get_job(job_id) if job_id else None
+            if job is not None:
+                yield f'event: job_updated\ndata: {json.dumps({"type": "job_updated", "job": job.to_dict()}, ensure_ascii=False)}\n\n'
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=JOB_EVENT_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                yield f'event: {event["type"]}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n'
+        finally:
+            job_service.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@router.websocket("/jobs/events/ws")
+async def job_events_websocket(websocket: WebSocket, job_id: Optional[str] = None):
+    """
+    以 WebSocket 推送插件任务状态与进度
+    
+    Args:
+        job_id: 只订阅该任务，为空时订阅全部任务
+    """
+    await websocket.accept()
+    job_service = get_plugin_job_service()
+    queue = job_service.subscribe(job_id)
+
+    async def wait_disconnect():
+        # 客户端消息无需处理，只用于感知断开
+        while True:
+            message = await websocket.receive()
+            if message['type'] == 'websocket.disconnect':
+                return
+
+    receiver = asyncio.create_task(wait_disconnect())
+    try:
+        job = job_service.get_job(job_id) if job_id else None
+        if job is not None:
+            await websocket.send_json({'type': 'job_updated', 'job': job.to_dict()})
+        while True:
+            getter = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                getter.cancel()
+                break
+            await websocket.send_json(getter.result())
+    except WebSocketDisconnect:
+        pass
+    except Exception as error:
+        logger.error(f'插件任务推送连接异常: {error}')
+    finally:
+        receiver.cancel()
+        job_service.unsubscribe(queue)
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    获取插件任务状态
+    
+    Args:
+        job_id: 任务ID
+        
+    Returns:
+        ApiResponse: 任务信息
+    """
+    job = get_plugin_job_service().get_job(job_id)
+    if job is None:
+        return ApiResponse(
+            status=404,
+            message=f"任务不存在: {job_id}",
+            data=None,
+            time=int(time.time() * 1000)
+        )
+    return ApiResponse(
+        status=200,
+        message="查询成功",
+        data=job.to_dict(),
+        time=int(time.time() * 1000)
+    )
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """
+    取消插件任务（执行中的任务会终止git进程）
+    
+    Args:
+        job_id: 任务ID
+        
+    Returns:
+        ApiResponse: 任务信息
+    """
+    job = await get_plugin_job_service().cancel(job_id)
+    if job is None:
+        return ApiResponse(
+            status=404,
+            message=f"任务不存在: {job_id}",
+            data=None,
+            time=int(time.time() * 1000)
+        )
+    return ApiResponse(
+        status=200,
+        message="任务已取消" if job.status == "cancelled" else f"任务已结束，无法取消（{job.status}）",
+        data=job.to_dict(),
+        time=int(time.time() * 1000)
+    )
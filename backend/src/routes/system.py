@@ -3,18 +3,31 @@ System 路由
 系统相关API端点
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 import time
+import math
 import logging
-import re
+import asyncio
 from pathlib import Path
+from typing import Optional
 from core.path_cache_manager import path_cache_manager
-from core.token_manager import get_token_manager
+from core.token_manager import VerifyBusyError, get_token_manager
+from core.config import config_manager
+from core.auth import SESSION_COOKIE_NAME, get_client_host
+from core.rate_limiter import TokenBucketLimiter, ConcurrencyLimiter
+from utils.mai_version import read_mai_version
 
 logger = logging.getLogger("HMML")
 
 router = APIRouter(prefix="/system", tags=["系统信息"])
 
+# 无需会话即可访问的系统接口（登录入口与验证前界面需要的环境信息）
+public_router = APIRouter(prefix="/system", tags=["系统信息"])
+
+# Token 验证限流（首次使用时按配置创建）
+_verify_limiter: Optional[TokenBucketLimiter] = None
+_verify_concurrency: Optional[ConcurrencyLimiter] = None
+
 
 def create_success_response(data: dict = None, message: str = "操作成功") -> dict:
     """创建成功响应"""
@@ -35,26 +48,63 @@ def create_error_response(status: int, message: str) -> dict:
     }
 
 
-@router.post("/verifyToken", summary="验证访问Token")
-async def verify_token(payload: dict):
-    """验证客户端提交的 token 是否与服务器存储一致"""
+def _get_verify_guards() -> tuple[TokenBucketLimiter, ConcurrencyLimiter]:
+    """获取 Token 验证的限流器与并发限制器"""
+    global _verify_limiter, _verify_concurrency
+    if _verify_limiter is None or _verify_concurrency is None:
+        security = config_manager.get().security
+        _verify_limiter = TokenBucketLimiter(
+            rate=security.verify_rate_per_minute / 60,
+            capacity=security.verify_burst
+        )
+        _verify_concurrency = ConcurrencyLimiter(security.verify_max_concurrency)
+    return _verify_limiter, _verify_concurrency
+
+
+def _raise_too_many_requests(message: str, retry_after: float) -> None:
+    """快速返回 429（不进行任何哈希计算）"""
+    get_token_manager().record_throttled()
+    raise HTTPException(
+        status_code=429,
+        detail=create_error_response(429, message),
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+@public_router.post("/verifyToken", summary="验证访问Token")
+async def verify_token(payload: dict, request: Request, response: Response):
+    """验证客户端提交的 token 是否与服务器存储一致，成功后签发会话凭据"""
+    limiter, concurrency = _get_verify_guards()
+    allowed, retry_after = limiter.try_acquire(get_client_host(request))
+    if not allowed:
+        _raise_too_many_requests("验证请求过于频繁，请稍后再试", retry_after)
+    user_token = (payload or {}).get("token")
+    if not isinstance(user_token, str) or not user_token:
+        return {
+            "status": 401,
+            "message": "验证失败",
+            "data": {"valid": False},
+            "time": int(time.time() * 1000)
+        }
+    tm = get_token_manager()
+    tm.initialize()  # 确保已加载
     try:
-        user_token = (payload or {}).get("token")
-        if not isinstance(user_token, str) or not user_token:
-            return {
-                "status": 401,
-                "message": "验证失败",
-                "data": {"valid": False},
-                "time": int(time.time() * 1000)
-            }
-        tm = get_token_manager()
-        tm.initialize()  # 确保已加载
-        ok = tm.verify_token(user_token)
+        # 只有需要执行 Argon2 的校验占用并发名额，缓存命中直接校验
+        ok = await tm.verify_token_async(user_token, guard=concurrency)
         if ok:
+            session_ttl = config_manager.get().security.session_ttl
+            session = tm.issue_session(session_ttl)
+            response.set_cookie(
+                SESSION_COOKIE_NAME,
+                session,
+                max_age=session_ttl,
+                httponly=True,
+                samesite="lax"
+            )
             return {
                 "status": 200,
                 "message": "验证成功",
-                "data": {"valid": True},
+                "data": {"valid": True, "session": session, "expiresIn": session_ttl},
                 "time": int(time.time() * 1000)
             }
         else:
@@ -64,6 +114,8 @@ async def verify_token(payload: dict):
                 "data": {"valid": False},
                 "time": int(time.time() * 1000)
             }
+    except VerifyBusyError:
+        _raise_too_many_requests("服务器繁忙，请稍后再试", 1)
     except Exception as error:
         logger.error(f"Token验证异常: {error}")
         raise HTTPException(status_code=500, detail=create_error_response(500, "验证异常"))
@@ -146,7 +198,7 @@ def is_onekey_environment() -> bool:
         return False
 
 
-@router.get("/isOneKeyEnv", summary="检测是否为一键包环境")
+@public_router.get("/isOneKeyEnv", summary="检测是否为一键包环境")
 async def check_onekey_environment():
     """
     检测当前后端是否运行在一键包环境中
@@ -252,42 +304,21 @@ async def get_mai_version():
                 detail=create_error_response(404, "未找到麦麦根目录，请先设置路径缓存")
             )
         
-        # 构造配置文件路径
-        config_file_path = Path(main_root) / "src" / "config" / "config.py"
-        
-        if not config_file_path.exists():
-            logger.error(f"配置文件不存在: {config_file_path}")
+        try:
+            version = await asyncio.to_thread(read_mai_version, main_root)
+        except FileNotFoundError:
+            logger.error(f"配置文件不存在: {Path(main_root) / 'src' / 'config' / 'config.py'}")
             raise HTTPException(
                 status_code=404,
                 detail=create_error_response(404, "麦麦配置文件不存在")
             )
-        
-        # 读取配置文件内容
-        with open(config_file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        # 使用正则表达式查找版本号
-        version_match = re.search(r'MMC_VERSION\s*=\s*["\']([^"\']+)["\']', content)
-        
-        if not version_match:
+        except ValueError:
             logger.error("在配置文件中未找到版本号")
             raise HTTPException(
                 status_code=404,
                 detail=create_error_response(404, "在配置文件中未找到版本号")
             )
-        
-        raw_version = version_match.group(1)
-        logger.info(f"找到原始版本号: {raw_version}")
-        
-        # 处理预览版本，移除 snapshot 后缀
-        # 例如: 0.10.1.snapshot.1 -> 0.10.1
-        # 例如: 0.10.2.snapshot.3 -> 0.10.2
-        if '.snapshot.' in raw_version:
-            version = raw_version.split('.snapshot.')[0]
-            logger.info(f"检测到预览版本，处理后版本号: {version}")
-        else:
-            version = raw_version
-            logger.info(f"正式版本号: {version}")
+        logger.info(f"麦麦版本号: {version}")
         
         response_data = {
             "version": version
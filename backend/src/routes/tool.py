@@ -3,8 +3,12 @@
 用于处理工具API的HTTP请求
 """
 
+import time
 from fastapi import APIRouter, HTTPException
-from models.tool import GetModelsRequest, GetModelsResponse
+from core.logger import logger
+from models.config import ConfigServiceOptions
+from models.tool import GetModelsRequest, GetModelsResponse, ProbeProvidersResponse
+from services.model_config_service import ModelConfigService
 from services.tool_service import ToolService
 
 router = APIRouter()
@@ -46,7 +50,7 @@ async def get_models(request: GetModelsRequest):
             raise HTTPException(status_code=400, detail="API密钥格式无效，长度不能少于10个字符")
         
         # 调用服务获取模型列表
-        result = tool_service.get_models(request)
+        result = await tool_service.get_models(request)
         return result
         
     except HTTPException:
@@ -67,3 +71,30 @@ async def get_models(request: GetModelsRequest):
             raise HTTPException(status_code=502, detail=error_message)
         else:
             raise HTTPException(status_code=500, detail=error_message)
+
+
+@router.post("/probeProviders", response_model=ProbeProvidersResponse)
+async def probe_providers():
+    """
+    并发检测 model_config.toml 中所有API服务商的连通性与延迟
+    
+    Returns:
+        ProbeProvidersResponse: 各服务商的检测结果
+    """
+    try:
+        model_config = await ModelConfigService.get_config(ConfigServiceOptions(validate=False))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"读取模型配置失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    providers = model_config.api_providers or []
+    data = await tool_service.probe_providers(providers)
+    
+    return ProbeProvidersResponse(
+        status=200,
+        message="检测完成",
+        data=data,
+        time=int(time.time() * 1000)
+    )
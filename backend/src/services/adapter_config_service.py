@@ -5,9 +5,8 @@ Adapter Configuration Service
 """
 
 import os
-import shutil
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List, Union
 
 import toml
 
@@ -20,6 +19,12 @@ from models.config import (
     ConfigServiceOptions
 )
 from utils.toml_helpers import stringify_config_to_clean_toml
+from utils.config_cache import config_file_cache, ConfigReadError, ConfigParseError
+from utils.toml_patch import parse_patch, patch_toml_file
+from utils.atomic_file import atomic_write_text
+from utils.backup_store import BackupStore
+from utils.config_history import ConfigHistory
+from utils.config_schema import ConfigSchema, changed_sections
 
 
 class AdapterConfigService:
@@ -86,23 +91,18 @@ class AdapterConfigService:
             if not file_info.readable:
                 raise PermissionError(f'QQ适配器配置文件不可读: {config_path}')
             
-            # 读取文件内容
+            # 读取并解析文件内容（文件未变化时直接使用缓存）
             try:
-                with open(config_path, 'r', encoding=opts.encoding) as f:
-                    file_content = f.read()
-            except Exception as error:
+                config = config_file_cache.get_model(config_path, AdapterConfigData, opts.encoding)
+            except ConfigReadError as error:
                 logger.error(f'读取QQ适配器配置文件失败: {error}')
                 raise RuntimeError(f'读取QQ适配器配置文件失败: {error}')
-            
-            # 解析TOML内容
-            try:
-                config_data = toml.loads(file_content)
-            except Exception as error:
+            except ConfigParseError as error:
                 logger.error(f'解析QQ适配器配置文件失败: {error}')
                 raise ValueError(f'QQ适配器配置文件格式错误: {error}')
             
             logger.info('QQ适配器配置读取成功')
-            return AdapterConfigData(**config_data)
+            return config
             
         except Exception as error:
             logger.error(f'获取QQ适配器配置失败: {error}')
@@ -126,10 +126,6 @@ class AdapterConfigService:
             if not update_dict:
                 raise ValueError('更新数据不能为空')
             
-            # 验证更新数据格式
-            if opts.validate:
-                cls._validate_config_data(update_dict)
-            
             # 检查文件状态
             file_info = await cls.get_config_file_info()
             
@@ -145,6 +141,10 @@ class AdapterConfigService:
             current_config_data = await cls.get_config(ConfigServiceOptions(validate=False))
             current_config = current_config_data.model_dump()
             
+            # 只校验与当前配置不同的配置节
+            if opts.validate:
+                cls._validate_config_data(update_dict, changed_sections(current_config, update_dict))
+            
             # 合并配置数据
             merged_config = cls._merge_config(current_config, update_dict)
             
@@ -155,12 +155,14 @@ class AdapterConfigService:
             # 转换为TOML格式并写入文件
             try:
                 toml_content = stringify_config_to_clean_toml(merged_config, toml)
-                with open(config_path, 'w', encoding=opts.encoding) as f:
-                    f.write(toml_content)
+                atomic_write_text(config_path, toml_content, opts.encoding)
             except Exception as error:
                 logger.error(f'写入QQ适配器配置文件失败: {error}')
                 raise RuntimeError(f'写入QQ适配器配置文件失败: {error}')
             
+            if opts.backup:
+                await cls._record_history()
+            
             logger.info('QQ适配器配置更新成功')
             
         except Exception as error:
@@ -168,56 +170,72 @@ class AdapterConfigService:
             raise error
     
     @classmethod
-    def _validate_config_data(cls, data: Dict[str, Any]) -> None:
-        """验证配置数据格式"""
-        if not isinstance(data, dict):
-            raise ValueError('配置数据必须是一个对象')
-        
-        # 验证特定的配置结构
-        if 'napcat_server' in data:
-            cls._validate_server_config(data['napcat_server'], 'napcat_server')
-        
-        if 'maibot_server' in data:
-            cls._validate_server_config(data['maibot_server'], 'maibot_server')
-        
-        if 'chat' in data:
-            cls._validate_chat_config(data['chat'])
-        
-        if 'debug' in data and 'level' in data['debug']:
-            valid_levels = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
-            if data['debug']['level'] not in valid_levels:
-                raise ValueError(f'无效的日志等级: {data["debug"]["level"]}')
-        
-        # 递归检查嵌套对象，确保数据结构合理
-        def validate_object(obj: Any, path: str = '') -> None:
-            if isinstance(obj, dict):
-                for key, value in obj.items():
-                    current_path = f'{path}.{key}' if path else key
-                    
-                    # 检查键名
-                    if not isinstance(key, str) or not key.strip():
-                        raise ValueError(f'配置项键名无效: {current_path}')
-                    
-                    # 检查值类型（TOML支持的类型）
-                    if not cls._is_valid_toml_type(value):
-                        raise ValueError(f'配置项类型不支持: {current_path} ({type(value).__name__})')
-                    
-                    # 递归验证嵌套对象
-                    if isinstance(value, (dict, list)):
-                        validate_object(value, current_path)
+    async def patch_config(
+        cls,
+        patch: Union[List[Dict[str, Any]], Dict[str, Any]],
+        options: Optional[ConfigServiceOptions] = None
+    ) -> None:
+        """增量更新QQ适配器配置文件（JSON-Patch 或点分键差异，仅修改变化的键）"""
+        try:
+            opts = options or ConfigServiceOptions()
+            config_path = cls._get_config_path()
             
-            elif isinstance(obj, list):
-                # 验证数组元素类型一致性
-                if obj and len(obj) > 0:
-                    first_type = type(obj[0])
-                    if not all(isinstance(item, first_type) for item in obj):
-                        raise ValueError(f'数组元素类型不一致: {path}')
-                    
-                    # 递归验证数组元素
-                    for i, item in enumerate(obj):
-                        validate_object(item, f'{path}[{i}]')
-        
-        validate_object(data)
+            operations = parse_patch(patch)
+            
+            # 检查文件状态
+            file_info = await cls.get_config_file_info()
+            if not file_info.exists:
+                raise FileNotFoundError(f'QQ适配器配置文件不存在: {config_path}')
+            if not file_info.readable:
+                raise PermissionError(f'QQ适配器配置文件不可读: {config_path}')
+            if not file_info.writable:
+                raise PermissionError(f'QQ适配器配置文件不可写: {config_path}')
+            
+            # 创建备份（如果启用备份）
+            if opts.backup:
+                await cls._create_backup(config_path)
+            
+            try:
+                patch_toml_file(
+                    config_path,
+                    operations,
+                    opts.encoding,
+                    validator=cls._validate_config_data if opts.validate else None
+                )
+            except (ValueError, PermissionError, FileNotFoundError):
+                raise
+            except Exception as error:
+                logger.error(f'写入QQ适配器配置文件失败: {error}')
+                raise RuntimeError(f'写入QQ适配器配置文件失败: {error}')
+            
+            if opts.backup:
+                await cls._record_history()
+            
+            logger.info(f'QQ适配器配置增量更新成功，共 {len(operations)} 项')
+            
+        except Exception as error:
+            logger.error(f'增量更新QQ适配器配置失败: {error}')
+            raise error
+    
+    # 配置校验器（首次使用时构建，之后复用）
+    _config_schema: Optional[ConfigSchema] = None
+    
+    @classmethod
+    def _get_config_schema(cls) -> ConfigSchema:
+        """获取配置校验器，按配置节注册专用规则"""
+        if cls._config_schema is None:
+            cls._config_schema = ConfigSchema({
+                'napcat_server': lambda value: cls._validate_server_config(value, 'napcat_server'),
+                'maibot_server': lambda value: cls._validate_server_config(value, 'maibot_server'),
+                'chat': cls._validate_chat_config,
+                'debug': cls._validate_debug_config
+            })
+        return cls._config_schema
+    
+    @classmethod
+    def _validate_config_data(cls, data: Dict[str, Any], sections: Optional[Iterable[str]] = None) -> None:
+        """验证配置数据格式（sections 为 None 时校验全部配置节）"""
+        cls._get_config_schema().validate(data, sections)
     
     @classmethod
     def _validate_server_config(cls, server_config: Any, config_name: str) -> None:
@@ -273,14 +291,12 @@ class AdapterConfigService:
             raise ValueError('enable_poke 必须是布尔值')
     
     @classmethod
-    def _is_valid_toml_type(cls, value: Any) -> bool:
-        """检查值是否是TOML支持的类型"""
-        return (
-            isinstance(value, (str, int, float, bool)) or
-            value is None or
-            isinstance(value, list) or
-            isinstance(value, dict)
-        )
+    def _validate_debug_config(cls, debug_config: Any) -> None:
+        """验证调试配置"""
+        if isinstance(debug_config, dict) and 'level' in debug_config:
+            valid_levels = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
+            if debug_config['level'] not in valid_levels:
+                raise ValueError(f'无效的日志等级: {debug_config["level"]}')
     
     @classmethod
     def _merge_config(cls, current: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
@@ -302,28 +318,35 @@ class AdapterConfigService:
         
         return merged
     
+    @classmethod
+    def _get_backup_store(cls) -> BackupStore:
+        """获取配置备份存储（目录：LauncherConfigBak/adapter/qq/）"""
+        adapter_root = path_cache_manager.get_adapter_root(cls.ADAPTER_NAME)
+        if not adapter_root:
+            raise RuntimeError('无法获取QQ适配器根目录路径')
+        
+        return BackupStore(os.path.join(os.path.dirname(adapter_root), 'config', 'LauncherConfigBak', 'adapter', 'qq'))
+    
+    @classmethod
+    def get_history(cls) -> ConfigHistory:
+        """获取QQ适配器配置变更历史"""
+        return ConfigHistory(cls._get_backup_store(), cls._get_config_path())
+    
     @classmethod
     async def _create_backup(cls, config_path: str) -> None:
-        """创建配置文件备份"""
+        """创建配置文件备份（内容与最近版本一致时不会新增版本，不一致说明文件被外部修改）"""
         try:
-            adapter_root = path_cache_manager.get_adapter_root(cls.ADAPTER_NAME)
-            if not adapter_root:
-                raise RuntimeError('无法获取QQ适配器根目录路径')
-            
-            # 创建备份目录结构：LauncherConfigBak/adapter/qq/
-            backup_dir = os.path.join(os.path.dirname(adapter_root), 'config', 'LauncherConfigBak', 'adapter', 'qq')
-            os.makedirs(backup_dir, exist_ok=True)
-            
-            # 生成带时间戳的备份文件名
-            timestamp = datetime.now().isoformat().replace(':', '-').replace('.', '-')
-            config_filename = os.path.basename(config_path)
-            backup_filename = f'{config_filename}.backup.{timestamp}'
-            backup_path = os.path.join(backup_dir, backup_filename)
-            
-            # 复制配置文件到备份目录
-            shutil.copy2(config_path, backup_path)
-            logger.info(f'QQ适配器配置备份已创建: {backup_path}')
+            generation = cls.get_history().record('external')
+            logger.info(f'QQ适配器配置备份已创建: 版本 {generation["id"]} ({generation["hash"][:12]})')
             
         except Exception as error:
             logger.warning(f'创建QQ适配器配置文件备份失败: {error}')
             # 备份失败不应该阻止配置更新，只记录警告
+    
+    @classmethod
+    async def _record_history(cls) -> None:
+        """保存成功后记录新版本及其结构化差异"""
+        try:
+            cls.get_history().record('save')
+        except Exception as error:
+            logger.warning(f'记录QQ适配器配置变更历史失败: {error}')
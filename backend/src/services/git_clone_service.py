@@ -6,15 +6,114 @@ Git克隆服务
 import subprocess
 import asyncio
 import logging
+import os
+import re
+import shutil
 import time
+from collections import deque
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 import json
 
 from models.git_proxy import GitProxyConfig, GitProxyMirror, get_default_git_proxy_config
+from utils.atomic_file import atomic_write_text
+from utils.git_object_cache import GitObjectCache
+from utils.mirror_health import MirrorHealthTracker
+from utils.trash import remove_tree
 
 logger = logging.getLogger("HMML")
 
+# 未指定仓库时用于探测镜像的仓库
+PROBE_REPOSITORY_URL = "https://github.com/DrSmoothl/plugin-repo"
+# 克隆传输速度低于该值（字节/秒）持续 LOW_SPEED_TIME 秒即中止
+LOW_SPEED_LIMIT = 1000
+LOW_SPEED_TIME = 30
+# 未找到Git时重新检测的间隔（秒）
+GIT_REDETECT_SECONDS = 60
+# 远程默认分支无法识别时，本地对象缓存使用的分支名
+CACHE_FALLBACK_BRANCH = "main"
+# 本地git命令（rev-parse、reset 等）超时时间（秒）
+GIT_LOCAL_TIMEOUT = 60
+# 克隆失败时错误信息保留的git输出行数
+GIT_OUTPUT_TAIL_LINES = 20
+
+# 克隆进度回调，参数为进度事件（见 clone_repository）
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+_PROGRESS_PATTERN = re.compile(r'^(?:remote:\s*)?([A-Za-z ]+?):\s+(\d+)%')
+# 各阶段在整体进度中所占区间
+_PROGRESS_PHASES = {
+    "Receiving objects": (0, 80),
+    "Resolving deltas": (80, 95),
+    "Updating files": (95, 100),
+}
+
+
+def parse_git_progress(line: str) -> Optional[Dict[str, Any]]:
+    """
+    解析 git --progress 输出的进度行
+
+    Returns:
+        Optional[Dict[str, Any]]: {phase, percent, overall}，不是进度行时为 None；
+        服务端阶段（Counting/Compressing objects）的 overall 为 0
+    """
+    match = _PROGRESS_PATTERN.match(line)
+    if not match:
+        return None
+    phase = match.group(1).strip()
+    percent = min(int(match.group(2)), 100)
+    start, end = _PROGRESS_PHASES.get(phase, (0, 0))
+    return {"phase": phase, "percent": percent, "overall": start + (end - start) * percent // 100}
+
+
+async def _read_git_output(stream: asyncio.StreamReader,
+                           on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> str:
+    """
+    读取git的stderr输出（进度行以 \\r 分隔），进度行交给回调，返回最后几行非进度输出
+    """
+    tail: deque = deque(maxlen=GIT_OUTPUT_TAIL_LINES)
+    buffer = b""
+    while True:
+        chunk = await stream.read(4096)
+        if chunk:
+            buffer += chunk
+            *lines, buffer = re.split(rb"[\r\n]", buffer)
+        else:
+            lines, buffer = [buffer], b""
+        for raw_line in lines:
+            line = raw_line.decode("utf-8", errors="ignore").strip()
+            if not line:
+                continue
+            progress = parse_git_progress(line)
+            if progress is None:
+                tail.append(line)
+            elif on_progress is not None:
+                on_progress(progress)
+        if not chunk:
+            return "\n".join(tail)
+
+
+def _git_env() -> Dict[str, str]:
+    """Git子进程环境变量：禁止交互式输入凭据，避免镜像要求认证时进程挂起"""
+    env = os.environ.copy()
+    env["GIT_TERMINAL_PROMPT"] = "0"
+    return env
+
+
+async def _kill_process(process: asyncio.subprocess.Process) -> None:
+    """终止子进程并等待其退出"""
+    try:
+        process.terminate()
+        await asyncio.wait_for(process.wait(), timeout=5)
+    except ProcessLookupError:
+        pass
+    except Exception:
+        try:
+            process.kill()
+            await process.wait()
+        except ProcessLookupError:
+            pass
+
 
 class GitCloneResult:
     """Git克隆结果"""
@@ -36,11 +135,125 @@ class GitCloneResult:
         }
 
 
+def _parse_git_version(text: str) -> Tuple[int, ...]:
+    """从 git --version 输出中解析版本号，如 "git version 2.43.0.windows.1" -> (2, 43, 0)"""
+    match = re.search(r'(\d+)\.(\d+)(?:\.(\d+))?', text)
+    if not match:
+        return ()
+    return tuple(int(part) for part in match.groups() if part is not None)
+
+
+class GitInfo:
+    """Git可执行文件及其版本支持的功能"""
+    def __init__(self, executable: str, version_text: str):
+        self.executable = executable
+        self.version_text = version_text
+        self.version = _parse_git_version(version_text)
+    
+    def _at_least(self, *version: int) -> bool:
+        # 无法解析版本时按新版本处理，由git自身报错
+        return not self.version or self.version >= version
+    
+    @property
+    def supports_progress(self) -> bool:
+        """clone/fetch 支持 --progress"""
+        return self._at_least(1, 7, 2)
+    
+    @property
+    def supports_shallow_local_clone(self) -> bool:
+        """可以从浅克隆仓库再克隆（本地对象缓存依赖此功能）"""
+        return self._at_least(1, 9)
+    
+    @property
+    def supports_partial_clone(self) -> bool:
+        """支持部分克隆 --filter=blob:none"""
+        return self._at_least(2, 19)
+    
+    def to_dict(self) -> dict:
+        return {
+            "executable": self.executable,
+            "version": ".".join(str(part) for part in self.version) or None,
+            "version_text": self.version_text,
+            "supports_progress": self.supports_progress,
+            "supports_shallow_local_clone": self.supports_shallow_local_clone,
+            "supports_partial_clone": self.supports_partial_clone
+        }
+
+
+class GitUpdateResult:
+    """Git更新结果"""
+    def __init__(self, success: bool, message: str = "", method: str = "fetch",
+                 mirror_used: Optional[str] = None, old_commit: Optional[str] = None,
+                 new_commit: Optional[str] = None, duration: float = 0.0):
+        self.success = success
+        self.message = message
+        self.method = method  # fetch: 原地更新；clone: 重新克隆
+        self.mirror_used = mirror_used
+        self.old_commit = old_commit
+        self.new_commit = new_commit
+        self.commit_subject: Optional[str] = None
+        self.files_changed = 0
+        self.insertions = 0
+        self.deletions = 0
+        self.duration = duration
+    
+    @property
+    def updated(self) -> bool:
+        return bool(self.new_commit) and self.new_commit != self.old_commit
+    
+    def to_dict(self) -> dict:
+        return {
+            "success": self.success,
+            "message": self.message,
+            "method": self.method,
+            "mirror_used": self.mirror_used,
+            "old_commit": self.old_commit,
+            "new_commit": self.new_commit,
+            "updated": self.updated,
+            "commit_subject": self.commit_subject,
+            "files_changed": self.files_changed,
+            "insertions": self.insertions,
+            "deletions": self.deletions,
+            "duration": round(self.duration, 2)
+        }
+
+
+def normalize_repository_url(url: str) -> str:
+    """去掉镜像前缀，还原为原始的 GitHub 仓库地址（非 GitHub 地址原样返回）"""
+    url = url.strip()
+    index = url.find("github.com/")
+    if index < 0:
+        return url
+    return "https://" + url[index:]
+
+
+def _preserve_local_files(old_dir: Path, new_dir: Path) -> None:
+    """把旧目录中新克隆里不存在的顶层文件（如插件配置）移动到新目录"""
+    for entry in old_dir.iterdir():
+        if entry.name == ".git":
+            continue
+        destination = new_dir / entry.name
+        if not destination.exists():
+            shutil.move(str(entry), str(destination))
+
+
+# git ls-remote --symref 输出中的默认分支，如 "ref: refs/heads/main\tHEAD"
+_SYMREF_PATTERN = re.compile(r'^ref: refs/heads/(\S+)\s+HEAD$', re.MULTILINE)
+_SHORTSTAT_PATTERN = re.compile(r'(\d+) files? changed(?:, (\d+) insertions?\(\+\))?(?:, (\d+) deletions?\(-\))?')
+
+
 class EnhancedGitCloneService:
     """增强的Git克隆服务"""
     
     def __init__(self, config: Optional[GitProxyConfig] = None):
         self.config = config or get_default_git_proxy_config()
+        # 镜像健康度（首字节延迟与成功率），克隆与探测时更新，用于动态排序镜像
+        self.mirror_health = MirrorHealthTracker()
+        # Git可执行文件检测结果：{是否一键包: (GitInfo, 检测时间)}
+        self._git_info: Dict[bool, Tuple[Optional[GitInfo], float]] = {}
+        self._git_info_by_executable: Dict[str, GitInfo] = {}
+        # 本地Git对象缓存，重复安装同一插件时无需再次完整下载
+        self.object_cache = GitObjectCache(max_bytes=self.config.object_cache_max_size_mb * 1024 * 1024)
         
     @classmethod
     def load_config_from_file(cls, config_path: str) -> 'EnhancedGitCloneService':
@@ -66,11 +279,7 @@ class EnhancedGitCloneService:
     def save_config_to_file(config: GitProxyConfig, config_path: str) -> None:
         """保存配置到文件"""
         try:
-            config_file = Path(config_path)
-            config_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(config_file, 'w', encoding='utf-8') as f:
-                json.dump(config.dict(), f, indent=2, ensure_ascii=False)
+            atomic_write_text(config_path, json.dumps(config.dict(), indent=2, ensure_ascii=False))
             logger.info(f"Git代理配置已保存到: {config_path}")
         except Exception as e:
             logger.error(f"保存Git代理配置失败: {e}")
@@ -103,100 +312,490 @@ class EnhancedGitCloneService:
             logger.error(f"转换镜像URL失败: {e}")
             return original_url
     
-    def _get_git_executable(self, is_onekey: bool = False) -> Optional[str]:
-        """获取Git可执行文件路径"""
-        if is_onekey:
-            # 一键包环境，查找内置git
-            try:
-                current_dir = Path(__file__).resolve().parent
-                # 向上查找到MaiBotOneKey目录
-                onekey_root = current_dir
-                while onekey_root.parent != onekey_root:
-                    if onekey_root.name == "MaiBotOneKey":
-                        break
-                    onekey_root = onekey_root.parent
-                else:
-                    # 如果没找到，尝试相对路径推算
-                    onekey_root = current_dir.parent.parent.parent
-                
-                git_path = onekey_root / "runtime" / "PortableGit" / "bin" / "git.exe"
-                if git_path.exists():
-                    return str(git_path)
-                
-                # 尝试其他可能的路径
-                alt_paths = [
-                    onekey_root / "PortableGit" / "bin" / "git.exe",
-                    onekey_root / "git" / "bin" / "git.exe",
-                ]
-                for alt_path in alt_paths:
-                    if alt_path.exists():
-                        return str(alt_path)
-                        
-            except Exception as e:
-                logger.debug(f"查找一键包Git失败: {e}")
-        
-        # 检查系统Git
+    def _find_onekey_git(self) -> Optional[str]:
+        """在一键包目录中查找内置git"""
         try:
-            result = subprocess.run(
-                ["git", "--version"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
+            current_dir = Path(__file__).resolve().parent
+            # 向上查找到MaiBotOneKey目录
+            onekey_root = current_dir
+            while onekey_root.parent != onekey_root:
+                if onekey_root.name == "MaiBotOneKey":
+                    break
+                onekey_root = onekey_root.parent
+            else:
+                # 如果没找到，尝试相对路径推算
+                onekey_root = current_dir.parent.parent.parent
+            
+            git_path = onekey_root / "runtime" / "PortableGit" / "bin" / "git.exe"
+            if git_path.exists():
+                return str(git_path)
+            
+            # 尝试其他可能的路径
+            alt_paths = [
+                onekey_root / "PortableGit" / "bin" / "git.exe",
+                onekey_root / "git" / "bin" / "git.exe",
+            ]
+            for alt_path in alt_paths:
+                if alt_path.exists():
+                    return str(alt_path)
+                    
+        except Exception as e:
+            logger.debug(f"查找一键包Git失败: {e}")
+        return None
+    
+    def detect_git(self, is_onekey: bool = False, refresh: bool = False) -> Optional[GitInfo]:
+        """
+        查找Git可执行文件并检测版本与支持的功能，结果会被缓存
+        
+        找到Git后一直使用缓存；未找到时最多每 GIT_REDETECT_SECONDS 秒重新检测一次，
+        以便安装Git后无需重启。检测会运行 git --version（阻塞操作），
+        异步代码中应通过 _get_git_executable 获取。
+        """
+        if not refresh and self._has_fresh_git_info(is_onekey):
+            return self._git_info[is_onekey][0]
+        
+        executables = [self._find_onekey_git()] if is_onekey else []
+        executables.append("git")
+        info = None
+        for executable in filter(None, executables):
+            try:
+                result = subprocess.run(
+                    [executable, "--version"],
+                    capture_output=True,
+                    text=True,
+                    timeout=5
+                )
+            except Exception:
+                continue
             if result.returncode == 0:
-                return "git"
-        except Exception:
-            pass
+                info = GitInfo(executable, result.stdout.strip())
+                break
         
-        return None
+        self._git_info[is_onekey] = (info, time.monotonic())
+        if info is None:
+            logger.warning("未找到可用的Git")
+        else:
+            self._git_info_by_executable[info.executable] = info
+            logger.info(f"检测到Git: {info.executable}（{info.version_text}），"
+                        f"部分克隆: {'支持' if info.supports_partial_clone else '不支持'}")
+        return info
     
-    async def _execute_git_clone(self, git_exe: str, clone_url: str, target_dir: Path, 
-                                timeout: int) -> Tuple[bool, str]:
-        """执行Git克隆命令"""
+    def _has_fresh_git_info(self, is_onekey: bool) -> bool:
+        """是否有无需重新检测的缓存结果"""
+        cached = self._git_info.get(is_onekey)
+        if cached is None:
+            return False
+        info, checked_at = cached
+        return info is not None or time.monotonic() - checked_at < GIT_REDETECT_SECONDS
+    
+    async def _get_git_executable(self, is_onekey: bool = False) -> Optional[str]:
+        """获取Git可执行文件路径（使用缓存的检测结果，需要重新检测时在线程中进行，不阻塞事件循环）"""
+        if self._has_fresh_git_info(is_onekey):
+            info = self._git_info[is_onekey][0]
+        else:
+            info = await asyncio.to_thread(self.detect_git, is_onekey)
+        return info.executable if info else None
+    
+    def _git_capabilities(self, git_exe: str) -> GitInfo:
+        """获取Git可执行文件的功能信息（未检测过时按未知版本处理）"""
+        return self._git_info_by_executable.get(git_exe) or GitInfo(git_exe, "")
+    
+    def _build_candidates(self, repository_url: str) -> List[Tuple[str, str, int]]:
+        """按配置生成候选克隆地址 (镜像名称, URL, 超时)，顺序为配置的优先级"""
+        candidates: List[Tuple[str, str, int]] = []
+
+        if self.config.enabled and self.config.mirrors:
+            sorted_mirrors = sorted(
+                [m for m in self.config.mirrors if m.enabled],
+                key=lambda x: x.priority
+            )
+            for mirror in sorted_mirrors:
+                mirror_url = self._convert_github_url_to_mirror(repository_url, mirror)
+                candidates.append((mirror.name, mirror_url, mirror.timeout))
+
+        # 如果启用了fallback或没有可用镜像，添加原始URL
+        if self.config.fallback_to_original or not candidates:
+            candidates.append(("原始地址", repository_url, self.config.timeout))
+
+        return candidates
+
+    def _rank_candidates(self, candidates: List[Tuple[str, str, int]]) -> List[Tuple[str, str, int]]:
+        """按镜像健康度重新排序候选地址（熔断中的镜像排在最后）"""
+        by_name = {candidate[0]: candidate for candidate in candidates}
+        return [by_name[name] for name in self.mirror_health.rank(by_name)]
+
+    def get_mirror_stats(self, repository_url: str = PROBE_REPOSITORY_URL) -> List[dict]:
+        """获取各候选镜像的健康度统计（按当前排名）"""
+        candidates = self._rank_candidates(self._build_candidates(repository_url))
+        return self.mirror_health.snapshot(name for name, _, _ in candidates)
+
+    async def _probe_mirror(self, git_exe: str, name: str, url: str, timeout: float) -> dict:
+        """
+        使用 git ls-remote 探测单个镜像
+
+        以收到第一行输出的时间作为首字节延迟，拿到后立即结束进程，不等待完整的引用列表。
+        """
+        start_time = time.perf_counter()
+        process = None
         try:
-            cmd = [git_exe, "clone", "--depth", "1", clone_url, str(target_dir)]
-            logger.info(f"执行Git克隆: {' '.join(cmd)}")
-            
-            # 使用asyncio.create_subprocess_exec执行异步命令
             process = await asyncio.create_subprocess_exec(
-                *cmd,
+                git_exe, "ls-remote", url, "HEAD",
                 stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stderr=asyncio.subprocess.PIPE,
+                env=_git_env()
+            )
+            first_line = await asyncio.wait_for(process.stdout.readline(), timeout=timeout)
+            latency = time.perf_counter() - start_time
+            if first_line:
+                self.mirror_health.record_success(name, latency)
+                return {"name": name, "success": True, "latencyMs": round(latency * 1000, 1)}
+
+            # 没有输出：进程已结束，读取错误信息
+            await asyncio.wait_for(process.wait(), timeout=timeout)
+            error_msg = (await process.stderr.read()).decode('utf-8', errors='ignore').strip()
+            error_msg = error_msg or f"git ls-remote 退出码 {process.returncode}"
+        except asyncio.TimeoutError:
+            error_msg = f"探测超时 ({timeout}秒)"
+        except Exception as e:
+            error_msg = f"探测异常: {e}"
+        finally:
+            if process is not None and process.returncode is None:
+                await _kill_process(process)
+
+        latency = time.perf_counter() - start_time
+        self.mirror_health.record_failure(name, error_msg, latency)
+        return {"name": name, "success": False, "latencyMs": round(latency * 1000, 1), "error": error_msg}
+
+    async def probe_mirrors(self, repository_url: str = PROBE_REPOSITORY_URL,
+                            is_onekey: bool = False) -> List[dict]:
+        """
+        并发探测所有候选镜像并更新健康度统计
+
+        Args:
+            repository_url: 用于探测的仓库URL
+            is_onekey: 是否为一键包环境
+
+        Returns:
+            List[dict]: 各镜像的探测结果
+        """
+        git_exe = await self._get_git_executable(is_onekey)
+        if not git_exe:
+            raise RuntimeError("未找到Git可执行文件，请检查Git安装")
+
+        candidates = self._build_candidates(repository_url)
+        timeout = self.config.probe_timeout
+        results = await asyncio.gather(*(
+            self._probe_mirror(git_exe, name, url, min(timeout, mirror_timeout))
+            for name, url, mirror_timeout in candidates
+        ))
+        logger.info("镜像探测完成: " + ", ".join(
+            f"{r['name']}={r['latencyMs']}ms" if r['success'] else f"{r['name']}=失败"
+            for r in results
+        ))
+        return list(results)
+
+    async def _run_git(self, cmd: List[str], timeout: float, cwd: Optional[Path] = None,
+                       on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Tuple[Optional[int], str, str]:
+        """
+        运行git命令（被取消时会终止git进程）
+
+        Returns:
+            (退出码, stdout, stderr最后几行非进度输出)，超时时退出码为 None
+        """
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            cwd=str(cwd) if cwd else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=_git_env()
+        )
+        try:
+            stdout, output, _ = await asyncio.wait_for(
+                asyncio.gather(process.stdout.read(), _read_git_output(process.stderr, on_progress), process.wait()),
+                timeout=timeout
             )
+        except asyncio.TimeoutError:
+            # 超时，终止进程
+            await _kill_process(process)
+            return None, "", ""
+        except asyncio.CancelledError:
+            await _kill_process(process)
+            raise
+        return process.returncode, stdout.decode('utf-8', errors='ignore').strip(), output
+
+    def _transfer_command(self, git_exe: str, action: str, on_progress: Optional[Callable] = None) -> List[str]:
+        """
+        构造 clone/fetch 命令前缀
+
+        安装插件只需要最新快照，浅克隆（--depth 1）只传输最新提交的文件，
+        比部分克隆（--filter=blob:none，检出时仍要按需下载同样的文件）更省流量与往返。
+        """
+        # 传输速度持续低于 lowSpeedLimit 字节/秒达到 lowSpeedTime 秒即中止，避免卡死的镜像耗尽整个超时
+        cmd = [
+            git_exe,
+            "-c", f"http.lowSpeedLimit={LOW_SPEED_LIMIT}",
+            "-c", f"http.lowSpeedTime={LOW_SPEED_TIME}",
+            action, "--depth", "1"
+        ]
+        if on_progress is not None and self._git_capabilities(git_exe).supports_progress:
+            # stderr 不是终端时git默认不输出进度
+            cmd.append("--progress")
+        return cmd
+
+    async def _execute_git_clone(self, git_exe: str, clone_url: str, target_dir: Path, 
+                                timeout: int,
+                                on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Tuple[bool, str]:
+        """执行Git克隆命令（被取消时会终止git进程），提供 on_progress 时逐行回报克隆进度"""
+        try:
+            cmd = self._transfer_command(git_exe, "clone", on_progress) + [clone_url, str(target_dir)]
+            logger.info(f"执行Git克隆: {' '.join(cmd)}")
             
-            try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(), 
-                    timeout=timeout
-                )
-                
-                if process.returncode == 0:
-                    return True, "克隆成功"
-                else:
-                    error_msg = stderr.decode('utf-8', errors='ignore').strip()
-                    return False, f"Git克隆失败: {error_msg}"
-                    
-            except asyncio.TimeoutError:
-                # 超时，终止进程
-                try:
-                    process.terminate()
-                    await asyncio.wait_for(process.wait(), timeout=5)
-                except Exception:
-                    process.kill()
+            returncode, _, output = await self._run_git(cmd, timeout, on_progress=on_progress)
+            if returncode is None:
                 return False, f"Git克隆超时 ({timeout}秒)"
+            if returncode == 0:
+                return True, "克隆成功"
+            return False, f"Git克隆失败: {output}"
                 
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             return False, f"执行Git克隆异常: {str(e)}"
+
+    async def _clone_single(self, git_exe: str, candidate: Tuple[str, str, int], target_dir: Path,
+                            on_progress: Optional[ProgressCallback] = None) -> Tuple[bool, str]:
+        """使用单个镜像克隆，并记录镜像健康度"""
+        name, clone_url, timeout = candidate
+        start_time = time.perf_counter()
+        if on_progress is not None:
+            on_progress({"event": "attempt", "mirror": name})
+            report = lambda progress: on_progress({"event": "progress", "mirror": name, **progress})
+        else:
+            report = None
+        success, message = await self._execute_git_clone(git_exe, clone_url, target_dir, timeout, report)
+        if success:
+            # 整体克隆耗时取决于仓库大小，不计入延迟，只更新成功率
+            self.mirror_health.record_success(name)
+        else:
+            self.mirror_health.record_failure(name, message, time.perf_counter() - start_time)
+            await remove_tree(target_dir)
+        return success, message
+
+    async def _race_clone(self, git_exe: str, pair: List[Tuple[str, str, int]], target_dir: Path,
+                          on_progress: Optional[ProgressCallback] = None) -> Tuple[Optional[str], str]:
+        """
+        同时使用两个镜像克隆到各自的临时目录，先成功者移动到目标目录，另一个被取消
+
+        Returns:
+            (成功的镜像名称, 最后的错误信息)，都失败时镜像名称为 None
+        """
+        temp_dirs = {
+            candidate[0]: target_dir.with_name(f".{target_dir.name}.clone-{index}")
+            for index, candidate in enumerate(pair)
+        }
+        for temp_dir in temp_dirs.values():
+            await remove_tree(temp_dir)
+
+        tasks = {
+            asyncio.create_task(
+                self._clone_single(git_exe, candidate, temp_dirs[candidate[0]], on_progress)
+            ): candidate[0]
+            for candidate in pair
+        }
+        winner: Optional[str] = None
+        moved = False
+        last_error = ""
+        try:
+            pending = set(tasks)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    success, message = task.result()
+                    if success and winner is None:
+                        winner = tasks[task]
+                    elif not success:
+                        last_error = message
+                        logger.warning(f"{tasks[task]} 克隆失败: {message}")
+            if winner is not None:
+                await asyncio.to_thread(os.replace, temp_dirs[winner], target_dir)
+                moved = True
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # 失败或被取消时也要删除临时目录
+            for name, temp_dir in temp_dirs.items():
+                if not (moved and name == winner):
+                    await remove_tree(temp_dir)
+        return winner, last_error
     
+    async def _ls_remote_head(self, git_exe: str, candidate: Tuple[str, str, int]) -> Tuple[Optional[str], str]:
+        """
+        使用 git ls-remote --symref 获取镜像上的默认分支名，并记录镜像健康度
+
+        Returns:
+            (分支名, 错误信息)，失败时分支名为 None
+        """
+        name, url, mirror_timeout = candidate
+        timeout = min(self.config.probe_timeout, mirror_timeout)
+        start_time = time.perf_counter()
+        returncode, stdout, output = await self._run_git([git_exe, "ls-remote", "--symref", url, "HEAD"], timeout)
+        latency = time.perf_counter() - start_time
+        if returncode == 0 and stdout:
+            self.mirror_health.record_success(name, latency)
+            match = _SYMREF_PATTERN.search(stdout)
+            return match.group(1) if match else CACHE_FALLBACK_BRANCH, ""
+        error = f"{name}: " + (f"超时 ({timeout}秒)" if returncode is None else (output or "未返回默认分支"))
+        self.mirror_health.record_failure(name, error, latency)
+        return None, error
+
+    async def _race_ls_remote(self, git_exe: str,
+                              pair: List[Tuple[str, str, int]]) -> Tuple[Optional[Tuple[str, str, int]], Optional[str], List[str]]:
+        """
+        同时向两个镜像查询默认分支，先成功者胜出，另一个被取消
+
+        Returns:
+            (胜出的镜像, 分支名, 失败镜像的错误信息列表)
+        """
+        tasks = {asyncio.create_task(self._ls_remote_head(git_exe, candidate)): candidate for candidate in pair}
+        errors: List[str] = []
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    branch, error = task.result()
+                    if branch is not None:
+                        return tasks[task], branch, errors
+                    errors.append(error)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return None, None, errors
+
+    async def _fetch_into_cache(self, git_exe: str, repository_url: str, cache_dir: Path,
+                                on_progress: Optional[ProgressCallback]) -> Tuple[Optional[str], Set[str], str]:
+        """
+        把远程默认分支的最新提交拉取到缓存裸仓库
+
+        镜像选择与直接克隆相同：按健康度排序，开启 race_top_mirrors 时前两个镜像同时查询默认分支，
+        先响应者用于拉取；缓存的 HEAD 指向远程的真实默认分支。
+
+        Returns:
+            (成功的镜像名称, 失败过的镜像名称, 最后的错误信息)，都失败时镜像名称为 None
+        """
+        candidates = self._build_candidates(repository_url)
+        failed: Set[str] = set()
+        last_error = ""
+        for round_index in range(1, self.config.retry_count + 1):
+            ranked = self._rank_candidates(candidates)
+            while ranked:
+                if self.config.race_top_mirrors and len(ranked) >= 2 and \
+                        all(self.mirror_health.is_available(name) for name, _, _ in ranked[:2]):
+                    pair, ranked = ranked[:2], ranked[2:]
+                    candidate, branch, errors = await self._race_ls_remote(git_exe, pair)
+                    # 未胜出但也未失败（被取消）的镜像放回队首，胜出者失败时接着尝试
+                    failed_names = {name for name, _, _ in pair if any(error.startswith(f"{name}: ") for error in errors)}
+                    failed.update(failed_names)
+                    ranked = [c for c in pair if c is not candidate and c[0] not in failed_names] + ranked
+                    if errors:
+                        last_error = errors[-1]
+                else:
+                    candidate, ranked = ranked[0], ranked[1:]
+                    branch, error = await self._ls_remote_head(git_exe, candidate)
+                    if branch is None:
+                        failed.add(candidate[0])
+                        last_error = error
+                if candidate is None or branch is None:
+                    continue
+
+                name, fetch_url, timeout = candidate
+                if on_progress is not None:
+                    on_progress({"event": "attempt", "mirror": name})
+                    report = lambda progress, name=name: on_progress({"event": "progress", "mirror": name, **progress})
+                else:
+                    report = None
+                cmd = self._transfer_command(git_exe, "fetch", report) + [
+                    fetch_url, f"+refs/heads/{branch}:refs/heads/{branch}"
+                ]
+                attempt_start = time.perf_counter()
+                returncode, _, output = await self._run_git(cmd, timeout, cwd=cache_dir, on_progress=report)
+                if returncode == 0:
+                    self.mirror_health.record_success(name)
+                    await self._run_git([git_exe, "symbolic-ref", "HEAD", f"refs/heads/{branch}"],
+                                        GIT_LOCAL_TIMEOUT, cwd=cache_dir)
+                    return name, failed - {name}, ""
+                last_error = f"Git拉取超时 ({timeout}秒)" if returncode is None else f"Git拉取失败: {output}"
+                self.mirror_health.record_failure(name, last_error, time.perf_counter() - attempt_start)
+                failed.add(name)
+                logger.warning(f"{name} 拉取失败: {last_error}")
+            if round_index < self.config.retry_count:
+                await asyncio.sleep(self.config.retry_delay)
+        return None, failed, last_error
+
+    async def _clone_via_cache(self, git_exe: str, repository_url: str, target_dir: Path,
+                               on_progress: Optional[ProgressCallback]) -> Tuple[Optional[str], Set[str], str]:
+        """
+        通过本地对象缓存克隆：先把远程最新提交拉取到缓存裸仓库（已有对象不再下载），
+        再从缓存本地克隆（同一文件系统上使用硬链接）
+
+        Returns:
+            (拉取时使用的镜像名称, 拉取失败的镜像名称, 最后的错误信息)；
+            镜像名称为 None 时调用方改用直接克隆，并跳过已失败的镜像
+        """
+        cache = self.object_cache
+        cache_dir = cache.path_for(repository_url)
+        async with cache.lock(repository_url):
+            if not (cache_dir / "HEAD").exists():
+                await asyncio.to_thread(cache_dir.parent.mkdir, parents=True, exist_ok=True)
+                returncode, _, output = await self._run_git(
+                    [git_exe, "init", "--bare", "--quiet", str(cache_dir)], GIT_LOCAL_TIMEOUT
+                )
+                if returncode != 0:
+                    logger.warning(f"创建Git缓存仓库失败: {output}")
+                    return None, set(), output
+
+            mirror_used, failed, last_error = await self._fetch_into_cache(
+                git_exe, repository_url, cache_dir, on_progress
+            )
+            if mirror_used is None:
+                logger.warning(f"拉取到Git缓存失败: {last_error}")
+                return None, failed, last_error
+
+            returncode, _, output = await self._run_git(
+                [git_exe, "clone", "--quiet", str(cache_dir), str(target_dir)], GIT_LOCAL_TIMEOUT
+            )
+            if returncode != 0:
+                # 缓存可能已损坏，删除后改为直接克隆
+                logger.warning(f"从Git缓存克隆失败，已清除该缓存: {output}")
+                await remove_tree(target_dir)
+                await asyncio.to_thread(cache.remove, repository_url)
+                return None, failed, output
+
+            # origin 指向原始仓库，而不是本地缓存目录
+            await self._run_git([git_exe, "remote", "set-url", "origin", repository_url],
+                                GIT_LOCAL_TIMEOUT, cwd=target_dir)
+            await asyncio.to_thread(cache.record_use, repository_url)
+        return mirror_used, failed, ""
+
     async def clone_repository(self, repository_url: str, target_dir: Path, 
-                             is_onekey: bool = False) -> GitCloneResult:
+                             is_onekey: bool = False,
+                             on_progress: Optional[ProgressCallback] = None) -> GitCloneResult:
         """
         克隆Git仓库，支持代理加速、重试和fallback
+
+        镜像按健康度（首字节延迟与成功率）动态排序，熔断中的镜像只在其他镜像都不可用时尝试；
+        每轮依次尝试所有镜像，最多 retry_count 轮。
         
         Args:
             repository_url: 原始仓库URL
             target_dir: 目标目录
             is_onekey: 是否为一键包环境
+            on_progress: 进度回调，开始尝试镜像时收到 {event: "attempt", mirror}，
+                克隆过程中收到 {event: "progress", mirror, phase, percent, overall}
             
         Returns:
             GitCloneResult: 克隆结果
@@ -205,7 +804,7 @@ class EnhancedGitCloneService:
         total_attempts = 0
         
         # 检查Git可执行文件
-        git_exe = self._get_git_executable(is_onekey)
+        git_exe = await self._get_git_executable(is_onekey)
         if not git_exe:
             return GitCloneResult(
                 success=False,
@@ -218,68 +817,78 @@ class EnhancedGitCloneService:
         logger.info(f"使用Git: {git_exe}")
         logger.info(f"代理配置启用: {self.config.enabled}")
         
-        # 如果目标目录存在，先删除
-        if target_dir.exists():
-            import shutil
-            shutil.rmtree(target_dir)
-        
-        # 准备克隆URL列表
-        clone_urls = []
+        # 如果目标目录存在，先删除（移到回收目录后台删除，不阻塞克隆）
+        await remove_tree(target_dir)
         
-        if self.config.enabled and self.config.mirrors:
-            # 按优先级排序镜像
-            sorted_mirrors = sorted(
-                [m for m in self.config.mirrors if m.enabled],
-                key=lambda x: x.priority
-            )
-            
-            # 为每个镜像生成克隆URL
-            for mirror in sorted_mirrors:
-                mirror_url = self._convert_github_url_to_mirror(repository_url, mirror)
-                clone_urls.append((mirror_url, mirror.name, mirror.timeout))
-                logger.info(f"添加镜像: {mirror.name}")
-                logger.info(f"  原始URL: {repository_url}")
-                logger.info(f"  镜像URL: {mirror_url}")
-        
-        # 如果启用了fallback或没有可用镜像，添加原始URL
-        if self.config.fallback_to_original or not clone_urls:
-            clone_urls.append((repository_url, "原始地址", self.config.timeout))
-            logger.info(f"添加原始地址: {repository_url}")
+        candidates = self._build_candidates(repository_url)
+
+        # 还没有任何统计数据时先并发探测一次，避免按静态优先级撞上不可用的镜像
+        if (self.config.probe_before_clone and len(candidates) > 1 and
+                all(self.mirror_health.get(name).updated_at is None for name, _, _ in candidates)):
+            await self.probe_mirrors(repository_url, is_onekey)
         
-        # 依次尝试每个URL
         last_error = ""
-        for clone_url, mirror_name, timeout in clone_urls:
-            logger.info(f"尝试使用 {mirror_name} 克隆...")
-            
-            # 对每个镜像进行重试
-            for attempt in range(1, self.config.retry_count + 1):
-                total_attempts += 1
-                logger.info(f"第 {attempt}/{self.config.retry_count} 次尝试 {mirror_name}")
-                
-                success, message = await self._execute_git_clone(
-                    git_exe, clone_url, target_dir, timeout
+        if self.config.object_cache_enabled and self._git_capabilities(git_exe).supports_shallow_local_clone:
+            mirror_used, failed, last_error = await self._clone_via_cache(git_exe, repository_url, target_dir, on_progress)
+            if mirror_used is not None:
+                duration = time.time() - start_time
+                logger.info(f"克隆成功（经本地缓存）！使用 {mirror_used}，耗时 {duration:.2f} 秒")
+                return GitCloneResult(
+                    success=True,
+                    message="克隆成功",
+                    mirror_used=mirror_used,
+                    attempts=1,
+                    duration=duration
                 )
-                
-                if success:
+            # 拉取到缓存时已按轮次重试过的镜像不再直接克隆
+            candidates = [candidate for candidate in candidates if candidate[0] not in failed]
+            if not candidates:
+                duration = time.time() - start_time
+                logger.error(f"所有镜像均不可用，总耗时 {duration:.2f} 秒")
+                return GitCloneResult(
+                    success=False,
+                    message=f"所有克隆尝试均失败。最后错误: {last_error}",
+                    attempts=len(failed),
+                    duration=duration
+                )
+            logger.info(f"改为直接克隆，跳过已失败的镜像: {', '.join(sorted(failed)) or '无'}")
+        
+        for round_index in range(1, self.config.retry_count + 1):
+            ranked = self._rank_candidates(candidates)
+            logger.info(f"第 {round_index}/{self.config.retry_count} 轮，镜像顺序: {', '.join(name for name, _, _ in ranked)}")
+
+            while ranked:
+                if self.config.race_top_mirrors and len(ranked) >= 2 and \
+                        all(self.mirror_health.is_available(name) for name, _, _ in ranked[:2]):
+                    pair, ranked = ranked[:2], ranked[2:]
+                    total_attempts += 2
+                    logger.info(f"同时尝试 {pair[0][0]} 与 {pair[1][0]} 克隆...")
+                    mirror_used, message = await self._race_clone(git_exe, pair, target_dir, on_progress)
+                else:
+                    candidate, ranked = ranked[0], ranked[1:]
+                    total_attempts += 1
+                    logger.info(f"尝试使用 {candidate[0]} 克隆...")
+                    success, message = await self._clone_single(git_exe, candidate, target_dir, on_progress)
+                    mirror_used = candidate[0] if success else None
+                    if not success:
+                        logger.warning(f"{candidate[0]} 克隆失败: {message}")
+
+                if mirror_used is not None:
                     duration = time.time() - start_time
-                    logger.info(f"克隆成功！使用 {mirror_name}，耗时 {duration:.2f} 秒")
+                    logger.info(f"克隆成功！使用 {mirror_used}，耗时 {duration:.2f} 秒")
                     return GitCloneResult(
                         success=True,
                         message="克隆成功",
-                        mirror_used=mirror_name,
+                        mirror_used=mirror_used,
                         attempts=total_attempts,
                         duration=duration
                     )
-                
                 last_error = message
-                logger.warning(f"{mirror_name} 第 {attempt} 次尝试失败: {message}")
-                
-                # 如果不是最后一次尝试，等待重试延迟
-                if attempt < self.config.retry_count:
-                    logger.info(f"等待 {self.config.retry_delay} 秒后重试...")
-                    await asyncio.sleep(self.config.retry_delay)
-            
-            logger.error(f"{mirror_name} 所有尝试均失败")
+
+            # 如果不是最后一轮，等待重试延迟
+            if round_index < self.config.retry_count:
+                logger.info(f"等待 {self.config.retry_delay} 秒后重试...")
+                await asyncio.sleep(self.config.retry_delay)
         
         # 所有尝试都失败了
         duration = time.time() - start_time
@@ -292,6 +901,171 @@ class EnhancedGitCloneService:
             duration=duration
         )
     
+    async def get_local_head(self, target_dir: Path, is_onekey: bool = False) -> Optional[str]:
+        """获取本地仓库当前提交，不是Git仓库时返回 None"""
+        git_exe = await self._get_git_executable(is_onekey)
+        if not git_exe or not (target_dir / ".git").exists():
+            return None
+        returncode, stdout, _ = await self._run_git([git_exe, "rev-parse", "HEAD"], GIT_LOCAL_TIMEOUT, cwd=target_dir)
+        return stdout if returncode == 0 and stdout else None
+
+    async def get_origin_url(self, target_dir: Path, is_onekey: bool = False) -> Optional[str]:
+        """获取本地仓库的 origin 地址（已去掉镜像前缀）"""
+        git_exe = await self._get_git_executable(is_onekey)
+        if not git_exe or not (target_dir / ".git").exists():
+            return None
+        returncode, stdout, _ = await self._run_git(
+            [git_exe, "config", "--get", "remote.origin.url"], GIT_LOCAL_TIMEOUT, cwd=target_dir
+        )
+        return normalize_repository_url(stdout) if returncode == 0 and stdout else None
+
+    async def get_remote_head(self, repository_url: str, is_onekey: bool = False) -> Tuple[Optional[str], str]:
+        """
+        使用 git ls-remote 获取远程仓库默认分支的最新提交
+
+        按镜像健康度依次尝试，首个成功的镜像即返回。
+
+        Returns:
+            (提交哈希, 错误信息)，失败时提交哈希为 None
+        """
+        git_exe = await self._get_git_executable(is_onekey)
+        if not git_exe:
+            return None, "未找到Git可执行文件，请检查Git安装"
+
+        candidates = self._rank_candidates(self._build_candidates(repository_url))
+        available = [c for c in candidates if self.mirror_health.is_available(c[0])] or candidates
+        last_error = ""
+        for name, url, mirror_timeout in available:
+            timeout = min(self.config.probe_timeout, mirror_timeout)
+            start_time = time.perf_counter()
+            returncode, stdout, output = await self._run_git([git_exe, "ls-remote", url, "HEAD"], timeout)
+            latency = time.perf_counter() - start_time
+            if returncode == 0 and stdout:
+                self.mirror_health.record_success(name, latency)
+                return stdout.split()[0], ""
+            last_error = f"{name}: " + (f"超时 ({timeout}秒)" if returncode is None else (output or "未返回提交"))
+            self.mirror_health.record_failure(name, last_error, latency)
+        return None, last_error
+
+    async def _fill_commit_delta(self, git_exe: str, target_dir: Path, result: GitUpdateResult) -> None:
+        """补充更新前后的提交说明与文件变更统计"""
+        _, subject, _ = await self._run_git([git_exe, "log", "-1", "--format=%s"], GIT_LOCAL_TIMEOUT, cwd=target_dir)
+        result.commit_subject = subject or None
+        if not result.old_commit or not result.updated:
+            return
+        # 浅克隆没有中间历史，无法统计提交数量，只比较两个提交的文件树
+        returncode, stat, _ = await self._run_git(
+            [git_exe, "diff", "--shortstat", result.old_commit, result.new_commit],
+            GIT_LOCAL_TIMEOUT, cwd=target_dir
+        )
+        match = _SHORTSTAT_PATTERN.search(stat) if returncode == 0 else None
+        if match:
+            result.files_changed = int(match.group(1))
+            result.insertions = int(match.group(2) or 0)
+            result.deletions = int(match.group(3) or 0)
+
+    async def _update_by_reclone(self, git_exe: str, repository_url: str, target_dir: Path,
+                                 is_onekey: bool, on_progress: Optional[ProgressCallback],
+                                 old_commit: Optional[str], start_time: float) -> GitUpdateResult:
+        """重新克隆到临时目录后替换，保留旧目录中仓库里没有的文件"""
+        temp_dir = target_dir.with_name(f".{target_dir.name}.update")
+        clone_result = await self.clone_repository(repository_url, temp_dir, is_onekey, on_progress)
+        if not clone_result.success:
+            return GitUpdateResult(False, clone_result.message, "clone", clone_result.mirror_used,
+                                   old_commit, duration=time.time() - start_time)
+
+        if await asyncio.to_thread(target_dir.exists):
+            await asyncio.to_thread(_preserve_local_files, target_dir, temp_dir)
+            await remove_tree(target_dir)
+        await asyncio.to_thread(os.replace, temp_dir, target_dir)
+        result = GitUpdateResult(True, "更新成功（重新克隆）", "clone", clone_result.mirror_used, old_commit)
+        result.new_commit = await self.get_local_head(target_dir, is_onekey)
+        await self._fill_commit_delta(git_exe, target_dir, result)
+        result.duration = time.time() - start_time
+        return result
+
+    async def _fetch_with_mirrors(self, git_exe: str, repository_url: str, repo_dir: Path, refspec: str,
+                                  on_progress: Optional[ProgressCallback] = None) -> Tuple[Optional[str], str]:
+        """
+        在 repo_dir 中执行 git fetch --depth 1，按镜像健康度依次尝试，最多 retry_count 轮
+
+        Returns:
+            (成功的镜像名称, 最后的错误信息)，都失败时镜像名称为 None
+        """
+        last_error = ""
+        for round_index in range(1, self.config.retry_count + 1):
+            for name, fetch_url, timeout in self._rank_candidates(self._build_candidates(repository_url)):
+                if on_progress is not None:
+                    on_progress({"event": "attempt", "mirror": name})
+                    report = lambda progress, name=name: on_progress({"event": "progress", "mirror": name, **progress})
+                else:
+                    report = None
+                cmd = self._transfer_command(git_exe, "fetch", report) + [fetch_url, refspec]
+                attempt_start = time.perf_counter()
+                returncode, _, output = await self._run_git(cmd, timeout, cwd=repo_dir, on_progress=report)
+                if returncode == 0:
+                    self.mirror_health.record_success(name)
+                    return name, ""
+                last_error = f"Git拉取超时 ({timeout}秒)" if returncode is None else f"Git拉取失败: {output}"
+                self.mirror_health.record_failure(name, last_error, time.perf_counter() - attempt_start)
+                logger.warning(f"{name} 拉取失败: {last_error}")
+            if round_index < self.config.retry_count:
+                await asyncio.sleep(self.config.retry_delay)
+        return None, last_error
+
+    async def update_repository(self, repository_url: str, target_dir: Path, is_onekey: bool = False,
+                                on_progress: Optional[ProgressCallback] = None) -> GitUpdateResult:
+        """
+        更新已克隆的仓库
+
+        在现有目录中 git fetch --depth 1 后 reset --hard 到远程最新提交（未跟踪的文件保留），
+        目录不是Git仓库或本地仓库损坏时改为重新克隆。
+
+        Args:
+            repository_url: 原始仓库URL
+            target_dir: 仓库目录
+            is_onekey: 是否为一键包环境
+            on_progress: 进度回调，格式同 clone_repository
+
+        Returns:
+            GitUpdateResult: 更新结果（包含更新前后的提交与文件变更统计）
+        """
+        start_time = time.time()
+        git_exe = await self._get_git_executable(is_onekey)
+        if not git_exe:
+            return GitUpdateResult(False, "未找到Git可执行文件，请检查Git安装", duration=time.time() - start_time)
+
+        old_commit = await self.get_local_head(target_dir, is_onekey)
+        if old_commit is None:
+            logger.info(f"{target_dir} 不是有效的Git仓库，改为重新克隆")
+            return await self._update_by_reclone(git_exe, repository_url, target_dir, is_onekey,
+                                                 on_progress, None, start_time)
+
+        logger.info(f"开始更新仓库: {repository_url} -> {target_dir}（当前提交 {old_commit[:8]}）")
+        mirror_used, last_error = await self._fetch_with_mirrors(
+            git_exe, repository_url, target_dir, "HEAD", on_progress
+        )
+        if mirror_used is None:
+            return GitUpdateResult(False, f"所有拉取尝试均失败。最后错误: {last_error}", "fetch",
+                                   old_commit=old_commit, duration=time.time() - start_time)
+
+        returncode, _, output = await self._run_git(
+            [git_exe, "reset", "--hard", "FETCH_HEAD"], GIT_LOCAL_TIMEOUT, cwd=target_dir
+        )
+        if returncode != 0:
+            logger.warning(f"重置到最新提交失败，改为重新克隆: {output}")
+            return await self._update_by_reclone(git_exe, repository_url, target_dir, is_onekey,
+                                                 on_progress, old_commit, start_time)
+
+        result = GitUpdateResult(True, "更新成功", "fetch", mirror_used, old_commit)
+        result.new_commit = await self.get_local_head(target_dir, is_onekey)
+        if not result.updated:
+            result.message = "已是最新版本"
+        await self._fill_commit_delta(git_exe, target_dir, result)
+        result.duration = time.time() - start_time
+        logger.info(f"仓库更新完成: {old_commit[:8]} -> {(result.new_commit or '')[:8]}，耗时 {result.duration:.2f} 秒")
+        return result
+
     def get_config(self) -> GitProxyConfig:
         """获取当前配置"""
         return self.config
@@ -299,6 +1073,7 @@ class EnhancedGitCloneService:
     def update_config(self, new_config: GitProxyConfig) -> None:
         """更新配置"""
         self.config = new_config
+        self.object_cache.max_bytes = new_config.object_cache_max_size_mb * 1024 * 1024
         logger.info("Git代理配置已更新")
     
     def add_mirror(self, mirror: GitProxyMirror) -> None:
@@ -344,7 +1119,9 @@ def get_git_clone_service() -> EnhancedGitCloneService:
 
 
 def initialize_git_clone_service(config_path: str = "config/git_proxy.json") -> None:
-    """初始化Git克隆服务"""
+    """初始化Git克隆服务（加载配置并检测Git）"""
     global git_clone_service
     git_clone_service = EnhancedGitCloneService.load_config_from_file(config_path)
+    from routes.system import is_onekey_environment
+    git_clone_service.detect_git(is_onekey_environment())
     logger.info("Git克隆服务已初始化")
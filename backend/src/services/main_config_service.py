@@ -5,9 +5,8 @@ Main Configuration Service
 """
 
 import os
-import shutil
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List, Union
 
 import toml
 import tomlkit
@@ -21,6 +20,12 @@ from models.config import (
     ConfigServiceOptions
 )
 from utils.toml_helpers import stringify_config_to_clean_toml
+from utils.config_cache import config_file_cache, ConfigReadError, ConfigParseError
+from utils.toml_patch import parse_patch, patch_toml_file, write_toml_document
+from utils.atomic_file import atomic_write_text
+from utils.backup_store import BackupStore
+from utils.config_history import ConfigHistory
+from utils.config_schema import ConfigSchema, changed_sections
 
 
 class MainConfigService:
@@ -87,23 +92,18 @@ class MainConfigService:
             if not file_info.readable:
                 raise PermissionError(f'主程序配置文件不可读: {config_path}')
             
-            # 读取文件内容
+            # 读取并解析文件内容（文件未变化时直接使用缓存）
             try:
-                with open(config_path, 'r', encoding=opts.encoding) as f:
-                    file_content = f.read()
-            except Exception as error:
+                config = config_file_cache.get_model(config_path, MainConfigData, opts.encoding)
+            except ConfigReadError as error:
                 logger.error(f'读取主程序配置文件失败: {error}')
                 raise RuntimeError(f'读取主程序配置文件失败: {error}')
-            
-            # 解析TOML内容
-            try:
-                config_data = toml.loads(file_content)
-            except Exception as error:
+            except ConfigParseError as error:
                 logger.error(f'解析主程序配置文件失败: {error}')
                 raise ValueError(f'主程序配置文件格式错误: {error}')
             
             logger.info('主程序配置读取成功')
-            return MainConfigData(**config_data)
+            return config
             
         except Exception as error:
             logger.error(f'获取主程序配置失败: {error}')
@@ -127,10 +127,6 @@ class MainConfigService:
             if not update_dict:
                 raise ValueError('更新数据不能为空')
             
-            # 验证更新数据格式
-            if opts.validate:
-                cls._validate_config_data(update_dict)
-            
             # 检查文件状态
             file_info = await cls.get_config_file_info()
             
@@ -150,6 +146,11 @@ class MainConfigService:
                 config_dir = os.path.dirname(config_path)
                 os.makedirs(config_dir, exist_ok=True)
             
+            # 只校验与当前配置不同的配置节
+            sections = changed_sections(current_config, update_dict)
+            if opts.validate:
+                cls._validate_config_data(update_dict, sections)
+            
             # 合并配置数据
             merged_config = cls._merge_config(current_config, update_dict)
             
@@ -160,28 +161,29 @@ class MainConfigService:
             # 转换为TOML格式并写入文件
             try:
                 if file_info.exists:
-                    # 如果文件存在，使用tomlkit保留注释和格式
-                    with open(config_path, 'r', encoding=opts.encoding) as f:
-                        original_content = f.read()
-                    
-                    # 使用tomlkit解析原始内容
-                    doc = tomlkit.parse(original_content)
-                    
-                    # 更新配置值
-                    cls._update_tomlkit_doc(doc, merged_config)
-                    
-                    # 写入更新后的内容
-                    with open(config_path, 'w', encoding=opts.encoding) as f:
-                        f.write(tomlkit.dumps(doc))
+                    # 如果文件存在，在缓存的tomlkit文档上只更新变化的配置节，保留注释和格式
+                    entry = config_file_cache.load(config_path, opts.encoding)
+                    try:
+                        cls._update_tomlkit_doc(
+                            entry.document,
+                            {key: merged_config[key] for key in sections if key in merged_config}
+                        )
+                        write_toml_document(config_path, entry, sections, opts.encoding)
+                    except Exception:
+                        # 缓存中的文档可能已被部分修改，丢弃后下次重新解析
+                        config_file_cache.invalidate(config_path)
+                        raise
                 else:
                     # 如果是新文件，使用标准方法
                     toml_content = stringify_config_to_clean_toml(merged_config, toml)
-                    with open(config_path, 'w', encoding=opts.encoding) as f:
-                        f.write(toml_content)
+                    atomic_write_text(config_path, toml_content, opts.encoding)
             except Exception as error:
                 logger.error(f'写入主程序配置文件失败: {error}')
                 raise RuntimeError(f'写入主程序配置文件失败: {error}')
             
+            if opts.backup:
+                await cls._record_history()
+            
             logger.info('主程序配置更新成功')
             
         except Exception as error:
@@ -189,51 +191,60 @@ class MainConfigService:
             raise error
     
     @classmethod
-    def _validate_config_data(cls, data: Dict[str, Any]) -> None:
-        """验证配置数据格式"""
-        if not isinstance(data, dict):
-            raise ValueError('配置数据必须是一个对象')
-        
-        # 递归检查嵌套对象，确保数据结构合理
-        def validate_object(obj: Any, path: str = '') -> None:
-            if isinstance(obj, dict):
-                for key, value in obj.items():
-                    current_path = f'{path}.{key}' if path else key
-                    
-                    # 检查键名
-                    if not isinstance(key, str) or not key.strip():
-                        raise ValueError(f'配置项键名无效: {current_path}')
-                    
-                    # 检查值类型（TOML支持的类型）
-                    if not cls._is_valid_toml_type(value):
-                        raise ValueError(f'配置项类型不支持: {current_path} ({type(value).__name__})')
-                    
-                    # 递归验证嵌套对象
-                    if isinstance(value, (dict, list)):
-                        validate_object(value, current_path)
+    async def patch_config(
+        cls,
+        patch: Union[List[Dict[str, Any]], Dict[str, Any]],
+        options: Optional[ConfigServiceOptions] = None
+    ) -> None:
+        """增量更新主程序配置文件（JSON-Patch 或点分键差异，仅修改变化的键）"""
+        try:
+            opts = options or ConfigServiceOptions()
+            config_path = cls._get_config_path()
             
-            elif isinstance(obj, list):
-                # 验证数组元素类型一致性
-                if obj and len(obj) > 0:
-                    first_type = type(obj[0])
-                    if not all(isinstance(item, first_type) for item in obj):
-                        raise ValueError(f'数组元素类型不一致: {path}')
-                    
-                    # 递归验证数组元素
-                    for i, item in enumerate(obj):
-                        validate_object(item, f'{path}[{i}]')
-        
-        validate_object(data)
+            operations = parse_patch(patch)
+            
+            # 检查文件状态
+            file_info = await cls.get_config_file_info()
+            if not file_info.exists:
+                raise FileNotFoundError(f'主程序配置文件不存在: {config_path}')
+            if not file_info.readable:
+                raise PermissionError(f'主程序配置文件不可读: {config_path}')
+            if not file_info.writable:
+                raise PermissionError(f'主程序配置文件不可写: {config_path}')
+            
+            # 创建备份（如果启用备份）
+            if opts.backup:
+                await cls._create_backup(config_path)
+            
+            try:
+                patch_toml_file(
+                    config_path,
+                    operations,
+                    opts.encoding,
+                    validator=cls._validate_config_data if opts.validate else None
+                )
+            except (ValueError, PermissionError, FileNotFoundError):
+                raise
+            except Exception as error:
+                logger.error(f'写入主程序配置文件失败: {error}')
+                raise RuntimeError(f'写入主程序配置文件失败: {error}')
+            
+            if opts.backup:
+                await cls._record_history()
+            
+            logger.info(f'主程序配置增量更新成功，共 {len(operations)} 项')
+            
+        except Exception as error:
+            logger.error(f'增量更新主程序配置失败: {error}')
+            raise error
+    
+    # 配置校验器（通用TOML结构校验已在模块加载时编译）
+    _config_schema = ConfigSchema()
     
     @classmethod
-    def _is_valid_toml_type(cls, value: Any) -> bool:
-        """检查值是否是TOML支持的类型"""
-        return (
-            isinstance(value, (str, int, float, bool)) or
-            value is None or
-            isinstance(value, list) or
-            isinstance(value, dict)
-        )
+    def _validate_config_data(cls, data: Dict[str, Any], sections: Optional[Iterable[str]] = None) -> None:
+        """验证配置数据格式（sections 为 None 时校验全部配置节）"""
+        cls._config_schema.validate(data, sections)
     
     @classmethod
     def _merge_config(cls, current: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
@@ -287,28 +298,35 @@ class MainConfigService:
             else:
                 table[key] = value
     
+    @classmethod
+    def _get_backup_store(cls) -> BackupStore:
+        """获取配置备份存储（目录：config/LauncherConfigBak/main/）"""
+        main_root = path_cache_manager.get_main_root()
+        if not main_root:
+            raise RuntimeError('无法获取麦麦根目录路径')
+        
+        return BackupStore(os.path.join(main_root, 'config', 'LauncherConfigBak', 'main'))
+    
+    @classmethod
+    def get_history(cls) -> ConfigHistory:
+        """获取主程序配置变更历史"""
+        return ConfigHistory(cls._get_backup_store(), cls._get_config_path())
+    
     @classmethod
     async def _create_backup(cls, config_path: str) -> None:
-        """创建配置文件备份"""
+        """创建配置文件备份（内容与最近版本一致时不会新增版本，不一致说明文件被外部修改）"""
         try:
-            main_root = path_cache_manager.get_main_root()
-            if not main_root:
-                raise RuntimeError('无法获取麦麦根目录路径')
-            
-            # 创建备份目录结构：config/LauncherConfigBak/main/
-            backup_dir = os.path.join(main_root, 'config', 'LauncherConfigBak', 'main')
-            os.makedirs(backup_dir, exist_ok=True)
-            
-            # 生成带时间戳的备份文件名
-            timestamp = datetime.now().isoformat().replace(':', '-').replace('.', '-')
-            config_filename = os.path.basename(config_path)
-            backup_filename = f'{config_filename}.backup.{timestamp}'
-            backup_path = os.path.join(backup_dir, backup_filename)
-            
-            # 复制配置文件到备份目录
-            shutil.copy2(config_path, backup_path)
-            logger.info(f'主程序配置备份已创建: {backup_path}')
+            generation = cls.get_history().record('external')
+            logger.info(f'主程序配置备份已创建: 版本 {generation["id"]} ({generation["hash"][:12]})')
             
         except Exception as error:
             logger.warning(f'创建配置文件备份失败: {error}')
             # 备份失败不应该阻止配置更新，只记录警告
+    
+    @classmethod
+    async def _record_history(cls) -> None:
+        """保存成功后记录新版本及其结构化差异"""
+        try:
+            cls.get_history().record('save')
+        except Exception as error:
+            logger.warning(f'记录主程序配置变更历史失败: {error}')
@@ -5,9 +5,8 @@ Model Configuration Service
 """
 
 import os
-import shutil
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List, Union
 
 import toml
 
@@ -22,6 +21,12 @@ from models.config import (
     ModelData
 )
 from utils.toml_helpers import stringify_config_to_clean_toml
+from utils.config_cache import config_file_cache, ConfigReadError, ConfigParseError
+from utils.toml_patch import parse_patch, patch_toml_file
+from utils.atomic_file import atomic_write_text
+from utils.backup_store import BackupStore
+from utils.config_history import ConfigHistory
+from utils.config_schema import ConfigSchema, changed_sections
 
 
 class ModelConfigService:
@@ -88,23 +93,18 @@ class ModelConfigService:
             if not file_info.readable:
                 raise PermissionError(f'模型配置文件不可读: {config_path}')
             
-            # 读取文件内容
+            # 读取并解析文件内容（文件未变化时直接使用缓存）
             try:
-                with open(config_path, 'r', encoding=opts.encoding) as f:
-                    file_content = f.read()
-            except Exception as error:
+                config = config_file_cache.get_model(config_path, ModelConfigData, opts.encoding)
+            except ConfigReadError as error:
                 logger.error(f'读取模型配置文件失败: {error}')
                 raise RuntimeError(f'读取模型配置文件失败: {error}')
-            
-            # 解析TOML内容
-            try:
-                config_data = toml.loads(file_content)
-            except Exception as error:
+            except ConfigParseError as error:
                 logger.error(f'解析模型配置文件失败: {error}')
                 raise ValueError(f'模型配置文件格式错误: {error}')
             
             logger.info('模型配置读取成功')
-            return ModelConfigData(**config_data)
+            return config
             
         except Exception as error:
             logger.error(f'获取模型配置失败: {error}')
@@ -128,10 +128,6 @@ class ModelConfigService:
             if not update_dict:
                 raise ValueError('更新数据不能为空')
             
-            # 验证更新数据格式
-            if opts.validate:
-                cls._validate_config_data(update_dict)
-            
             # 检查文件状态
             file_info = await cls.get_config_file_info()
             
@@ -151,6 +147,10 @@ class ModelConfigService:
                 config_dir = os.path.dirname(config_path)
                 os.makedirs(config_dir, exist_ok=True)
             
+            # 只校验与当前配置不同的配置节
+            if opts.validate:
+                cls._validate_config_data(update_dict, changed_sections(current_config, update_dict))
+            
             # 合并配置数据
             merged_config = cls._merge_config(current_config, update_dict)
             
@@ -161,12 +161,14 @@ class ModelConfigService:
             # 转换为TOML格式并写入文件
             try:
                 toml_content = stringify_config_to_clean_toml(merged_config, toml)
-                with open(config_path, 'w', encoding=opts.encoding) as f:
-                    f.write(toml_content)
+                atomic_write_text(config_path, toml_content, opts.encoding)
             except Exception as error:
                 logger.error(f'写入模型配置文件失败: {error}')
                 raise RuntimeError(f'写入模型配置文件失败: {error}')
             
+            if opts.backup:
+                await cls._record_history()
+            
             logger.info('模型配置更新成功')
             
         except Exception as error:
@@ -336,55 +338,82 @@ class ModelConfigService:
             raise error
     
     @classmethod
-    def _validate_config_data(cls, data: Dict[str, Any]) -> None:
-        """验证配置数据格式"""
-        if not isinstance(data, dict):
-            raise ValueError('配置数据必须是一个对象')
-        
-        # 模型配置特定验证规则
-        cls._validate_model_specific_rules(data)
-        
-        # 递归检查嵌套对象，确保数据结构合理
-        def validate_object(obj: Any, path: str = '') -> None:
-            if isinstance(obj, dict):
-                for key, value in obj.items():
-                    current_path = f'{path}.{key}' if path else key
-                    
-                    # 检查键名
-                    if not isinstance(key, str) or not key.strip():
-                        raise ValueError(f'配置项键名无效: {current_path}')
-                    
-                    # 检查值类型（TOML支持的类型）
-                    if not cls._is_valid_toml_type(value):
-                        raise ValueError(f'配置项类型不支持: {current_path} ({type(value).__name__})')
-                    
-                    # 递归验证嵌套对象
-                    if isinstance(value, (dict, list)):
-                        validate_object(value, current_path)
-            
-            elif isinstance(obj, list):
-                # 验证数组元素类型一致性
-                if obj and len(obj) > 0:
-                    first_type = type(obj[0])
-                    if not all(isinstance(item, first_type) for item in obj):
-                        raise ValueError(f'数组元素类型不一致: {path}')
-                    
-                    # 递归验证数组元素
-                    for i, item in enumerate(obj):
-                        validate_object(item, f'{path}[{i}]')
-        
-        validate_object(data)
+    async def patch_config(
+        cls,
+        patch: Union[List[Dict[str, Any]], Dict[str, Any]],
+        options: Optional[ConfigServiceOptions] = None
+    ) -> None:
+        """增量更新模型配置文件（JSON-Patch 或点分键差异，仅修改变化的键）"""
+        try:
+            opts = options or ConfigServiceOptions()
+            config_path = cls._get_config_path()
+            
+            operations = parse_patch(patch)
+            
+            # 检查文件状态
+            file_info = await cls.get_config_file_info()
+            if not file_info.exists:
+                raise FileNotFoundError(f'模型配置文件不存在: {config_path}')
+            if not file_info.readable:
+                raise PermissionError(f'模型配置文件不可读: {config_path}')
+            if not file_info.writable:
+                raise PermissionError(f'模型配置文件不可写: {config_path}')
+            
+            # 创建备份（如果启用备份）
+            if opts.backup:
+                await cls._create_backup(config_path)
+            
+            try:
+                patch_toml_file(
+                    config_path,
+                    operations,
+                    opts.encoding,
+                    validator=cls._validate_config_data if opts.validate else None
+                )
+            except (ValueError, PermissionError, FileNotFoundError):
+                raise
+            except Exception as error:
+                logger.error(f'写入模型配置文件失败: {error}')
+                raise RuntimeError(f'写入模型配置文件失败: {error}')
+            
+            if opts.backup:
+                await cls._record_history()
+            
+            logger.info(f'模型配置增量更新成功，共 {len(operations)} 项')
+            
+        except Exception as error:
+            logger.error(f'增量更新模型配置失败: {error}')
+            raise error
+    
+    # 配置校验器（首次使用时构建，之后复用）
+    _config_schema: Optional[ConfigSchema] = None
     
     @classmethod
-    def _validate_model_specific_rules(cls, data: Dict[str, Any]) -> None:
-        """验证模型配置特定规则"""
-        # API相关验证
-        if 'api_key' in data and data['api_key'] is not None:
-            if not isinstance(data['api_key'], str):
-                raise ValueError('API密钥必须是字符串格式')
-        
-        if 'api_base' in data and data['api_base'] is not None:
-            if not isinstance(data['api_base'], str) or not cls._is_valid_url(data['api_base']):
+    def _get_config_schema(cls) -> ConfigSchema:
+        """获取配置校验器，注册模型配置特定规则"""
+        if cls._config_schema is None:
+            cls._config_schema = ConfigSchema({
+                'api_key': cls._validate_api_key,
+                'api_base': cls._validate_api_base
+            })
+        return cls._config_schema
+    
+    @classmethod
+    def _validate_config_data(cls, data: Dict[str, Any], sections: Optional[Iterable[str]] = None) -> None:
+        """验证配置数据格式（sections 为 None 时校验全部配置节）"""
+        cls._get_config_schema().validate(data, sections)
+    
+    @classmethod
+    def _validate_api_key(cls, api_key: Any) -> None:
+        """验证API密钥"""
+        if api_key is not None and not isinstance(api_key, str):
+            raise ValueError('API密钥必须是字符串格式')
+    
+    @classmethod
+    def _validate_api_base(cls, api_base: Any) -> None:
+        """验证API基础URL"""
+        if api_base is not None:
+            if not isinstance(api_base, str) or not cls._is_valid_url(api_base):
                 raise ValueError('API基础URL必须是有效的URL格式')
     
     @classmethod
@@ -397,16 +426,6 @@ class ModelConfigService:
         except Exception:
             return False
     
-    @classmethod
-    def _is_valid_toml_type(cls, value: Any) -> bool:
-        """检查值是否是TOML支持的类型"""
-        return (
-            isinstance(value, (str, int, float, bool)) or
-            value is None or
-            isinstance(value, list) or
-            isinstance(value, dict)
-        )
-    
     @classmethod
     def _merge_config(cls, current: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
         """合并配置数据（深度合并）"""
@@ -427,28 +446,35 @@ class ModelConfigService:
         
         return merged
     
+    @classmethod
+    def _get_backup_store(cls) -> BackupStore:
+        """获取配置备份存储（目录：config/LauncherConfigBak/model/）"""
+        main_root = path_cache_manager.get_main_root()
+        if not main_root:
+            raise RuntimeError('无法获取麦麦根目录路径')
+        
+        return BackupStore(os.path.join(main_root, 'config', 'LauncherConfigBak', 'model'))
+    
+    @classmethod
+    def get_history(cls) -> ConfigHistory:
+        """获取模型配置变更历史"""
+        return ConfigHistory(cls._get_backup_store(), cls._get_config_path())
+    
     @classmethod
     async def _create_backup(cls, config_path: str) -> None:
-        """创建配置文件备份"""
+        """创建配置文件备份（内容与最近版本一致时不会新增版本，不一致说明文件被外部修改）"""
         try:
-            main_root = path_cache_manager.get_main_root()
-            if not main_root:
-                raise RuntimeError('无法获取麦麦根目录路径')
-            
-            # 创建备份目录结构：config/LauncherConfigBak/model/
-            backup_dir = os.path.join(main_root, 'config', 'LauncherConfigBak', 'model')
-            os.makedirs(backup_dir, exist_ok=True)
-            
-            # 生成带时间戳的备份文件名
-            timestamp = datetime.now().isoformat().replace(':', '-').replace('.', '-')
-            config_filename = os.path.basename(config_path)
-            backup_filename = f'{config_filename}.backup.{timestamp}'
-            backup_path = os.path.join(backup_dir, backup_filename)
-            
-            # 复制配置文件到备份目录
-            shutil.copy2(config_path, backup_path)
-            logger.info(f'模型配置备份已创建: {backup_path}')
+            generation = cls.get_history().record('external')
+            logger.info(f'模型配置备份已创建: 版本 {generation["id"]} ({generation["hash"][:12]})')
             
         except Exception as error:
             logger.warning(f'创建模型配置文件备份失败: {error}')
             # 备份失败不应该阻止配置更新，只记录警告
+    
+    @classmethod
+    async def _record_history(cls) -> None:
+        """保存成功后记录新版本及其结构化差异"""
+        try:
+            cls.get_history().record('save')
+        except Exception as error:
+            logger.warning(f'记录模型配置变更历史失败: {error}')
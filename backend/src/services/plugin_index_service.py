@@ -0,0 +1,415 @@
+"""
+插件索引服务
+Plugin Index Service
+缓存插件广场索引（plugin_details.json）：磁盘持久化、ETag/Last-Modified 条件刷新、
+过期后先返回旧数据再后台刷新（stale-while-revalidate），并建立插件ID索引与搜索倒排索引；
+刷新时在 Git 代理镜像间对冲请求，先成功者胜出
+"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from core.http_client import HttpClient, get_http_client
+from core.logger import logger
+from models.plugin import Plugin
+from services.git_clone_service import get_git_clone_service
+from utils.atomic_file import atomic_write_text
+from utils.mirror_health import MirrorHealthTracker
+from utils.plugin_search_index import PluginSearchIndex
+
+PLUGIN_DETAILS_URL = "https://raw.githubusercontent.com/DrSmoothl/plugin-repo/refs/heads/main/plugin_details.json"
+ORIGINAL_SOURCE_NAME = "原始地址"
+
+PLUGIN_INDEX_CACHE_PATH = Path('data') / 'plugin_index.json'
+
+# 索引在该时间内视为新鲜，直接使用不发请求（秒）
+INDEX_FRESH_SECONDS = 300
+# 超过新鲜期但在该时间内的索引先返回旧数据再后台刷新；更旧的索引需要等待刷新完成（秒）
+INDEX_MAX_STALE_SECONDS = 7 * 86400
+# 后台定时刷新间隔（秒）
+BACKGROUND_REFRESH_INTERVAL = 600
+# 单次索引请求超时（秒）
+INDEX_REQUEST_TIMEOUT = 10
+# 对冲请求：当前镜像在该时间内未返回时启动下一个镜像（按镜像的平均延迟自适应，秒）
+HEDGE_DELAY_DEFAULT = 1.0
+HEDGE_DELAY_MIN = 0.3
+HEDGE_DELAY_MAX = 3.0
+
+
+def normalize_manifest(manifest_data: dict) -> None:
+    """标准化manifest数据（原地修改）"""
+    # 处理manifest_version字段，确保是整数
+    if 'manifest_version' in manifest_data:
+        try:
+            manifest_data['manifest_version'] = int(manifest_data['manifest_version'])
+        except (ValueError, TypeError):
+            manifest_data['manifest_version'] = 1
+
+    # 确保keywords是列表
+    if 'keywords' not in manifest_data:
+        manifest_data['keywords'] = []
+    elif not isinstance(manifest_data['keywords'], list):
+        manifest_data['keywords'] = []
+
+    # 确保author字段存在且格式正确
+    if 'author' not in manifest_data:
+        manifest_data['author'] = {"name": "未知作者"}
+    elif isinstance(manifest_data['author'], str):
+        manifest_data['author'] = {"name": manifest_data['author']}
+    elif not isinstance(manifest_data['author'], dict):
+        manifest_data['author'] = {"name": "未知作者"}
+
+    # 确保host_application字段存在且格式正确
+    if 'host_application' not in manifest_data:
+        manifest_data['host_application'] = {"min_version": "0.0.0"}
+    elif not isinstance(manifest_data['host_application'], dict):
+        manifest_data['host_application'] = {"min_version": "0.0.0"}
+
+
+class PluginIndex:
+    """一次拉取得到的插件索引（已标准化，只读）"""
+
+    def __init__(self, raw_items: List[Any], etag: Optional[str] = None,
+                 last_modified: Optional[str] = None, fetched_at: float = 0.0, source: str = ''):
+        self.raw_items = raw_items
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.source = source
+        self.items: List[dict] = []
+        self.by_id: Dict[str, dict] = {}
+        self.categories: List[str] = []
+        self._build()
+        self.search_index = PluginSearchIndex(self.items)
+
+    def _build(self) -> None:
+        for item in self.raw_items:
+            try:
+                if not isinstance(item, dict):
+                    continue
+                plugin_id = item.get('id', f'unknown_{len(self.items)}')
+                manifest_data = dict(item.get('manifest') or {})
+                normalize_manifest(manifest_data)
+                plugin = Plugin(id=plugin_id, manifest=manifest_data, installed=False).dict()
+            except Exception as e:
+                # 如果某个插件数据格式错误，跳过该插件但不影响其他插件
+                logger.warning(f"解析插件数据失败: {item.get('id', 'unknown') if isinstance(item, dict) else 'unknown'}, 错误: {str(e)}")
+                continue
+            self.items.append(plugin)
+            self.by_id.setdefault(plugin['id'], plugin)
+        self.categories = sorted({
+            category
+            for plugin in self.items
+            for category in plugin['manifest'].get('categories') or []
+        })
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def to_cache(self) -> dict:
+        return {
+            'version': 1,
+            'source': self.source,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'fetched_at': self.fetched_at,
+            'items': self.raw_items
+        }
+
+
+class PluginIndexService:
+    """插件索引服务"""
+
+    def __init__(self, url: str = PLUGIN_DETAILS_URL, cache_path: Path = PLUGIN_INDEX_CACHE_PATH,
+                 http_client: Optional[HttpClient] = None):
+        self.url = url
+        self.cache_path = Path(cache_path)
+        self._http_client = http_client
+        self.mirror_health = MirrorHealthTracker()
+        self._index: Optional[PluginIndex] = None
+        self._disk_loaded = False
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._background_task: Optional[asyncio.Task] = None
+
+    def set_http_client(self, http_client: Optional[HttpClient]) -> None:
+        """注入HTTP客户端"""
+        self._http_client = http_client
+
+    def _get_http_client(self) -> HttpClient:
+        return self._http_client or get_http_client()
+
+    # ---------------- 磁盘缓存 ----------------
+    def _read_disk_cache(self) -> Optional[PluginIndex]:
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, dict) or not isinstance(data.get('items'), list):
+                return None
+            return PluginIndex(
+                data['items'],
+                etag=data.get('etag'),
+                last_modified=data.get('last_modified'),
+                fetched_at=float(data.get('fetched_at') or 0),
+                source=data.get('source') or ''
+            )
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"读取插件索引缓存失败: {e}")
+            return None
+
+    def _write_disk_cache(self, index: PluginIndex) -> None:
+        try:
+            atomic_write_text(self.cache_path, json.dumps(index.to_cache(), ensure_ascii=False))
+        except Exception as e:
+            logger.warning(f"保存插件索引缓存失败: {e}")
+
+    async def _ensure_disk_loaded(self) -> None:
+        if self._disk_loaded:
+            return
+        self._disk_loaded = True
+        index = await asyncio.to_thread(self._read_disk_cache)
+        if index is not None and self._index is None:
+            self._index = index
+            logger.info(f"已从磁盘加载插件索引缓存，插件数量: {len(index.items)}")
+
+    # ---------------- 镜像 ----------------
+    def get_candidates(self) -> List[Tuple[str, str]]:
+        """
+        获取索引下载地址列表 (镜像名称, URL)，按镜像健康度排序
+
+        复用 Git 代理配置中的镜像；gitclone.com 只代理 git 协议，无法下载原始文件，跳过。
+        """
+        config = get_git_clone_service().get_config()
+        candidates: List[Tuple[str, str]] = []
+        seen_urls = set()
+
+        if config.enabled:
+            for mirror in sorted([m for m in config.mirrors if m.enabled], key=lambda m: m.priority):
+                if 'gitclone.com' in mirror.base_url:
+                    continue
+                url = f"{mirror.base_url.rstrip('/')}/{self.url}"
+                if url in seen_urls:
+                    continue
+                seen_urls.add(url)
+                candidates.append((mirror.name, url))
+
+        if config.fallback_to_original or not candidates:
+            candidates.append((ORIGINAL_SOURCE_NAME, self.url))
+
+        # 按地址排序而非按名称合并：同名但地址不同的镜像都保留，同名镜像保持配置顺序
+        rank_position = {
+            name: index
+            for index, name in enumerate(self.mirror_health.rank(dict.fromkeys(name for name, _ in candidates)))
+        }
+        return sorted(candidates, key=lambda candidate: rank_position[candidate[0]])
+
+    def get_mirror_stats(self) -> List[Dict[str, Any]]:
+        """各镜像的延迟与成功率统计（按当前排序）"""
+        return self.mirror_health.snapshot(name for name, _ in self.get_candidates())
+
+    def _hedge_delay(self, name: str) -> float:
+        latency = self.mirror_health.get(name).ewma_latency
+        if latency is None:
+            return HEDGE_DELAY_DEFAULT
+        return min(HEDGE_DELAY_MAX, max(HEDGE_DELAY_MIN, latency * 1.5))
+
+    async def _fetch_from(self, name: str, url: str, headers: Dict[str, str]) -> Tuple[httpx.Response, Optional[list]]:
+        """从单个镜像请求索引，304 时返回的数据为 None"""
+        start_time = time.perf_counter()
+        try:
+            response = await self._get_http_client().get(
+                url, headers=headers, timeout=INDEX_REQUEST_TIMEOUT, retries=0
+            )
+            if response.status_code == 304:
+                data = None
+            else:
+                response.raise_for_status()
+                data = response.json()
+                if not isinstance(data, list):
+                    raise ValueError("插件索引格式错误")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.mirror_health.record_failure(name, str(e) or type(e).__name__, time.perf_counter() - start_time)
+            raise
+        self.mirror_health.record_success(name, time.perf_counter() - start_time)
+        return response, data
+
+    async def _race(self, headers: Dict[str, str]) -> Tuple[str, httpx.Response, Optional[list]]:
+        """
+        对冲请求所有镜像
+
+        先请求排名第一的镜像，超过其预期耗时仍未返回或请求失败时再启动下一个，
+        第一个成功的响应胜出，其余请求立即取消。
+        """
+        queue = self.get_candidates()
+        running: Dict[asyncio.Task, str] = {}
+        last_error: Optional[Exception] = None
+
+        def launch() -> None:
+            name, url = queue.pop(0)
+            logger.debug(f"请求插件索引: {name} - {url}")
+            running[asyncio.create_task(self._fetch_from(name, url, headers))] = name
+
+        launch()
+        try:
+            while running:
+                newest = list(running.values())[-1]
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=self._hedge_delay(newest) if queue else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    launch()
+                    continue
+
+                for task in done:
+                    name = running.pop(task)
+                    try:
+                        response, data = task.result()
+                    except Exception as e:
+                        last_error = e
+                        logger.debug(f"镜像 {name} 获取插件索引失败: {e}")
+                        continue
+                    return name, response, data
+
+                # 有镜像失败时不再等待，立即启动下一个镜像
+                if queue:
+                    launch()
+        finally:
+            for task in running:
+                task.cancel()
+
+        raise last_error or RuntimeError("没有可用的插件索引地址")
+
+    # ---------------- 刷新 ----------------
+    async def _fetch(self) -> PluginIndex:
+        """条件请求索引，未变化（304）时沿用当前索引"""
+        current = self._index
+        headers = {}
+        if current is not None:
+            if current.etag:
+                headers['If-None-Match'] = current.etag
+            if current.last_modified:
+                headers['If-Modified-Since'] = current.last_modified
+
+        http_start = time.time()
+        source, response, plugin_data = await self._race(headers)
+
+        if plugin_data is None and current is not None:
+            logger.info(f"插件索引未变化（304，{source}），耗时: {time.time() - http_start:.3f}s")
+            current.fetched_at = time.time()
+            await asyncio.to_thread(self._write_disk_cache, current)
+            return current
+        if plugin_data is None:
+            raise ValueError(f"{source} 返回了304但本地没有缓存的插件索引")
+
+        index = await asyncio.to_thread(
+            PluginIndex,
+            plugin_data,
+            response.headers.get('etag'),
+            response.headers.get('last-modified'),
+            time.time(),
+            source
+        )
+        logger.info(f"插件索引已更新（{source}），耗时: {time.time() - http_start:.3f}s，插件数量: {len(index.items)}")
+        await asyncio.to_thread(self._write_disk_cache, index)
+        return index
+
+    async def _refresh(self) -> PluginIndex:
+        self._index = await self._fetch()
+        return self._index
+
+    def refresh(self) -> asyncio.Task:
+        """开始刷新索引（同一时间只会有一个刷新请求）"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+            self._refresh_task.add_done_callback(self._on_refresh_done)
+        return self._refresh_task
+
+    @staticmethod
+    def _on_refresh_done(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"刷新插件索引失败: {task.exception()}")
+
+    async def get_index(self, force_refresh: bool = False) -> PluginIndex:
+        """
+        获取插件索引
+
+        新鲜的索引直接返回；过期不久的索引先返回并在后台刷新；
+        没有索引或索引过旧时等待刷新，刷新失败但有旧索引时仍返回旧索引。
+
+        Raises:
+            httpx.HTTPError / ValueError: 没有可用索引且刷新失败
+        """
+        await self._ensure_disk_loaded()
+        index = self._index
+
+        if index is not None and not force_refresh:
+            if index.age < INDEX_FRESH_SECONDS:
+                return index
+            if index.age < INDEX_MAX_STALE_SECONDS:
+                self.refresh()
+                return index
+
+        try:
+            return await asyncio.shield(self.refresh())
+        except Exception as e:
+            if index is None:
+                raise
+            logger.info(f"插件索引刷新失败，使用{int(index.age)}秒前的缓存数据")
+            return index
+
+    async def get_plugin(self, plugin_id: str) -> Optional[dict]:
+        """按插件ID查找插件（O(1)）"""
+        index = await self.get_index()
+        return index.by_id.get(plugin_id)
+
+    # ---------------- 后台刷新 ----------------
+    def start_background_refresh(self, interval: float = BACKGROUND_REFRESH_INTERVAL) -> None:
+        """启动后台定时刷新任务"""
+        if self._background_task is not None and not self._background_task.done():
+            return
+        self._background_task = asyncio.create_task(self._background_loop(interval))
+
+    async def _background_loop(self, interval: float) -> None:
+        await self._ensure_disk_loaded()
+        while True:
+            index = self._index
+            if index is None or index.age >= INDEX_FRESH_SECONDS:
+                try:
+                    await asyncio.shield(self.refresh())
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    pass  # 已在 _on_refresh_done 中记录
+            await asyncio.sleep(interval)
+
+    async def stop_background_refresh(self) -> None:
+        """停止后台刷新任务"""
+        for task in (self._background_task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._background_task = None
+        self._refresh_task = None
+
+
+# 全局插件索引服务实例
+plugin_index_service = PluginIndexService()
+
+
+def get_plugin_index_service() -> PluginIndexService:
+    """获取插件索引服务实例"""
+    return plugin_index_service
@@ -0,0 +1,285 @@
+"""
+已安装插件清单服务
+Plugin Inventory Service
+维护 MaiBot plugins 目录的插件清单（文件夹 -> manifest 字段），持久化到磁盘；
+每次读取时只 stat 各插件目录与 manifest，按 mtime/大小差异增量重新解析，解析在线程池中并行进行
+"""
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.logger import logger
+from core.path_cache_manager import path_cache_manager
+from utils.atomic_file import atomic_write_text
+from utils.git_object_cache import normalize_cache_key
+from utils.version_compare import is_newer_version
+
+PLUGIN_INVENTORY_CACHE_PATH = Path('data') / 'plugin_inventory.json'
+
+# 按顺序查找的 manifest 文件名
+MANIFEST_FILE_NAMES = ('manifest.json', '_manifest.json', 'package.json')
+# manifest 文件大小上限（字节），超过时视为无效
+MAX_MANIFEST_BYTES = 64 * 1024
+# 两次目录检查的最小间隔（秒），间隔内直接返回内存中的清单
+MIN_CHECK_INTERVAL = 2.0
+# 同时解析的 manifest 数量
+PARSE_CONCURRENCY = 8
+
+# 目录签名: [目录 mtime_ns, manifest 文件名, manifest mtime_ns, manifest 大小]
+Signature = List[Any]
+
+
+def _scan_plugins_dir(plugins_dir: Path) -> Dict[str, Signature]:
+    """只 stat 不读取：获取每个插件目录的签名"""
+    signatures: Dict[str, Signature] = {}
+    if not plugins_dir.is_dir():
+        return signatures
+    with os.scandir(plugins_dir) as entries:
+        for entry in entries:
+            # 跳过隐藏目录（回收目录、克隆临时目录）与 __pycache__
+            if entry.name.startswith(('.', '__')):
+                continue
+            try:
+                if not entry.is_dir():
+                    continue
+                signature: Signature = [entry.stat().st_mtime_ns, None, 0, 0]
+            except OSError:
+                continue
+            for manifest_name in MANIFEST_FILE_NAMES:
+                try:
+                    manifest_stat = os.stat(os.path.join(entry.path, manifest_name))
+                except OSError:
+                    continue
+                signature[1:] = [manifest_name, manifest_stat.st_mtime_ns, manifest_stat.st_size]
+                break
+            signatures[entry.name] = signature
+    return signatures
+
+
+def _parse_plugin(plugins_dir: Path, folder_name: str, signature: Signature) -> Dict[str, Any]:
+    """读取并解析插件的 manifest，返回清单条目"""
+    folder = plugins_dir / folder_name
+    entry: Dict[str, Any] = {
+        'folder_name': folder_name,
+        'manifest_file': signature[1],
+        'has_git': (folder / '.git').exists(),
+        'modified_at': signature[0] // 1_000_000,
+        'signature': signature,
+        'error': None
+    }
+    if signature[1] is None:
+        entry['error'] = '缺少manifest文件'
+        return entry
+    if signature[3] > MAX_MANIFEST_BYTES:
+        entry['error'] = 'manifest文件过大'
+        return entry
+
+    try:
+        with open(folder / signature[1], 'r', encoding='utf-8-sig') as f:
+            manifest = json.load(f)
+        if not isinstance(manifest, dict):
+            raise ValueError('manifest必须是一个对象')
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        entry['error'] = f'解析manifest失败: {e}'
+        return entry
+
+    author = manifest.get('author')
+    entry.update({
+        'name': manifest.get('name') or folder_name,
+        'version': str(manifest.get('version') or '0.0.0'),
+        'description': manifest.get('description') or '',
+        'author': author.get('name') if isinstance(author, dict) else author,
+        'repository_url': manifest.get('repository_url'),
+        'homepage_url': manifest.get('homepage_url'),
+        'host_application': manifest.get('host_application')
+    })
+    return entry
+
+
+def public_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """去掉内部字段后的清单条目（用于接口返回）"""
+    return {key: value for key, value in entry.items() if key != 'signature'}
+
+
+def _normalize_name(name: Any) -> str:
+    return name.strip().lower() if isinstance(name, str) else ''
+
+
+class InstalledPluginIndex:
+    """
+    已安装插件的哈希索引（文件夹名 / 仓库地址 / 名称），用于与市场插件 O(1) 匹配
+
+    Args:
+        entries: manifest 有效的清单条目
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self.by_folder: Dict[str, Dict[str, Any]] = {}
+        self.by_repository: Dict[str, Dict[str, Any]] = {}
+        self.by_name: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            self.by_folder[entry['folder_name'].lower()] = entry
+            if entry.get('repository_url'):
+                self.by_repository.setdefault(normalize_cache_key(entry['repository_url']), entry)
+            name = _normalize_name(entry.get('name'))
+            if name:
+                self.by_name.setdefault(name, entry)
+
+    def match(self, plugin_id: Optional[str], manifest: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        查找市场插件对应的已安装插件
+
+        依次按安装目录（市场插件 ID）、仓库地址、名称匹配，找不到时返回 None
+        """
+        if plugin_id:
+            entry = self.by_folder.get(plugin_id.lower())
+            if entry is not None:
+                return entry
+        repository_url = manifest.get('repository_url')
+        if isinstance(repository_url, str) and repository_url.strip():
+            entry = self.by_repository.get(normalize_cache_key(repository_url))
+            if entry is not None:
+                return entry
+        return self.by_name.get(_normalize_name(manifest.get('name')))
+
+    def annotate(self, plugin: Dict[str, Any]) -> Dict[str, Any]:
+        """为市场插件附加安装状态、已安装版本与是否有新版本"""
+        manifest = plugin.get('manifest') or {}
+        entry = self.match(plugin.get('id'), manifest)
+        if entry is None:
+            return {**plugin, 'installed': False, 'installed_folder': None,
+                    'installed_version': None, 'update_available': False}
+        return {
+            **plugin,
+            'installed': True,
+            'installed_folder': entry['folder_name'],
+            'installed_version': entry.get('version'),
+            'update_available': is_newer_version(manifest.get('version'), entry.get('version'))
+        }
+
+
+class PluginInventoryService:
+    """已安装插件清单"""
+
+    def __init__(self, cache_path: Path = PLUGIN_INVENTORY_CACHE_PATH):
+        self.cache_path = cache_path
+        self._plugins_dir: Optional[Path] = None
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._checked_at = 0.0
+        self._disk_loaded = False
+        self._lock: Optional[asyncio.Lock] = None
+        self._match_index: Optional[InstalledPluginIndex] = None
+
+    # ---------------- 持久化 ----------------
+    def _read_disk_cache(self) -> Tuple[Optional[str], Dict[str, Dict[str, Any]]]:
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get('plugins_dir'), data.get('entries') or {}
+        except FileNotFoundError:
+            return None, {}
+        except Exception as e:
+            logger.warning(f'读取插件清单缓存失败: {e}')
+            return None, {}
+
+    def _write_disk_cache(self, state: str) -> None:
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(self.cache_path, state)
+        except Exception as e:
+            logger.warning(f'保存插件清单缓存失败: {e}')
+
+    # ---------------- 刷新 ----------------
+    def invalidate(self) -> None:
+        """下次读取时立即检查目录（安装/更新插件后调用）"""
+        self._checked_at = 0.0
+
+    async def _refresh(self, plugins_dir: Path) -> None:
+        if not self._disk_loaded:
+            self._disk_loaded = True
+            cached_dir, entries = await asyncio.to_thread(self._read_disk_cache)
+            if cached_dir == str(plugins_dir):
+                self._entries = entries
+                self._plugins_dir = plugins_dir
+
+        if self._plugins_dir != plugins_dir:
+            # 麦麦根目录变更，旧清单作废
+            self._entries = {}
+            self._plugins_dir = plugins_dir
+            self._match_index = None
+
+        signatures = await asyncio.to_thread(_scan_plugins_dir, plugins_dir)
+        changed = [
+            name for name, signature in signatures.items()
+            if self._entries.get(name, {}).get('signature') != signature
+        ]
+        removed = [name for name in self._entries if name not in signatures]
+
+        if changed:
+            semaphore = asyncio.Semaphore(PARSE_CONCURRENCY)
+
+            async def parse(name: str) -> Dict[str, Any]:
+                async with semaphore:
+                    return await asyncio.to_thread(_parse_plugin, plugins_dir, name, signatures[name])
+
+            for entry in await asyncio.gather(*(parse(name) for name in changed)):
+                self._entries[entry['folder_name']] = entry
+        for name in removed:
+            del self._entries[name]
+
+        if changed or removed:
+            self._match_index = None
+            logger.info(f'插件清单已更新: 重新解析 {len(changed)} 个，移除 {len(removed)} 个，共 {len(self._entries)} 个')
+            state = json.dumps(
+                {'plugins_dir': str(plugins_dir), 'entries': self._entries},
+                ensure_ascii=False
+            )
+            await asyncio.to_thread(self._write_disk_cache, state)
+
+    async def get_entries(self, force_refresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        获取插件清单（包括 manifest 无效的插件，其 error 字段不为空）
+
+        Args:
+            force_refresh: 忽略检查间隔，立即检查目录
+        """
+        main_root = path_cache_manager.get_main_root()
+        if not main_root:
+            return []
+        plugins_dir = Path(main_root) / 'plugins'
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            if force_refresh or self._plugins_dir != plugins_dir or now - self._checked_at >= MIN_CHECK_INTERVAL:
+                start_time = time.time()
+                await self._refresh(plugins_dir)
+                self._checked_at = time.monotonic()
+                logger.debug(f'检查插件目录耗时: {time.time() - start_time:.3f}s，插件数量: {len(self._entries)}')
+
+        return sorted(self._entries.values(), key=lambda entry: entry['folder_name'].lower())
+
+    async def get_plugins(self, force_refresh: bool = False) -> List[Dict[str, Any]]:
+        """获取 manifest 有效的已安装插件"""
+        return [entry for entry in await self.get_entries(force_refresh) if entry['error'] is None]
+
+    async def get_match_index(self, force_refresh: bool = False) -> InstalledPluginIndex:
+        """获取已安装插件的匹配索引（清单无变化时复用）"""
+        entries = await self.get_plugins(force_refresh)
+        if self._match_index is None:
+            self._match_index = InstalledPluginIndex(entries)
+        return self._match_index
+
+
+# 全局插件清单服务实例
+plugin_inventory_service = PluginInventoryService()
+
+
+def get_plugin_inventory_service() -> PluginInventoryService:
+    """获取插件清单服务实例"""
+    return plugin_inventory_service
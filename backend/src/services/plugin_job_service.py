@@ -0,0 +1,407 @@
+"""
+插件任务服务
+Plugin Job Service
+插件安装/更新在后台任务队列中执行：固定数量的工作协程并发处理任务，
+任务状态持久化到磁盘，克隆进度通过订阅推送（SSE / WebSocket）
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from core.config import PluginJobConfig
+from core.logger import logger
+from utils.atomic_file import atomic_write_text
+
+PLUGIN_JOB_STATE_PATH = Path('data') / 'plugin_jobs.json'
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+ACTIVE_STATUSES = frozenset({JOB_QUEUED, JOB_RUNNING})
+
+# 每个订阅者的事件队列长度，满时丢弃最旧的事件
+SUBSCRIBER_QUEUE_SIZE = 200
+
+
+class PluginJobError(Exception):
+    """任务执行失败（message 会作为任务的错误信息展示）"""
+
+    def __init__(self, message: str, details: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.message = message
+        self.details = details
+
+
+class PluginJob:
+    """插件任务"""
+
+    def __init__(self, kind: str, plugin_id: str, params: Optional[Dict[str, Any]] = None,
+                 job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.kind = kind  # install / update
+        self.plugin_id = plugin_id
+        self.params: Dict[str, Any] = params or {}
+        self.status = JOB_QUEUED
+        self.message = '等待执行'
+        self.progress: Dict[str, Any] = {'phase': None, 'percent': 0, 'overall': 0, 'mirror': None}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ACTIVE_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        def ms(value: Optional[float]) -> Optional[int]:
+            return int(value * 1000) if value else None
+
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'pluginId': self.plugin_id,
+            'status': self.status,
+            'message': self.message,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+            'createdAt': ms(self.created_at),
+            'startedAt': ms(self.started_at),
+            'finishedAt': ms(self.finished_at)
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        """持久化数据（包含执行参数）"""
+        return {**self.to_dict(), 'params': self.params}
+
+    @classmethod
+    def from_state(cls, data: Dict[str, Any]) -> 'PluginJob':
+        job = cls(data['kind'], data['pluginId'], data.get('params'), data['id'])
+        job.status = data.get('status', JOB_FAILED)
+        job.message = data.get('message', '')
+        job.progress = data.get('progress') or job.progress
+        job.result = data.get('result')
+        job.error = data.get('error')
+        job.created_at = (data.get('createdAt') or 0) / 1000 or time.time()
+        job.started_at = (data.get('startedAt') or 0) / 1000 or None
+        job.finished_at = (data.get('finishedAt') or 0) / 1000 or None
+        return job
+
+
+JobReporter = Callable[[Dict[str, Any]], None]
+JobHandler = Callable[[PluginJob, JobReporter], Awaitable[Dict[str, Any]]]
+
+
+class PluginJobService:
+    """
+    插件任务队列
+
+    任务处理函数按任务类型注册，接收任务与进度回报函数，返回结果字典，
+    失败时抛出 PluginJobError。同一插件同时只能有一个进行中的任务。
+    """
+
+    def __init__(self, state_path: Path = PLUGIN_JOB_STATE_PATH, config: Optional[PluginJobConfig] = None):
+        self.state_path = state_path
+        self.config = config or PluginJobConfig()
+        self._handlers: Dict[str, JobHandler] = {}
+        self._jobs: Dict[str, PluginJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._subscribers: Dict[asyncio.Queue, Optional[str]] = {}
+        self._state_loaded = False
+        self._stopping = False
+        self._save_lock: Optional[asyncio.Lock] = None
+
+    def configure(self, config: PluginJobConfig) -> None:
+        """更新任务队列配置（在启动工作协程前调用）"""
+        self.config = config
+
+    def register_handler(self, kind: str, handler: JobHandler) -> None:
+        """注册任务处理函数"""
+        self._handlers[kind] = handler
+
+    # ---------------- 生命周期 ----------------
+    async def start(self) -> None:
+        """加载持久化的任务并启动工作协程"""
+        await self._load_state()
+        self._ensure_workers()
+
+    async def stop(self) -> None:
+        """停止工作协程，进行中的任务标记为已取消（应用关闭时调用）"""
+        self._stopping = True
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._subscribers.clear()
+        self._stopping = False
+        await self._save_state()
+
+    def _ensure_workers(self) -> None:
+        if self._workers:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        # 启动前已排队的任务（包括从磁盘恢复的）
+        queued = sorted(
+            (job for job in self._jobs.values() if job.status == JOB_QUEUED),
+            key=lambda job: job.created_at
+        )
+        for job in queued:
+            self._queue.put_nowait(job.id)
+        worker_count = max(1, self.config.max_workers)
+        self._workers = [asyncio.create_task(self._worker(index)) for index in range(worker_count)]
+        logger.info(f'插件任务队列已启动，工作协程数: {worker_count}')
+
+    # ---------------- 持久化 ----------------
+    def _read_state(self) -> List[Dict[str, Any]]:
+        try:
+            if not self.state_path.exists():
+                return []
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get('jobs', []) if isinstance(data, dict) else []
+        except Exception as e:
+            logger.warning(f'读取插件任务状态失败: {e}')
+            return []
+
+    async def _load_state(self) -> None:
+        if self._state_loaded:
+            return
+        self._state_loaded = True
+        interrupted = 0
+        for item in await asyncio.to_thread(self._read_state):
+            try:
+                job = PluginJob.from_state(item)
+            except (KeyError, TypeError, ValueError):
+                continue
+            if job.status == JOB_RUNNING:
+                # 上次退出时正在执行的任务可能只完成了一半，不自动重试
+                job.status = JOB_FAILED
+                job.message = '服务重启，任务中断'
+                job.error = {'message': job.message}
+                job.finished_at = time.time()
+                interrupted += 1
+            self._jobs.setdefault(job.id, job)
+        if self._jobs:
+            logger.info(f'已恢复 {len(self._jobs)} 个插件任务，其中 {interrupted} 个因服务重启中断')
+
+    async def _save_state(self) -> None:
+        if self._save_lock is None:
+            self._save_lock = asyncio.Lock()
+        state = json.dumps({'jobs': [job.to_state() for job in self._jobs.values()]}, ensure_ascii=False)
+        async with self._save_lock:
+            try:
+                await asyncio.to_thread(self._write_state, state)
+            except Exception as e:
+                logger.warning(f'保存插件任务状态失败: {e}')
+
+    def _write_state(self, state: str) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.state_path, state)
+
+    def _prune_history(self) -> None:
+        finished = sorted(
+            (job for job in self._jobs.values() if not job.is_active),
+            key=lambda job: job.finished_at or job.created_at
+        )
+        for job in finished[:max(0, len(finished) - self.config.max_history)]:
+            del self._jobs[job.id]
+
+    # ---------------- 任务 ----------------
+    def get_active_job(self, plugin_id: str) -> Optional[PluginJob]:
+        """获取插件进行中的任务"""
+        for job in self._jobs.values():
+            if job.plugin_id == plugin_id and job.is_active:
+                return job
+        return None
+
+    async def submit(self, kind: str, plugin_id: str, params: Optional[Dict[str, Any]] = None) -> PluginJob:
+        """
+        提交任务
+
+        Returns:
+            PluginJob: 新任务；该插件已有进行中的任务时返回该任务
+        """
+        if kind not in self._handlers:
+            raise ValueError(f'不支持的任务类型: {kind}')
+
+        await self._load_state()
+        existing = self.get_active_job(plugin_id)
+        if existing is not None:
+            return existing
+
+        # 先启动工作协程再登记任务：_ensure_workers 会把已排队的任务放入队列，避免同一任务入队两次
+        self._ensure_workers()
+        job = PluginJob(kind, plugin_id, params)
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job.id)
+        logger.info(f'插件任务已加入队列: {job.id} ({kind} {plugin_id})')
+        self._publish(job, 'job_updated')
+        await self._save_state()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[PluginJob]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: PluginJob, timeout: Optional[float] = None) -> bool:
+        """
+        等待任务结束
+
+        Returns:
+            bool: 任务是否已结束（超时返回 False，任务继续在后台执行）
+        """
+        queue = self.subscribe(job.id)
+
+        async def until_finished() -> None:
+            while job.is_active:
+                await queue.get()
+
+        try:
+            await asyncio.wait_for(until_finished(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.unsubscribe(queue)
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[PluginJob]:
+        """按创建时间倒序列出任务"""
+        jobs = [job for job in self._jobs.values() if status is None or job.status == status]
+        jobs.sort(key=lambda job: job.created_at, reverse=True)
+        return jobs[:max(0, limit)]
+
+    async def cancel(self, job_id: str) -> Optional[PluginJob]:
+        """取消任务（排队中直接取消，执行中会终止git进程）"""
+        job = self._jobs.get(job_id)
+        if job is None or not job.is_active:
+            return job
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        else:
+            self._finish(job, JOB_CANCELLED, '任务已取消')
+            await self._save_state()
+        return job
+
+    # ---------------- 执行 ----------------
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job.status != JOB_QUEUED:
+                continue
+            task = asyncio.create_task(self._run(job))
+            self._running[job.id] = task
+            try:
+                # 用 wait 而不是直接 await：单个任务被取消时工作协程不受影响
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                # 工作协程被停止：连带取消正在执行的任务
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise
+            finally:
+                self._running.pop(job.id, None)
+
+    async def _run(self, job: PluginJob) -> None:
+        handler = self._handlers[job.kind]
+        job.status = JOB_RUNNING
+        job.message = '正在执行'
+        job.started_at = time.time()
+        self._publish(job, 'job_updated')
+        await self._save_state()
+
+        try:
+            result = await handler(job, lambda event: self._report(job, event))
+        except asyncio.CancelledError:
+            self._finish(job, JOB_CANCELLED, '服务关闭，任务中断' if self._stopping else '任务已取消')
+            await self._save_state()
+            raise
+        except PluginJobError as e:
+            job.error = {'message': e.message, 'details': e.details}
+            self._finish(job, JOB_FAILED, e.message)
+        except Exception as e:
+            logger.error(f'插件任务执行异常: {job.id} - {e}')
+            job.error = {'message': str(e)}
+            self._finish(job, JOB_FAILED, f'任务执行异常: {e}')
+        else:
+            job.result = result
+            self._finish(job, JOB_SUCCEEDED, '执行成功')
+
+        self._prune_history()
+        await self._save_state()
+
+    def _finish(self, job: PluginJob, status: str, message: str) -> None:
+        job.status = status
+        job.message = message
+        job.finished_at = time.time()
+        if status == JOB_SUCCEEDED:
+            job.progress = {**job.progress, 'percent': 100, 'overall': 100}
+        logger.info(f'插件任务结束: {job.id} ({job.kind} {job.plugin_id}) - {message}')
+        self._publish(job, 'job_updated')
+
+    def _report(self, job: PluginJob, event: Dict[str, Any]) -> None:
+        """处理来自任务处理函数的进度事件"""
+        if event.get('event') == 'attempt':
+            job.message = f'正在从 {event["mirror"]} 下载'
+            job.progress = {'phase': None, 'percent': 0, 'overall': 0, 'mirror': event['mirror']}
+        elif event.get('event') == 'progress':
+            progress = {
+                'phase': event.get('phase'),
+                'percent': event.get('percent', 0),
+                'overall': event.get('overall', 0),
+                'mirror': event.get('mirror')
+            }
+            # git 每秒会输出大量进度行，只在百分比或阶段变化时推送
+            if progress == job.progress:
+                return
+            job.progress = progress
+        elif event.get('message'):
+            job.message = event['message']
+        else:
+            return
+        self._publish(job, 'job_progress')
+
+    # ---------------- 订阅 ----------------
+    def subscribe(self, job_id: Optional[str] = None) -> asyncio.Queue:
+        """订阅任务事件（job_id 为空时订阅全部任务）"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[queue] = job_id
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.pop(queue, None)
+
+    def _publish(self, job: PluginJob, event_type: str) -> None:
+        event = {'type': event_type, 'job': job.to_dict()}
+        for queue, job_filter in list(self._subscribers.items()):
+            if job_filter is not None and job_filter != job.id:
+                continue
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(event)
+
+
+# 全局插件任务服务实例
+plugin_job_service = PluginJobService()
+
+
+def get_plugin_job_service() -> PluginJobService:
+    """获取插件任务服务实例"""
+    return plugin_job_service
@@ -1,33 +1,100 @@
 """
 插件广场服务
 """
-import requests
 import time
-import json
 import asyncio
 from pathlib import Path
-from typing import Optional, List
-from models.plugin import Plugin, PluginListResponse
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+
 from models.database import ApiResponse
 from services.git_clone_service import get_git_clone_service
+from services.plugin_index_service import get_plugin_index_service, normalize_manifest
+from services.plugin_inventory_service import get_plugin_inventory_service, public_entry
+from services.plugin_job_service import JOB_SUCCEEDED, JobReporter, PluginJob, PluginJobError, get_plugin_job_service
+from utils.mai_version import read_mai_version
+from utils.trash import remove_tree
+from utils.version_compare import compare_versions, parse_version
 from core.logger import logger
 
+# 插件搜索的排序方式（relevance 仅在有关键词时生效）
+SEARCH_SORT_KEYS: Dict[str, Callable[[dict], Any]] = {
+    'name': lambda plugin: (plugin['manifest'].get('name') or '').lower(),
+    'author': lambda plugin: ((plugin['manifest'].get('author') or {}).get('name') or '').lower(),
+    'version': lambda plugin: parse_version(plugin['manifest'].get('version')) or ((), 0, ''),
+}
+SEARCH_INSTALL_STATUSES = ('installed', 'not-installed', 'update-available')
+SEARCH_MAX_PAGE_SIZE = 100
+
+# 批量安装单次最多插件数量
+BATCH_INSTALL_MAX_PLUGINS = 50
+# 批量安装等待全部完成的最长时间（秒），超时后任务继续在后台执行
+BATCH_INSTALL_WAIT_TIMEOUT = 900
+
+
+def _manifest_dependencies(manifest: dict) -> List[str]:
+    """manifest 中声明的依赖插件ID（dependencies 为字符串或含 id 的对象列表，未声明时为空）"""
+    dependencies = manifest.get("dependencies")
+    if not isinstance(dependencies, list):
+        return []
+    plugin_ids = []
+    for dependency in dependencies:
+        if isinstance(dependency, dict):
+            dependency = dependency.get("id") or dependency.get("plugin_id")
+        if isinstance(dependency, str) and dependency.strip():
+            plugin_ids.append(dependency.strip())
+    return list(dict.fromkeys(plugin_ids))
+
+
+def _order_by_dependencies(plugin_ids: List[str], index: Any) -> Tuple[List[str], Dict[str, List[str]], Set[str]]:
+    """
+    按依赖关系排序批量安装的插件（依赖在前，其余保持请求顺序）
+
+    索引中存在但未在请求中的依赖插件会一并加入。
+
+    Returns:
+        (安装顺序, 插件 -> 依赖插件ID列表, 处于循环依赖中的插件)
+    """
+    dependencies: Dict[str, List[str]] = {}
+    order: List[str] = []
+    cyclic: Set[str] = set()
+    visiting: List[str] = []
+
+    def visit(plugin_id: str) -> None:
+        if plugin_id in visiting:
+            cyclic.update(visiting[visiting.index(plugin_id):])
+            return
+        if plugin_id in dependencies:
+            return
+        plugin = index.by_id.get(plugin_id)
+        dependencies[plugin_id] = _manifest_dependencies(plugin["manifest"]) if plugin else []
+        visiting.append(plugin_id)
+        for dependency in dependencies[plugin_id]:
+            if dependency in index.by_id:
+                visit(dependency)
+        visiting.pop()
+        order.append(plugin_id)
+
+    for plugin_id in plugin_ids:
+        visit(plugin_id)
+    return order, dependencies, cyclic
+
 
 class PluginMarketService:
     """插件广场服务"""
     
-    PLUGIN_DETAILS_URL = "http://jp1-proxy.gitwarp.com:8123/https://raw.githubusercontent.com/DrSmoothl/plugin-repo/refs/heads/main/plugin_details.json"
-    
-    # 缓存已安装插件信息，避免重复文件读取
-    _installed_plugins_cache: Optional[List[dict]] = None
-    _cache_timestamp: float = 0
-    _cache_duration: float = 30  # 缓存30秒
+    _update_check_concurrency: int = 8  # 检查更新时同时进行的 git ls-remote 数量
+    _dependency_waiters: Set[asyncio.Task] = set()  # 等待依赖安装后再提交的批量安装任务
     
     @classmethod
-    async def get_all_plugins(cls) -> ApiResponse:
+    async def get_all_plugins(cls, force_refresh: bool = False) -> ApiResponse:
         """
         获取所有插件列表
         
+        Args:
+            force_refresh: 是否跳过缓存重新拉取插件索引
+        
         Returns:
             ApiResponse: 包含插件列表的响应
         """
@@ -35,76 +102,29 @@ class PluginMarketService:
         logger.info("开始获取所有插件列表")
         
         try:
-            # 发起HTTP请求获取插件详情
-            http_start = time.time()
-            logger.info(f"开始请求插件数据: {cls.PLUGIN_DETAILS_URL}")
-            response = requests.get(cls.PLUGIN_DETAILS_URL, timeout=10)
-            response.raise_for_status()
-            http_duration = time.time() - http_start
-            logger.info(f"HTTP请求完成，耗时: {http_duration:.3f}s")
-            
-            # 解析JSON数据
-            parse_start = time.time()
-            plugin_data = response.json()
-            parse_duration = time.time() - parse_start
-            logger.info(f"JSON解析完成，耗时: {parse_duration:.3f}s，插件数量: {len(plugin_data)}")
-            
-            # 获取已安装的插件（使用缓存）
+            # 获取插件索引（磁盘/内存缓存，过期时条件刷新）
+            index = await get_plugin_index_service().get_index(force_refresh)
+            
+            # 获取已安装插件的匹配索引（清单无变化时复用）
             cache_start = time.time()
-            installed_plugins = await cls._get_installed_plugins_cached()
+            installed_index = await get_plugin_inventory_service().get_match_index()
             cache_duration = time.time() - cache_start
-            logger.info(f"获取已安装插件完成，耗时: {cache_duration:.3f}s，插件数量: {len(installed_plugins)}")
-            
-            # 验证数据格式并转换为Plugin对象
-            process_start = time.time()
-            plugins = []
-            for i, item in enumerate(plugin_data):
-                try:
-                    # 确保基本结构存在
-                    if not isinstance(item, dict):
-                        continue
-                    
-                    plugin_id = item.get('id', f'unknown_{len(plugins)}')
-                    manifest_data = item.get('manifest', {})
-                    
-                    # 快速处理必要字段，减少处理时间
-                    cls._normalize_manifest_data(manifest_data)
-                    
-                    # 快速检查是否已安装（只检查名称匹配）
-                    is_installed = cls._quick_check_installed(manifest_data, installed_plugins)
-                    
-                    plugin = Plugin(id=plugin_id, manifest=manifest_data, installed=is_installed)
-                    plugins.append(plugin)
-                    
-                    # 每处理10个插件记录一次进度
-                    if (i + 1) % 10 == 0:
-                        logger.debug(f"已处理 {i + 1}/{len(plugin_data)} 个插件")
-                        
-                except Exception as e:
-                    # 如果某个插件数据格式错误，跳过该插件但不影响其他插件
-                    logger.warning(f"解析插件数据失败: {item.get('id', 'unknown')}, 错误: {str(e)}")
-                    continue
-            
-            process_duration = time.time() - process_start
-            logger.info(f"插件数据处理完成，耗时: {process_duration:.3f}s，成功处理: {len(plugins)}")
+            logger.info(f"获取已安装插件完成，耗时: {cache_duration:.3f}s，插件数量: {len(installed_index.by_folder)}")
             
-            # 创建响应数据
-            response_start = time.time()
-            plugin_list = PluginListResponse(items=plugins)
-            response_duration = time.time() - response_start
-            logger.info(f"响应数据创建完成，耗时: {response_duration:.3f}s")
+            # 索引中的插件已在拉取时完成标准化与校验，这里只需标记安装状态与可用更新
+            items = [installed_index.annotate(plugin) for plugin in index.items]
             
             total_duration = time.time() - start_time
-            logger.info(f"获取所有插件列表完成，总耗时: {total_duration:.3f}s")
+            logger.info(f"获取所有插件列表完成，总耗时: {total_duration:.3f}s，插件数量: {len(items)}")
             
             return ApiResponse(
                 status=200,
                 message="查询成功",
-                data=plugin_list.dict(),
+                data={"items": items},
                 time=int(time.time() * 1000)
             )
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             error_duration = time.time() - start_time
             logger.error(f"获取插件数据失败，耗时: {error_duration:.3f}s，错误: {str(e)}")
             return ApiResponse(
@@ -124,75 +144,162 @@ class PluginMarketService:
             )
     
     @classmethod
-    def _normalize_manifest_data(cls, manifest_data: dict) -> None:
-        """快速标准化manifest数据"""
-        # 处理manifest_version字段，确保是整数
-        if 'manifest_version' in manifest_data:
-            try:
-                manifest_data['manifest_version'] = int(manifest_data['manifest_version'])
-            except (ValueError, TypeError):
-                manifest_data['manifest_version'] = 1
-        
-        # 确保keywords是列表
-        if 'keywords' not in manifest_data:
-            manifest_data['keywords'] = []
-        elif not isinstance(manifest_data['keywords'], list):
-            manifest_data['keywords'] = []
+    async def search_plugins(
+        cls,
+        query: str = "",
+        category: Optional[str] = None,
+        author: Optional[str] = None,
+        install_status: Optional[str] = None,
+        sort: str = "relevance",
+        order: str = "asc",
+        page: int = 1,
+        page_size: int = 20
+    ) -> ApiResponse:
+        """
+        搜索插件（服务端检索、筛选、排序与分页）
         
-        # 确保author字段存在且格式正确
-        if 'author' not in manifest_data:
-            manifest_data['author'] = {"name": "未知作者"}
-        elif isinstance(manifest_data['author'], str):
-            manifest_data['author'] = {"name": manifest_data['author']}
-        elif not isinstance(manifest_data['author'], dict):
-            manifest_data['author'] = {"name": "未知作者"}
+        Args:
+            query: 关键词，匹配名称/关键词/描述，多个词需全部命中
+            category: 分类
+            author: 作者名（不区分大小写）
+            install_status: installed / not-installed / update-available
+            sort: relevance / name / author / version
+            order: asc / desc（relevance 始终按相关度降序）
+            page: 页码（从1开始）
+            page_size: 每页数量（最多100）
+            
+        Returns:
+            ApiResponse: 包含当前页插件、总数与所有分类的响应
+        """
+        if install_status and install_status not in SEARCH_INSTALL_STATUSES:
+            return ApiResponse(
+                status=400,
+                message=f"不支持的安装状态: {install_status}",
+                data=None,
+                time=int(time.time() * 1000)
+            )
+        if sort != "relevance" and sort not in SEARCH_SORT_KEYS:
+            return ApiResponse(
+                status=400,
+                message=f"不支持的排序方式: {sort}",
+                data=None,
+                time=int(time.time() * 1000)
+            )
+        page = max(1, page)
+        page_size = min(max(1, page_size), SEARCH_MAX_PAGE_SIZE)
         
-        # 确保host_application字段存在且格式正确
-        if 'host_application' not in manifest_data:
-            manifest_data['host_application'] = {"min_version": "0.0.0"}
-        elif not isinstance(manifest_data['host_application'], dict):
-            manifest_data['host_application'] = {"min_version": "0.0.0"}
+        try:
+            index = await get_plugin_index_service().get_index()
+            
+            query = query.strip()
+            if query:
+                candidates = [index.items[position] for position, _ in index.search_index.search(query)]
+            else:
+                candidates = index.items
+            
+            if category:
+                candidates = [
+                    plugin for plugin in candidates
+                    if category in (plugin['manifest'].get('categories') or [])
+                ]
+            if author:
+                author_name = author.strip().lower()
+                candidates = [
+                    plugin for plugin in candidates
+                    if ((plugin['manifest'].get('author') or {}).get('name') or '').strip().lower() == author_name
+                ]
+            
+            if sort in SEARCH_SORT_KEYS:
+                candidates = sorted(candidates, key=SEARCH_SORT_KEYS[sort], reverse=order == "desc")
+            elif not query:
+                candidates = sorted(candidates, key=SEARCH_SORT_KEYS['name'])
+            
+            # 安装状态筛选需要先标记全部候选；否则只标记当前页
+            installed_index = await get_plugin_inventory_service().get_match_index()
+            if install_status:
+                annotated = [installed_index.annotate(plugin) for plugin in candidates]
+                if install_status == "installed":
+                    annotated = [plugin for plugin in annotated if plugin['installed']]
+                elif install_status == "not-installed":
+                    annotated = [plugin for plugin in annotated if not plugin['installed']]
+                else:
+                    annotated = [plugin for plugin in annotated if plugin['update_available']]
+                total = len(annotated)
+                items = annotated[(page - 1) * page_size:page * page_size]
+            else:
+                total = len(candidates)
+                items = [
+                    installed_index.annotate(plugin)
+                    for plugin in candidates[(page - 1) * page_size:page * page_size]
+                ]
+            
+            return ApiResponse(
+                status=200,
+                message="查询成功",
+                data={
+                    "items": items,
+                    "total": total,
+                    "page": page,
+                    "pageSize": page_size,
+                    "categories": index.categories
+                },
+                time=int(time.time() * 1000)
+            )
+            
+        except httpx.HTTPError as e:
+            logger.error(f"搜索插件失败，获取插件数据失败: {str(e)}")
+            return ApiResponse(
+                status=500,
+                message=f"获取插件数据失败: {str(e)}",
+                data=None,
+                time=int(time.time() * 1000)
+            )
+        except Exception as e:
+            logger.error(f"搜索插件失败: {str(e)}")
+            return ApiResponse(
+                status=500,
+                message=f"搜索插件失败: {str(e)}",
+                data=None,
+                time=int(time.time() * 1000)
+            )
     
     @classmethod
-    def _quick_check_installed(cls, manifest_data: dict, installed_plugins: List[dict]) -> bool:
-        """快速检查插件是否已安装（只检查名称匹配，避免复杂计算）"""
-        market_name = manifest_data.get('name', '').strip().lower()
-        if not market_name:
-            return False
-        
-        for installed_plugin in installed_plugins:
-            installed_name = installed_plugin.get('name', '').strip().lower()
-            if market_name == installed_name:
-                return True
-        return False
+    def _normalize_manifest_data(cls, manifest_data: dict) -> None:
+        """快速标准化manifest数据"""
+        normalize_manifest(manifest_data)
     
     @classmethod
-    async def _get_installed_plugins_cached(cls) -> List[dict]:
-        """获取已安装插件信息（带缓存）"""
-        current_time = time.time()
-        
-        # 检查缓存是否有效
-        if (cls._installed_plugins_cache is not None and 
-            current_time - cls._cache_timestamp < cls._cache_duration):
-            logger.debug(f"使用缓存的已安装插件信息，插件数量: {len(cls._installed_plugins_cache)}")
-            return cls._installed_plugins_cache
-        
-        # 缓存过期或不存在，重新获取
-        logger.info("缓存过期，重新获取已安装插件信息")
-        cache_start = time.time()
-        cls._installed_plugins_cache = await cls._get_installed_plugins()
-        cache_duration = time.time() - cache_start
-        cls._cache_timestamp = current_time
-        
-        logger.info(f"重新获取已安装插件完成，耗时: {cache_duration:.3f}s，插件数量: {len(cls._installed_plugins_cache)}")
-        
-        return cls._installed_plugins_cache
+    def _clear_installed_plugins_cache(cls) -> None:
+        """让插件清单在下次读取时立即检查插件目录"""
+        get_plugin_inventory_service().invalidate()
     
     @classmethod
-    def _clear_installed_plugins_cache(cls) -> None:
-        """清除已安装插件缓存"""
-        cls._installed_plugins_cache = None
-        cls._cache_timestamp = 0
+    async def get_installed_plugins(cls, force_refresh: bool = False) -> ApiResponse:
+        """
+        获取已安装插件列表（包括 manifest 无效的插件，其 error 字段说明原因）
+        
+        Args:
+            force_refresh: 是否立即检查插件目录
+            
+        Returns:
+            ApiResponse: 已安装插件列表
+        """
+        try:
+            entries = await get_plugin_inventory_service().get_entries(force_refresh)
+            return ApiResponse(
+                status=200,
+                message="查询成功",
+                data={"items": [public_entry(entry) for entry in entries]},
+                time=int(time.time() * 1000)
+            )
+        except Exception as e:
+            logger.error(f"获取已安装插件失败: {e}")
+            return ApiResponse(
+                status=500,
+                message=f"获取已安装插件失败: {str(e)}",
+                data=None,
+                time=int(time.time() * 1000)
+            )
     
     @classmethod
     async def get_plugin_by_id(cls, plugin_id: str) -> ApiResponse:
@@ -206,28 +313,23 @@ class PluginMarketService:
             ApiResponse: 包含插件详情的响应
         """
         try:
-            # 获取所有插件
-            all_plugins_response = await cls.get_all_plugins()
-            
-            if all_plugins_response.status != 200:
-                return all_plugins_response
-            
-            # 查找指定ID的插件
-            plugins = all_plugins_response.data.get("items", [])
-            for plugin in plugins:
-                if plugin.get("id") == plugin_id:
-                    return ApiResponse(
-                        status=200,
-                        message="查询成功",
-                        data=plugin,
-                        time=int(time.time() * 1000)
-                    )
-            
-            # 未找到插件
+            plugin = await get_plugin_index_service().get_plugin(plugin_id)
+            
+            if plugin is None:
+                # 未找到插件
+                return ApiResponse(
+                    status=404,
+                    message=f"未找到插件: {plugin_id}",
+                    data=None,
+                    time=int(time.time() * 1000)
+                )
+            
+            installed_index = await get_plugin_inventory_service().get_match_index()
+            
             return ApiResponse(
-                status=404,
-                message=f"未找到插件: {plugin_id}",
-                data=None,
+                status=200,
+                message="查询成功",
+                data=installed_index.annotate(plugin),
                 time=int(time.time() * 1000)
             )
             
@@ -242,13 +344,16 @@ class PluginMarketService:
     @classmethod
     async def install_plugin(cls, plugin_id: str) -> ApiResponse:
         """
-        安装插件
+        提交插件安装任务
+
+        检查插件与安装目录后立即返回任务信息，克隆在后台任务队列中执行，
+        可通过任务接口查询或订阅进度。
         
         Args:
             plugin_id: 插件ID
             
         Returns:
-            ApiResponse: 安装结果响应
+            ApiResponse: 包含任务信息的响应
         """
         try:
             # 1. 获取插件详情
@@ -293,12 +398,18 @@ class PluginMarketService:
                     time=int(time.time() * 1000)
                 )
             
-            # 4. 准备安装目录
-            plugins_dir = Path(maimai_root) / "plugins"
-            plugins_dir.mkdir(exist_ok=True)
-            
-            plugin_dir = plugins_dir / plugin_id
-            if plugin_dir.exists():
+            # 4. 检查安装目录
+            plugin_dir = await asyncio.to_thread(cls._plugin_dir_for, maimai_root, plugin_id)
+            if plugin_dir is None:
+                return ApiResponse(
+                    status=400,
+                    message=f"无效的插件ID: {plugin_id}",
+                    data=None,
+                    time=int(time.time() * 1000)
+                )
+            job_service = get_plugin_job_service()
+            active_job = job_service.get_active_job(plugin_id)
+            if active_job is None and await asyncio.to_thread(plugin_dir.exists):
                 return ApiResponse(
                     status=400,
                     message=f"插件已存在: {plugin_id}",
@@ -306,47 +417,484 @@ class PluginMarketService:
                     time=int(time.time() * 1000)
                 )
             
-            # 5. 执行git clone
-            git_clone_service = get_git_clone_service()
+            # 5. 提交安装任务（该插件已有进行中的任务时返回该任务）
+            job = active_job or await job_service.submit("install", plugin_id, {
+                "repository_url": repository_url,
+                "plugin_dir": str(plugin_dir),
+                "is_onekey": is_onekey
+            })
+            
+            return ApiResponse(
+                status=200,
+                message="已加入安装队列",
+                data={"id": job.id, "job": job.to_dict()},
+                time=int(time.time() * 1000)
+            )
+            
+        except Exception as e:
+            return ApiResponse(
+                status=500,
+                message=f"安装失败: {str(e)}",
+                data=None,
+                time=int(time.time() * 1000)
+            )
+    
+    @classmethod
+    async def batch_install_plugins(cls, plugin_ids: List[str], wait: bool = False) -> ApiResponse:
+        """
+        批量安装插件
+        
+        逐个从插件索引解析插件并检查麦麦版本兼容性，通过检查的插件提交到安装任务队列，
+        由队列的工作协程并发克隆（并发数见 plugin_jobs.max_workers）。
+        manifest 中声明了 dependencies 的插件排在其依赖之后，未请求的依赖会一并安装；
+        依赖需要安装时，该插件等依赖安装成功后才提交（status 为 waiting），依赖失败则不再安装。
+        
+        Args:
+            plugin_ids: 插件ID列表（重复的ID只安装一次）
+            wait: 是否等待所有安装任务结束后再返回
+            
+        Returns:
+            ApiResponse: 每个插件的结果（status 为 queued / running / waiting / succeeded / failed /
+            cancelled / skipped / incompatible / not_found）及汇总
+        """
+        plugin_ids = list(dict.fromkeys(plugin_id.strip() for plugin_id in plugin_ids if plugin_id and plugin_id.strip()))
+        if not plugin_ids:
+            return ApiResponse(
+                status=400,
+                message="插件ID列表不能为空",
+                data=None,
+                time=int(time.time() * 1000)
+            )
+        if len(plugin_ids) > BATCH_INSTALL_MAX_PLUGINS:
+            return ApiResponse(
+                status=400,
+                message=f"单次最多安装 {BATCH_INSTALL_MAX_PLUGINS} 个插件",
+                data=None,
+                time=int(time.time() * 1000)
+            )
+        
+        try:
+            index = await get_plugin_index_service().get_index()
+            
+            is_onekey_response = await cls._check_onekey_environment()
+            if is_onekey_response.status != 200:
+                return is_onekey_response
+            is_onekey = is_onekey_response.data.get("isOneKeyEnv", False)
+            
+            maimai_root = await cls._get_maimai_root()
+            if not maimai_root:
+                return ApiResponse(
+                    status=500,
+                    message="无法获取麦麦根目录",
+                    data=None,
+                    time=int(time.time() * 1000)
+                )
+            
+            try:
+                mai_version = await asyncio.to_thread(read_mai_version, maimai_root)
+            except (OSError, ValueError) as e:
+                mai_version = None
+                logger.warning(f"读取麦麦版本号失败，跳过版本兼容性检查: {e}")
+            
+            ordered_ids, dependencies, cyclic = _order_by_dependencies(plugin_ids, index)
+            if len(ordered_ids) > BATCH_INSTALL_MAX_PLUGINS:
+                return ApiResponse(
+                    status=400,
+                    message=f"加上依赖插件共 {len(ordered_ids)} 个，单次最多安装 {BATCH_INSTALL_MAX_PLUGINS} 个插件",
+                    data=None,
+                    time=int(time.time() * 1000)
+                )
+            
+            job_service = get_plugin_job_service()
+            results: Dict[str, Dict[str, Any]] = {}
+            jobs: Dict[str, PluginJob] = {}
+            # 等待依赖安装后再提交的插件，任务结果为提交的安装任务（依赖失败时为 None）
+            deferred: Dict[str, asyncio.Task] = {}
+            for plugin_id in ordered_ids:
+                result: Dict[str, Any] = {"plugin_id": plugin_id, "status": "queued", "message": "已加入安装队列", "job": None}
+                if plugin_id not in plugin_ids:
+                    result["dependency"] = True
+                results[plugin_id] = result
+                
+                plugin = index.by_id.get(plugin_id)
+                if plugin is None:
+                    result.update(status="not_found", message=f"未找到插件: {plugin_id}")
+                    continue
+                manifest = plugin["manifest"]
+                repository_url = manifest.get("repository_url")
+                if not repository_url:
+                    result.update(status="failed", message="插件缺少repository_url字段，无法安装")
+                    continue
+                if plugin_id in cyclic:
+                    result.update(status="failed", message="插件之间存在循环依赖，无法安装")
+                    continue
+                
+                incompatible = cls._check_host_compatibility(manifest, mai_version)
+                if incompatible:
+                    result.update(status="incompatible", message=incompatible)
+                    continue
+                
+                plugin_dir = await asyncio.to_thread(cls._plugin_dir_for, maimai_root, plugin_id)
+                if plugin_dir is None:
+                    result.update(status="failed", message=f"无效的插件ID: {plugin_id}")
+                    continue
+                active_job = job_service.get_active_job(plugin_id)
+                if active_job is None and await asyncio.to_thread(plugin_dir.exists):
+                    result.update(status="skipped", message=f"插件已存在: {plugin_id}")
+                    continue
+                
+                # 依赖未能安装（不在索引中的依赖需已手动安装）
+                unavailable = []
+                for dependency in dependencies[plugin_id]:
+                    if dependency in results:
+                        if results[dependency]["status"] not in ("queued", "waiting", "skipped"):
+                            unavailable.append(dependency)
+                    elif not await asyncio.to_thread(cls._is_plugin_installed, maimai_root, dependency):
+                        unavailable.append(dependency)
+                if unavailable:
+                    result.update(status="failed", message=f"依赖插件无法安装: {', '.join(unavailable)}")
+                    continue
+                
+                params = {
+                    "repository_url": repository_url,
+                    "plugin_dir": str(plugin_dir),
+                    "is_onekey": is_onekey
+                }
+                pending = {
+                    dependency: deferred.get(dependency) or jobs[dependency]
+                    for dependency in dependencies[plugin_id]
+                    if dependency in deferred or dependency in jobs
+                }
+                if active_job is None and pending:
+                    result.update(status="waiting", message=f"等待依赖插件安装: {', '.join(pending)}")
+                    task = asyncio.create_task(cls._submit_after_dependencies(plugin_id, params, pending))
+                    cls._dependency_waiters.add(task)
+                    task.add_done_callback(cls._dependency_waiters.discard)
+                    deferred[plugin_id] = task
+                    continue
+                
+                job = active_job or await job_service.submit("install", plugin_id, params)
+                jobs[plugin_id] = job
+            
+            submitted_count = len(jobs) + len(deferred)
+            if wait and (jobs or deferred):
+                deadline = time.monotonic() + BATCH_INSTALL_WAIT_TIMEOUT
+                await asyncio.gather(*(
+                    job_service.wait(job, BATCH_INSTALL_WAIT_TIMEOUT) for job in jobs.values()
+                ))
+                if deferred:
+                    await asyncio.wait(deferred.values(), timeout=max(deadline - time.monotonic(), 0))
+                    submitted = {
+                        plugin_id: task.result() for plugin_id, task in deferred.items()
+                        if task.done() and task.result() is not None
+                    }
+                    for plugin_id, task in deferred.items():
+                        if task.done() and task.result() is None:
+                            results[plugin_id].update(status="failed", message="依赖插件安装失败，未安装")
+                    await asyncio.gather(*(
+                        job_service.wait(job, max(deadline - time.monotonic(), 0)) for job in submitted.values()
+                    ))
+                    jobs.update(submitted)
+            for plugin_id, job in jobs.items():
+                result = results[plugin_id]
+                result["job"] = job.to_dict()
+                if wait:
+                    result.update(status=job.status, message=job.message)
+            results = list(results.values())
+            
+            summary: Dict[str, int] = {}
+            for result in results:
+                summary[result["status"]] = summary.get(result["status"], 0) + 1
+            logger.info(f"批量安装插件: {len(ordered_ids)} 个，结果: {summary}")
+            
+            return ApiResponse(
+                status=200,
+                message=f"已提交 {submitted_count} 个安装任务",
+                data={"items": results, "summary": summary, "maiVersion": mai_version},
+                time=int(time.time() * 1000)
+            )
+            
+        except Exception as e:
+            logger.error(f"批量安装插件失败: {e}")
+            return ApiResponse(
+                status=500,
+                message=f"批量安装失败: {str(e)}",
+                data=None,
+                time=int(time.time() * 1000)
+            )
+    
+    @classmethod
+    async def _submit_after_dependencies(cls, plugin_id: str, params: Dict[str, Any],
+                                         pending: Dict[str, Any]) -> Optional[PluginJob]:
+        """
+        等待依赖插件安装成功后提交安装任务
+
+        Args:
+            plugin_id: 插件ID
+            params: 安装任务参数
+            pending: 依赖插件ID -> 其安装任务，或等待其依赖的 asyncio.Task
+
+        Returns:
+            Optional[PluginJob]: 提交的安装任务，依赖安装失败时为 None
+        """
+        job_service = get_plugin_job_service()
+        for dependency, source in pending.items():
+            job = await source if isinstance(source, asyncio.Task) else source
+            if job is not None:
+                await job_service.wait(job)
+            if job is None or job.status != JOB_SUCCEEDED:
+                logger.warning(f"依赖插件 {dependency} 安装失败，不再安装 {plugin_id}")
+                return None
+        return job_service.get_active_job(plugin_id) or await job_service.submit("install", plugin_id, params)
+    
+    @classmethod
+    def _is_plugin_installed(cls, maimai_root: str, plugin_id: str) -> bool:
+        """插件目录是否已存在（阻塞操作）"""
+        plugin_dir = cls._plugin_dir_for(maimai_root, plugin_id)
+        return plugin_dir is not None and plugin_dir.exists()
+    
+    @classmethod
+    def _check_host_compatibility(cls, manifest: dict, mai_version: Optional[str]) -> Optional[str]:
+        """检查插件要求的麦麦版本，不兼容时返回原因（版本未知或无法解析时视为兼容）"""
+        if not mai_version:
+            return None
+        host_application = manifest.get("host_application") or {}
+        min_version = host_application.get("min_version")
+        max_version = host_application.get("max_version")
+        if min_version and compare_versions(mai_version, min_version) == -1:
+            return f"需要麦麦 {min_version} 及以上版本（当前 {mai_version}）"
+        if max_version and compare_versions(mai_version, max_version) == 1:
+            return f"仅支持麦麦 {max_version} 及以下版本（当前 {mai_version}）"
+        return None
+    
+    @classmethod
+    async def _run_install_job(cls, job: PluginJob, report: JobReporter) -> dict:
+        """执行插件安装任务（由任务队列调用）"""
+        plugin_dir = Path(job.params["plugin_dir"])
+        if await asyncio.to_thread(plugin_dir.exists):
+            raise PluginJobError(f"插件已存在: {job.plugin_id}")
+        await asyncio.to_thread(plugin_dir.parent.mkdir, exist_ok=True)
+        
+        git_clone_service = get_git_clone_service()
+        completed = False
+        try:
             git_result = await git_clone_service.clone_repository(
-                repository_url, plugin_dir, is_onekey
+                job.params["repository_url"], plugin_dir, job.params.get("is_onekey", False), report
             )
+            completed = git_result.success
+        finally:
+            # 克隆失败、出错或任务被取消时删除未完成的插件目录，避免下次安装提示已存在
+            if not completed:
+                await remove_tree(plugin_dir)
+        
+        details = {
+            "mirror_used": git_result.mirror_used,
+            "attempts": git_result.attempts,
+            "duration": git_result.duration
+        }
+        if not git_result.success:
+            raise PluginJobError(f"安装失败: {git_result.message}", details)
+        
+        # 安装成功，清除缓存以便下次获取最新状态
+        cls._clear_installed_plugins_cache()
+        return {"install_details": details}
+    
+    @classmethod
+    def _plugin_dir_for(cls, maimai_root: str, plugin_id: str) -> Optional[Path]:
+        """
+        插件ID对应的插件目录（必须是 plugins 目录下的直接子目录）
+        
+        Returns:
+            插件目录；ID 为空、含路径分隔符、以 . 开头或为绝对路径时返回 None
+        """
+        if (not plugin_id or plugin_id.startswith('.') or '/' in plugin_id or '\\' in plugin_id
+                or ':' in plugin_id or Path(plugin_id).is_absolute()):
+            return None
+        plugins_dir = Path(maimai_root) / "plugins"
+        plugin_dir = plugins_dir / plugin_id
+        if plugin_dir.resolve().parent != plugins_dir.resolve():
+            return None
+        return plugin_dir
+    
+    @classmethod
+    async def _resolve_repository_url(cls, plugin_id: str, plugin_dir: Path, is_onekey: bool) -> Optional[str]:
+        """获取已安装插件的仓库地址：优先使用插件广场索引，其次使用本地仓库的 origin"""
+        try:
+            plugin = await get_plugin_index_service().get_plugin(plugin_id)
+        except Exception as e:
+            logger.debug(f"查询插件索引失败，改用本地仓库地址: {e}")
+            plugin = None
+        if plugin and plugin['manifest'].get('repository_url'):
+            return plugin['manifest']['repository_url']
+        return await get_git_clone_service().get_origin_url(plugin_dir, is_onekey)
+    
+    @classmethod
+    async def update_plugin(cls, plugin_id: str) -> ApiResponse:
+        """
+        提交插件更新任务（在现有目录中 fetch + reset，失败时重新克隆）
+        
+        Args:
+            plugin_id: 插件ID（即插件目录名）
             
-            if not git_result.success:
+        Returns:
+            ApiResponse: 包含任务信息的响应
+        """
+        try:
+            maimai_root = await cls._get_maimai_root()
+            if not maimai_root:
                 return ApiResponse(
                     status=500,
-                    message=f"安装失败: {git_result.message}",
-                    data={
-                        "error_details": {
-                            "mirror_used": git_result.mirror_used,
-                            "attempts": git_result.attempts,
-                            "duration": git_result.duration
-                        }
-                    },
+                    message="无法获取麦麦根目录",
+                    data=None,
                     time=int(time.time() * 1000)
                 )
             
-            # 安装成功，清除缓存以便下次获取最新状态
-            cls._clear_installed_plugins_cache()
+            plugin_dir = await asyncio.to_thread(cls._plugin_dir_for, maimai_root, plugin_id)
+            if plugin_dir is None:
+                return ApiResponse(
+                    status=400,
+                    message=f"无效的插件ID: {plugin_id}",
+                    data=None,
+                    time=int(time.time() * 1000)
+                )
+            # 只更新插件清单中的插件目录
+            installed_folders = {
+                entry['folder_name'] for entry in await get_plugin_inventory_service().get_entries(force_refresh=True)
+            }
+            if plugin_id not in installed_folders or not await asyncio.to_thread(plugin_dir.is_dir):
+                return ApiResponse(
+                    status=404,
+                    message=f"插件未安装: {plugin_id}",
+                    data=None,
+                    time=int(time.time() * 1000)
+                )
+            
+            is_onekey_response = await cls._check_onekey_environment()
+            if is_onekey_response.status != 200:
+                return is_onekey_response
+            is_onekey = is_onekey_response.data.get("isOneKeyEnv", False)
+            
+            repository_url = await cls._resolve_repository_url(plugin_id, plugin_dir, is_onekey)
+            if not repository_url:
+                return ApiResponse(
+                    status=400,
+                    message="无法确定插件的仓库地址，无法更新",
+                    data=None,
+                    time=int(time.time() * 1000)
+                )
+            
+            job = await get_plugin_job_service().submit("update", plugin_id, {
+                "repository_url": repository_url,
+                "plugin_dir": str(plugin_dir),
+                "is_onekey": is_onekey
+            })
             
             return ApiResponse(
                 status=200,
-                message="安装成功",
-                data={
-                    "id": 1,  # 这里可以返回实际的安装ID
-                    "install_details": {
-                        "mirror_used": git_result.mirror_used,
-                        "attempts": git_result.attempts,
-                        "duration": git_result.duration
+                message="已加入更新队列" if job.kind == "update" else "该插件已有进行中的任务",
+                data={"id": job.id, "job": job.to_dict()},
+                time=int(time.time() * 1000)
+            )
+            
+        except Exception as e:
+            return ApiResponse(
+                status=500,
+                message=f"更新失败: {str(e)}",
+                data=None,
+                time=int(time.time() * 1000)
+            )
+    
+    @classmethod
+    async def _run_update_job(cls, job: PluginJob, report: JobReporter) -> dict:
+        """执行插件更新任务（由任务队列调用）"""
+        git_result = await get_git_clone_service().update_repository(
+            job.params["repository_url"], Path(job.params["plugin_dir"]),
+            job.params.get("is_onekey", False), report
+        )
+        if not git_result.success:
+            raise PluginJobError(f"更新失败: {git_result.message}", git_result.to_dict())
+        
+        cls._clear_installed_plugins_cache()
+        return {"update_details": git_result.to_dict()}
+    
+    @classmethod
+    async def check_updates(cls) -> ApiResponse:
+        """
+        检查所有已安装插件是否有更新
+        
+        对每个Git仓库形式的插件并发执行 git ls-remote（数量受限），与本地提交比较。
+        
+        Returns:
+            ApiResponse: 各插件的本地/远程提交与是否有更新
+        """
+        start_time = time.time()
+        try:
+            maimai_root = await cls._get_maimai_root()
+            if not maimai_root:
+                return ApiResponse(
+                    status=500,
+                    message="无法获取麦麦根目录",
+                    data=None,
+                    time=int(time.time() * 1000)
+                )
+            
+            plugins_dir = Path(maimai_root) / "plugins"
+            plugin_dirs = await asyncio.to_thread(
+                lambda: sorted(
+                    (entry for entry in plugins_dir.iterdir() if (entry / ".git").is_dir()),
+                    key=lambda entry: entry.name
+                ) if plugins_dir.is_dir() else []
+            )
+            
+            is_onekey_response = await cls._check_onekey_environment()
+            is_onekey = bool(is_onekey_response.data and is_onekey_response.data.get("isOneKeyEnv"))
+            git_clone_service = get_git_clone_service()
+            semaphore = asyncio.Semaphore(cls._update_check_concurrency)
+            
+            async def check(plugin_dir: Path) -> dict:
+                async with semaphore:
+                    item = {
+                        "id": plugin_dir.name,
+                        "repository_url": None,
+                        "local_commit": None,
+                        "remote_commit": None,
+                        "update_available": False,
+                        "error": None
                     }
-                },
+                    try:
+                        item["local_commit"] = await git_clone_service.get_local_head(plugin_dir, is_onekey)
+                        repository_url = await cls._resolve_repository_url(plugin_dir.name, plugin_dir, is_onekey)
+                        item["repository_url"] = repository_url
+                        if not repository_url:
+                            item["error"] = "无法确定插件的仓库地址"
+                            return item
+                        remote_commit, error = await git_clone_service.get_remote_head(repository_url, is_onekey)
+                        item["remote_commit"] = remote_commit
+                        item["error"] = error or None
+                        item["update_available"] = bool(
+                            remote_commit and item["local_commit"] and remote_commit != item["local_commit"]
+                        )
+                    except Exception as e:
+                        item["error"] = str(e)
+                    return item
+            
+            items = await asyncio.gather(*(check(plugin_dir) for plugin_dir in plugin_dirs))
+            update_count = sum(1 for item in items if item["update_available"])
+            logger.info(f"插件更新检查完成，耗时: {time.time() - start_time:.3f}s，"
+                        f"检查 {len(items)} 个插件，{update_count} 个有更新")
+            
+            return ApiResponse(
+                status=200,
+                message="检查完成",
+                data={"items": list(items), "updateCount": update_count},
                 time=int(time.time() * 1000)
             )
             
         except Exception as e:
+            logger.error(f"检查插件更新失败: {e}")
             return ApiResponse(
                 status=500,
-                message=f"安装失败: {str(e)}",
+                message=f"检查插件更新失败: {str(e)}",
                 data=None,
                 time=int(time.time() * 1000)
             )
@@ -390,119 +938,7 @@ class PluginMarketService:
         except Exception as e:
             logger.error(f"获取麦麦根目录失败: {e}")
             return None
-    
-    @classmethod
-    async def _get_installed_plugins(cls) -> list[dict]:
-        """获取已安装的插件信息（优化版）"""
-        start_time = time.time()
-        logger.info("开始扫描已安装插件")
-        
-        try:
-            # 获取麦麦根目录
-            root_start = time.time()
-            maimai_root = await cls._get_maimai_root()
-            root_duration = time.time() - root_start
-            logger.debug(f"获取麦麦根目录耗时: {root_duration:.3f}s，路径: {maimai_root}")
-            
-            if not maimai_root:
-                logger.warning("麦麦根目录为空，返回空插件列表")
-                return []
-            
-            plugin_dir = Path(maimai_root) / "plugins"
-            
-            if not plugin_dir.exists():
-                logger.info(f"插件目录不存在: {plugin_dir}")
-                return []
-            
-            # 扫描插件目录
-            scan_start = time.time()
-            plugin_folders = [f for f in plugin_dir.iterdir() if f.is_dir()]
-            scan_duration = time.time() - scan_start
-            logger.info(f"扫描插件目录耗时: {scan_duration:.3f}s，发现 {len(plugin_folders)} 个文件夹")
-            
-            installed_plugins = []
-            
-            # 遍历插件目录下的所有子文件夹，限制处理数量以提高性能
-            process_start = time.time()
-            processed_count = 0
-            
-            for plugin_folder in plugin_folders[:50]:  # 限制最多检查50个插件文件夹
-                try:
-                    # 查找manifest文件，支持多种文件名
-                    manifest_path = None
-                    for manifest_name in ["manifest.json", "_manifest.json", "package.json"]:
-                        potential_path = plugin_folder / manifest_name
-                        if potential_path.exists():
-                            manifest_path = potential_path
-                            break
-                    
-                    if not manifest_path:
-                        logger.debug(f"插件文件夹缺少manifest文件: {plugin_folder.name}")
-                        continue
-                    
-                    # 读取文件并处理编码问题，设置超时以避免阻塞
-                    file_start = time.time()
-                    with open(manifest_path, 'r', encoding='utf-8-sig') as f:
-                        content = f.read(10240)  # 限制读取大小，最多10KB
-                        if len(content) >= 10240:
-                            logger.warning(f"插件manifest文件过大，跳过: {plugin_folder.name}")
-                            continue
-                        
-                        manifest_data = json.loads(content)
-                    
-                    file_duration = time.time() - file_start
-                    
-                    # 标准化插件信息，只保留必要字段
-                    plugin_info = {
-                        'name': manifest_data.get('name', plugin_folder.name),
-                        'version': manifest_data.get('version', '0.0.0'),
-                        'folder_name': plugin_folder.name
-                    }
-                    
-                    installed_plugins.append(plugin_info)
-                    processed_count += 1
-                    
-                    logger.debug(f"处理插件 {plugin_folder.name} 耗时: {file_duration:.3f}s")
-                    
-                except (json.JSONDecodeError, IOError, UnicodeDecodeError):
-                    logger.warning(f"解析插件manifest失败，跳过: {plugin_folder.name}")
-                    continue
-                except Exception:
-                    logger.warning(f"处理插件时发生异常，跳过: {plugin_folder.name}")
-                    continue
-            
-            process_duration = time.time() - process_start
-            total_duration = time.time() - start_time
-            
-            logger.info(f"已安装插件扫描完成 - 总耗时: {total_duration:.3f}s，处理耗时: {process_duration:.3f}s")
-            logger.info(f"成功处理 {processed_count} 个插件，有效插件: {len(installed_plugins)}")
-            
-            return installed_plugins
-            
-        except Exception as e:
-            error_duration = time.time() - start_time
-            logger.error(f"获取已安装插件失败，耗时: {error_duration:.3f}s，错误: {e}")
-            return []
-    
-    @classmethod
-    def _calculate_similarity(cls, installed_plugin: dict, market_plugin: dict) -> float:
-        """计算插件相似度 - 简化版：只检查name和description是否完全匹配"""
-        # 获取市场插件的manifest信息
-        manifest = market_plugin.get('manifest', {})
-        market_name = manifest.get('name', '').strip().lower()
-        market_description = manifest.get('description', '').strip().lower()
-        
-        # 获取已安装插件信息
-        installed_name = installed_plugin.get('name', '').strip().lower()
-        installed_description = installed_plugin.get('description', '').strip().lower()
-        
-        # 如果名称和描述都不为空且完全匹配，则认为是同一插件
-        if (market_name and installed_name and market_name == installed_name and 
-            market_description and installed_description and market_description == installed_description):
-            return 100.0
-        
-        # 如果只有名称匹配且名称不为空，给60%相似度
-        if market_name and installed_name and market_name == installed_name:
-            return 60.0
-            
-        return 0.0
+
+
+get_plugin_job_service().register_handler("install", PluginMarketService._run_install_job)
+get_plugin_job_service().register_handler("update", PluginMarketService._run_update_job)
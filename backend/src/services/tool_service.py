@@ -3,19 +3,148 @@
 用于处理工具相关的业务逻辑
 """
 
+import asyncio
+import hashlib
 import time
-import requests
-from models.tool import GetModelsRequest, ExternalModelsResponse, GetModelsResponseData, GetModelsResponse
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from core.http_client import HttpClient, get_http_client
+from core.logger import logger
+from models.tool import (
+    GetModelsRequest,
+    ExternalModelsResponse,
+    GetModelsResponseData,
+    GetModelsResponse,
+    ProviderProbeResult,
+    ProbeProvidersResponseData
+)
+
+# 模型列表缓存有效期（秒）与最大条目数
+MODEL_LIST_CACHE_TTL = 300
+MODEL_LIST_CACHE_MAX_ENTRIES = 64
+
+# 连通性检测：单个服务商的超时上限（秒）与并发数
+PROBE_TIMEOUT = 10.0
+PROBE_CONCURRENCY = 8
+
+# 获取模型列表的请求超时（秒）
+REQUEST_TIMEOUT = 30.0
+
+ModelCacheKey = Tuple[str, str]
 
 
 class ToolService:
     """工具服务类"""
     
-    def __init__(self):
-        """初始化工具服务"""
-        pass
+    def __init__(self, http_client: Optional[HttpClient] = None):
+        """
+        初始化工具服务
+        
+        Args:
+            http_client: 出站请求使用的HTTP客户端，为 None 时使用应用共享客户端
+        """
+        self._http_client = http_client
+        # (api_url, 密钥指纹) -> (过期时间, 模型ID列表)
+        self._model_cache: Dict[ModelCacheKey, Tuple[float, List[str]]] = {}
+        # 正在进行的模型列表请求，相同服务商的并发请求共享同一次网络调用
+        self._inflight: Dict[ModelCacheKey, asyncio.Future] = {}
+    
+    def set_http_client(self, http_client: Optional[HttpClient]) -> None:
+        """注入HTTP客户端"""
+        self._http_client = http_client
+    
+    def _get_http_client(self) -> HttpClient:
+        return self._http_client or get_http_client()
+    
+    @staticmethod
+    def _cache_key(api_url: str, api_key: str) -> ModelCacheKey:
+        """缓存键: 规范化的API地址 + 密钥指纹（不在内存中以明文做键）"""
+        fingerprint = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+        return api_url.strip().rstrip('/'), fingerprint
+    
+    def _cache_get(self, key: ModelCacheKey) -> Optional[List[str]]:
+        cached = self._model_cache.get(key)
+        if cached is None:
+            return None
+        expires_at, model_ids = cached
+        if expires_at <= time.monotonic():
+            self._model_cache.pop(key, None)
+            return None
+        return model_ids
+    
+    def _cache_put(self, key: ModelCacheKey, model_ids: List[str]) -> None:
+        if len(self._model_cache) >= MODEL_LIST_CACHE_MAX_ENTRIES and key not in self._model_cache:
+            # 淘汰最早过期的条目
+            oldest = min(self._model_cache, key=lambda k: self._model_cache[k][0])
+            self._model_cache.pop(oldest, None)
+        self._model_cache[key] = (time.monotonic() + MODEL_LIST_CACHE_TTL, model_ids)
+    
+    async def _fetch_model_ids(
+        self,
+        api_url: str,
+        api_key: str,
+        client_type: str = 'openai',
+        timeout: float = REQUEST_TIMEOUT,
+        retries: Optional[int] = None
+    ) -> List[str]:
+        """
+        请求服务商的模型列表接口
+        
+        Raises:
+            httpx.HTTPError: 网络或HTTP状态错误
+            ValueError: 响应格式错误
+        """
+        models_url = f"{api_url.strip().rstrip('/')}/models"
+        
+        if client_type == 'gemini':
+            headers = {"x-goog-api-key": api_key}
+        else:
+            headers = {
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json"
+            }
+        
+        response = await self._get_http_client().get(models_url, headers=headers, timeout=timeout, retries=retries)
+        response.raise_for_status()
+        
+        try:
+            response_data = response.json()
+        except ValueError:
+            raise ValueError("响应不是有效的JSON")
+        
+        # Gemini 原生接口: {"models": [{"name": "models/xxx"}]}
+        if client_type == 'gemini' and isinstance(response_data, dict) and 'models' in response_data:
+            return [
+                str(model.get('name', '')).removeprefix('models/')
+                for model in response_data['models'] if isinstance(model, dict)
+            ]
+        
+        # OpenAI 兼容接口
+        external_response = ExternalModelsResponse(**response_data)
+        return [model.id for model in external_response.data]
+    
+    async def _get_model_ids(self, api_url: str, api_key: str, force_refresh: bool = False) -> Tuple[List[str], bool]:
+        """获取模型ID列表，返回 (模型列表, 是否来自缓存)"""
+        key = self._cache_key(api_url, api_key)
+        
+        if not force_refresh:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached, True
+        
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_model_ids(api_url, api_key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        model_ids = await asyncio.shield(task)
+        self._cache_put(key, model_ids)
+        return model_ids, False
     
-    def get_models(self, request: GetModelsRequest) -> GetModelsResponse:
+    async def get_models(self, request: GetModelsRequest) -> GetModelsResponse:
         """
         获取API服务商的模型列表
         
@@ -29,39 +158,23 @@ class ToolService:
             Exception: 当请求失败时抛出异常
         """
         try:
-            # 构建请求URL
-            models_url = f"{request.api_url.rstrip('/')}/models"
-            
-            # 设置请求头
-            headers = {
-                "Authorization": f"Bearer {request.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            # 发送GET请求获取模型列表
-            response = requests.get(models_url, headers=headers, timeout=30.0)
-            response.raise_for_status()
-            
-            # 解析响应JSON
-            response_data = response.json()
-            
-            # 验证响应格式
-            external_response = ExternalModelsResponse(**response_data)
-            
-            # 提取模型ID列表
-            model_ids = [model.id for model in external_response.data]
+            model_ids, cached = await self._get_model_ids(
+                request.api_url,
+                request.api_key,
+                request.force_refresh
+            )
             
             # 构建响应
             return GetModelsResponse(
                 status=200,
                 message="获取模型成功",
-                data=GetModelsResponseData(models=model_ids),
+                data=GetModelsResponseData(models=model_ids, cached=cached),
                 time=int(time.time() * 1000)
             )
                 
-        except requests.exceptions.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             # HTTP状态错误
-            status_code = e.response.status_code if e.response else 0
+            status_code = e.response.status_code
             error_msg = f"API请求失败: HTTP {status_code}"
             if status_code == 401:
                 error_msg = "API密钥无效或已过期"
@@ -69,20 +182,18 @@ class ToolService:
                 error_msg = "API密钥权限不足"
             elif status_code == 404:
                 error_msg = "API地址不存在"
-            elif status_code == 0:
-                error_msg = "网络连接失败，请检查API地址是否正确"
             
             raise Exception(error_msg)
             
-        except requests.exceptions.ConnectionError as e:
+        except httpx.ConnectError as e:
             # 连接错误
             raise Exception(f"网络连接失败: {str(e)}")
             
-        except requests.exceptions.Timeout as e:
+        except httpx.TimeoutException as e:
             # 超时错误
             raise Exception(f"请求超时: {str(e)}")
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             # 其他网络请求错误
             raise Exception(f"网络请求失败: {str(e)}")
             
@@ -90,6 +201,77 @@ class ToolService:
             # 其他错误
             raise Exception(f"获取模型列表失败: {str(e)}")
     
+    async def _probe_provider(self, provider: Dict[str, Any], semaphore: asyncio.Semaphore) -> ProviderProbeResult:
+        """检测单个服务商的连通性"""
+        name = str(provider.get('name') or '')
+        base_url = str(provider.get('base_url') or '')
+        api_key = str(provider.get('api_key') or '')
+        client_type = str(provider.get('client_type') or 'openai')
+        
+        result = ProviderProbeResult(name=name, base_url=base_url)
+        if not self._validate_api_url(base_url):
+            result.error = "API地址格式无效"
+            return result
+        
+        timeout = PROBE_TIMEOUT
+        if isinstance(provider.get('timeout'), (int, float)) and provider['timeout'] > 0:
+            timeout = min(float(provider['timeout']), PROBE_TIMEOUT)
+        
+        async with semaphore:
+            start_time = time.perf_counter()
+            try:
+                # httpx 的超时按阶段计算，这里再限制整体耗时
+                model_ids = await asyncio.wait_for(
+                    self._fetch_model_ids(base_url, api_key, client_type, timeout, retries=0),
+                    timeout
+                )
+                result.reachable = True
+                result.ok = True
+                result.status_code = 200
+                result.model_count = len(model_ids)
+                self._cache_put(self._cache_key(base_url, api_key), model_ids)
+            except httpx.HTTPStatusError as e:
+                result.reachable = True
+                result.status_code = e.response.status_code
+                result.error = f"HTTP {e.response.status_code}"
+            except (httpx.TimeoutException, asyncio.TimeoutError):
+                result.error = f"请求超时（{timeout:g}秒）"
+            except httpx.HTTPError as e:
+                result.error = f"网络连接失败: {str(e) or type(e).__name__}"
+            except Exception as e:
+                # 服务可以访问，但模型列表格式不符合预期
+                result.reachable = True
+                result.status_code = 200
+                result.error = f"响应格式错误: {str(e)}"
+            result.latency_ms = round((time.perf_counter() - start_time) * 1000, 1)
+        
+        return result
+    
+    async def probe_providers(self, providers: List[Dict[str, Any]]) -> ProbeProvidersResponseData:
+        """
+        并发检测所有服务商的连通性与延迟
+        
+        Args:
+            providers: model_config.toml 中的 api_providers 列表
+            
+        Returns:
+            ProbeProvidersResponseData: 检测结果（顺序与输入一致）
+        """
+        semaphore = asyncio.Semaphore(PROBE_CONCURRENCY)
+        results = await asyncio.gather(*[
+            self._probe_provider(provider, semaphore)
+            for provider in providers if isinstance(provider, dict)
+        ])
+        
+        reachable = sum(1 for result in results if result.reachable)
+        logger.info(f'服务商连通性检测完成: {reachable}/{len(results)} 可连接')
+        
+        return ProbeProvidersResponseData(
+            providers=list(results),
+            total=len(results),
+            reachable=reachable
+        )
+    
     def _validate_api_url(self, api_url: str) -> bool:
         """
         验证API URL格式
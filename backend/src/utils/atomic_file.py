@@ -0,0 +1,73 @@
+"""
+原子文件写入工具
+Atomic File Utility
+先写入同目录临时文件并 fsync，再通过 rename 替换目标文件，避免写入中途崩溃导致文件被截断
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Union
+
+
+def atomic_write_bytes(file_path: Union[str, Path], data: bytes) -> None:
+    """
+    原子写入二进制内容
+
+    Args:
+        file_path: 目标文件路径
+        data: 要写入的内容
+    """
+    target = Path(file_path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{target.name}.', suffix='.tmp', dir=str(target.parent))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # 尽量保留原文件权限
+        try:
+            os.chmod(tmp_path, os.stat(target).st_mode & 0o7777)
+        except OSError:
+            pass
+
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    _fsync_directory(target.parent)
+
+
+def atomic_write_text(file_path: Union[str, Path], content: str, encoding: str = 'utf-8') -> None:
+    """
+    原子写入文本内容
+
+    Args:
+        file_path: 目标文件路径
+        content: 文本内容
+        encoding: 文件编码
+    """
+    atomic_write_bytes(file_path, content.encode(encoding))
+
+
+def _fsync_directory(dir_path: Path) -> None:
+    """同步目录项，确保 rename 落盘（Windows 不支持，直接忽略）"""
+    if os.name == 'nt':
+        return
+    try:
+        fd = os.open(str(dir_path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
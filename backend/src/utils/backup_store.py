@@ -0,0 +1,118 @@
+"""
+配置备份存储
+Backup Store
+按内容哈希去重保存配置文件备份，只保留有限数量的历史版本
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from utils.atomic_file import atomic_write_bytes, atomic_write_text
+
+DEFAULT_MAX_GENERATIONS = 20
+
+INDEX_FILE_NAME = 'index.json'
+OBJECTS_DIR_NAME = 'objects'
+
+
+class BackupStore:
+    """
+    内容寻址的备份存储
+
+    目录结构:
+        <backup_dir>/index.json          -> 版本索引（从旧到新）
+        <backup_dir>/objects/<sha256>    -> 备份内容，相同内容只保存一份
+    """
+
+    def __init__(self, backup_dir: Union[str, Path], max_generations: int = DEFAULT_MAX_GENERATIONS):
+        self.backup_dir = Path(backup_dir)
+        self.objects_dir = self.backup_dir / OBJECTS_DIR_NAME
+        self.index_path = self.backup_dir / INDEX_FILE_NAME
+        self.max_generations = max(1, max_generations)
+
+    # ---------------- 索引 ----------------
+    def _load_index(self) -> Dict[str, Any]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if isinstance(index, dict) and isinstance(index.get('generations'), list):
+                return index
+        except (OSError, ValueError):
+            pass
+        return {'version': 1, 'generations': []}
+
+    def _save_index(self, index: Dict[str, Any]) -> None:
+        atomic_write_text(self.index_path, json.dumps(index, ensure_ascii=False, indent=2))
+
+    def list_generations(self) -> List[Dict[str, Any]]:
+        """获取所有备份版本（从旧到新），只读取索引文件"""
+        return self._load_index()['generations']
+
+    # ---------------- 对象 ----------------
+    def object_path(self, content_hash: str) -> Path:
+        return self.objects_dir / content_hash
+
+    def read_object(self, content_hash: str) -> bytes:
+        """读取某个备份内容"""
+        with open(self.object_path(content_hash), 'rb') as f:
+            return f.read()
+
+    def store_bytes(self, data: bytes, source_name: str = '', extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        保存一份内容为新的备份版本
+
+        内容与最新版本相同时不新增版本；内容已存在于对象目录时不重复写入。
+
+        Returns:
+            对应的版本记录
+        """
+        content_hash = hashlib.sha256(data).hexdigest()
+        index = self._load_index()
+        generations = index['generations']
+
+        if generations and generations[-1]['hash'] == content_hash:
+            return generations[-1]
+
+        object_path = self.object_path(content_hash)
+        if not object_path.exists():
+            atomic_write_bytes(object_path, data)
+
+        next_id = (generations[-1]['id'] + 1) if generations else 1
+        generation = {
+            'id': next_id,
+            'hash': content_hash,
+            'size': len(data),
+            'source': source_name,
+            'created_at': int(time.time() * 1000)
+        }
+        if extra:
+            generation.update(extra)
+        generations.append(generation)
+
+        removed = generations[:-self.max_generations]
+        index['generations'] = generations[-self.max_generations:]
+        self._save_index(index)
+        self._remove_unreferenced(removed, index['generations'])
+
+        return generation
+
+    def backup_file(self, file_path: Union[str, Path], extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """备份文件当前内容"""
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        return self.store_bytes(data, os.path.basename(str(file_path)), extra)
+
+    def _remove_unreferenced(self, removed: List[Dict[str, Any]], kept: List[Dict[str, Any]]) -> None:
+        """删除已不被任何版本引用的对象"""
+        kept_hashes = {generation['hash'] for generation in kept}
+        for generation in removed:
+            if generation['hash'] in kept_hashes:
+                continue
+            try:
+                self.object_path(generation['hash']).unlink()
+            except OSError:
+                pass
@@ -0,0 +1,129 @@
+"""
+配置文件缓存
+Config File Cache
+按路径缓存已解析的TOML配置，通过 (mtime_ns, size) 校验文件是否被外部修改
+"""
+
+import os
+from typing import Any, Dict, Optional, Type, TypeVar
+
+import toml
+import tomlkit
+from pydantic import BaseModel
+
+T = TypeVar('T', bound=BaseModel)
+
+
+class ConfigReadError(RuntimeError):
+    """配置文件读取失败"""
+
+
+class ConfigParseError(ValueError):
+    """配置文件TOML格式错误"""
+
+
+class ConfigCacheEntry:
+    """单个配置文件的缓存项"""
+
+    def __init__(self, path: str, mtime_ns: int, size: int, text: str, data: Dict[str, Any]):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.text = text
+        self.data = data  # 只读：调用方需要修改时请使用模型的 model_dump() 副本
+        self.models: Dict[type, BaseModel] = {}
+        self._document: Optional[tomlkit.TOMLDocument] = None
+
+    @property
+    def document(self) -> tomlkit.TOMLDocument:
+        """保留注释与格式的tomlkit文档（首次访问时解析）"""
+        if self._document is None:
+            self._document = tomlkit.parse(self.text)
+        return self._document
+
+    def matches(self, stat_result: os.stat_result) -> bool:
+        """检查缓存是否与文件当前状态一致"""
+        return self.mtime_ns == stat_result.st_mtime_ns and self.size == stat_result.st_size
+
+
+class ConfigFileCache:
+    """TOML配置文件缓存
+
+    重复读取同一文件时只做一次 stat；文件被 MaiBot 或用户手动修改后，
+    mtime/size 变化会触发重新读取与解析。
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, ConfigCacheEntry] = {}
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def load(self, path: str, encoding: str = 'utf-8') -> ConfigCacheEntry:
+        """读取并解析配置文件（命中缓存时直接返回）
+
+        Raises:
+            FileNotFoundError: 文件不存在
+            ConfigReadError: 文件读取失败
+            ConfigParseError: TOML格式错误
+        """
+        key = self._key(path)
+        stat_result = os.stat(path)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.matches(stat_result):
+            return entry
+
+        try:
+            with open(path, 'r', encoding=encoding) as f:
+                text = f.read()
+        except Exception as error:
+            raise ConfigReadError(str(error)) from error
+
+        try:
+            data = toml.loads(text)
+        except Exception as error:
+            raise ConfigParseError(str(error)) from error
+
+        entry = ConfigCacheEntry(path, stat_result.st_mtime_ns, stat_result.st_size, text, data)
+        self._entries[key] = entry
+        return entry
+
+    def get_model(self, path: str, model_class: Type[T], encoding: str = 'utf-8') -> T:
+        """获取配置文件对应的Pydantic模型（同一文件版本只构建一次）"""
+        entry = self.load(path, encoding)
+        model = entry.models.get(model_class)
+        if model is None:
+            model = model_class(**entry.data)
+            entry.models[model_class] = model
+        return model
+
+    def store(
+        self,
+        path: str,
+        text: str,
+        data: Dict[str, Any],
+        document: Optional[tomlkit.TOMLDocument] = None
+    ) -> ConfigCacheEntry:
+        """写入文件后直接更新缓存，避免下次读取时重新解析"""
+        stat_result = os.stat(path)
+        entry = ConfigCacheEntry(path, stat_result.st_mtime_ns, stat_result.st_size, text, data)
+        entry._document = document
+        self._entries[self._key(path)] = entry
+        return entry
+
+    def peek(self, path: str) -> Optional[ConfigCacheEntry]:
+        """获取缓存项（不校验文件状态）"""
+        return self._entries.get(self._key(path))
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """使缓存失效，path为None时清空全部缓存"""
+        if path is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(self._key(path), None)
+
+
+# 全局配置文件缓存实例
+config_file_cache = ConfigFileCache()
@@ -0,0 +1,148 @@
+"""
+配置变更历史
+Config History
+基于 BackupStore 的内容寻址快照，为每个版本记录相对上一版本的结构化差异，
+支持列出版本、对比任意两个版本以及回滚
+"""
+
+import hashlib
+import os
+from typing import Any, Dict, List, Optional, Union
+
+import toml
+
+from utils.atomic_file import atomic_write_bytes
+from utils.backup_store import BackupStore
+from utils.config_cache import config_file_cache
+
+# 索引中每个版本最多保存的变更路径数量（完整差异通过 diff 接口按需计算）
+MAX_INDEXED_CHANGES = 20
+
+CURRENT_VERSION = 'current'
+
+
+def _join_path(path: str, key: Union[str, int]) -> str:
+    if isinstance(key, int):
+        return f'{path}[{key}]'
+    return f'{path}.{key}' if path else key
+
+
+def structural_diff(old: Any, new: Any, path: str = '') -> List[Dict[str, Any]]:
+    """
+    计算两个配置对象之间的结构化差异
+
+    Returns:
+        变更列表，每项包含 op(add/remove/replace)、path 以及 old/new 值
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes: List[Dict[str, Any]] = []
+        for key, old_value in old.items():
+            child_path = _join_path(path, key)
+            if key not in new:
+                changes.append({'op': 'remove', 'path': child_path, 'old': old_value})
+            else:
+                changes.extend(structural_diff(old_value, new[key], child_path))
+        for key, new_value in new.items():
+            if key not in old:
+                changes.append({'op': 'add', 'path': _join_path(path, key), 'new': new_value})
+        return changes
+
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        changes = []
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            changes.extend(structural_diff(old_item, new_item, _join_path(path, index)))
+        return changes
+
+    if old != new or type(old) is not type(new):
+        return [{'op': 'replace', 'path': path, 'old': old, 'new': new}]
+    return []
+
+
+def _parse(data: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        return toml.loads(data.decode('utf-8'))
+    except Exception:
+        return None
+
+
+class ConfigHistory:
+    """单个配置文件的变更历史"""
+
+    def __init__(self, store: BackupStore, config_path: str):
+        self.store = store
+        self.config_path = config_path
+
+    def record(self, origin: str, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        把配置文件当前内容记录为一个版本
+
+        内容与最新版本一致时不新增版本；否则与最新版本做结构化差异并写入索引。
+
+        Args:
+            origin: 版本来源（save/external/rollback/initial）
+            extra: 额外写入索引的字段
+        """
+        with open(self.config_path, 'rb') as f:
+            data = f.read()
+
+        generations = self.store.list_generations()
+        previous = generations[-1] if generations else None
+        if previous is not None and previous['hash'] == hashlib.sha256(data).hexdigest():
+            return previous
+
+        info: Dict[str, Any] = {'origin': origin if previous else 'initial'}
+        if extra:
+            info.update(extra)
+
+        if previous is not None:
+            try:
+                old_data = _parse(self.store.read_object(previous['hash']))
+            except OSError:
+                old_data = None
+            new_data = _parse(data)
+            if old_data is not None and new_data is not None:
+                changes = structural_diff(old_data, new_data)
+                info['change_count'] = len(changes)
+                info['changes'] = [
+                    {'op': change['op'], 'path': change['path']}
+                    for change in changes[:MAX_INDEXED_CHANGES]
+                ]
+
+        return self.store.store_bytes(data, os.path.basename(self.config_path), info)
+
+    def list_versions(self) -> List[Dict[str, Any]]:
+        """列出所有版本（从新到旧，仅读取索引）"""
+        return list(reversed(self.store.list_generations()))
+
+    def _find_generation(self, version_id: int) -> Dict[str, Any]:
+        for generation in self.store.list_generations():
+            if generation['id'] == version_id:
+                return generation
+        raise ValueError(f'版本不存在: {version_id}')
+
+    def _load_version(self, version: Union[int, str]) -> Dict[str, Any]:
+        if version == CURRENT_VERSION:
+            return dict(config_file_cache.load(self.config_path).data)
+        generation = self._find_generation(int(version))
+        parsed = _parse(self.store.read_object(generation['hash']))
+        if parsed is None:
+            raise ValueError(f'版本内容无法解析: {version}')
+        return parsed
+
+    def diff(self, from_version: Union[int, str], to_version: Union[int, str] = CURRENT_VERSION) -> List[Dict[str, Any]]:
+        """对比两个版本（版本号或 current）"""
+        return structural_diff(self._load_version(from_version), self._load_version(to_version))
+
+    def rollback(self, version_id: int) -> Dict[str, Any]:
+        """
+        回滚到指定版本
+
+        回滚前先记录当前内容，回滚后的内容作为新版本记录。
+        """
+        generation = self._find_generation(version_id)
+        content = self.store.read_object(generation['hash'])
+
+        self.record('external')
+        atomic_write_bytes(self.config_path, content)
+        config_file_cache.invalidate(self.config_path)
+        return self.record('rollback', {'rollback_to': version_id})
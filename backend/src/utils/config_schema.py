@@ -0,0 +1,147 @@
+"""
+配置校验器
+Config Schema
+TOML 值结构校验在模块加载时编译为 Pydantic TypeAdapter（由 pydantic-core 执行），
+配置节专用规则按节名注册，保存时只校验发生变化的配置节
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from pydantic import (
+    AfterValidator,
+    Strict,
+    StrictBool,
+    StrictFloat,
+    StrictInt,
+    StrictStr,
+    StringConstraints,
+    TypeAdapter,
+    ValidationError
+)
+from typing_extensions import Annotated, TypeAliasType
+
+SectionRule = Callable[[Any], None]
+
+_MISSING = object()
+
+
+def _check_homogeneous(items: List[Any]) -> List[Any]:
+    """TOML 数组元素类型必须一致"""
+    if items:
+        first_type = type(items[0])
+        if not all(isinstance(item, first_type) for item in items):
+            raise ValueError('数组元素类型不一致')
+    return items
+
+
+TomlKey = Annotated[str, StringConstraints(pattern=r'\S')]
+
+TomlValue = TypeAliasType(
+    'TomlValue',
+    Union[
+        StrictStr,
+        StrictBool,
+        StrictInt,
+        StrictFloat,
+        None,
+        Annotated[List['TomlValue'], Strict(), AfterValidator(_check_homogeneous)],
+        Dict[TomlKey, 'TomlValue']
+    ]
+)
+
+# 整个配置文档（或其中若干配置节）的结构校验器，只编译一次
+_DOCUMENT_ADAPTER: TypeAdapter = TypeAdapter(Dict[TomlKey, TomlValue])
+
+
+def _is_valid_toml_type(value: Any) -> bool:
+    """检查值是否是TOML支持的类型"""
+    return (
+        isinstance(value, (str, int, float, bool)) or
+        value is None or
+        isinstance(value, list) or
+        isinstance(value, dict)
+    )
+
+
+def explain_invalid(obj: Any, path: str = '') -> None:
+    """
+    逐项遍历配置数据，抛出指明具体配置项的 ValueError
+
+    编译后的校验器只负责快速判断，校验失败时再调用此函数生成可读的错误信息。
+    """
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            current_path = f'{path}.{key}' if path else key
+
+            # 检查键名
+            if not isinstance(key, str) or not key.strip():
+                raise ValueError(f'配置项键名无效: {current_path}')
+
+            # 检查值类型（TOML支持的类型）
+            if not _is_valid_toml_type(value):
+                raise ValueError(f'配置项类型不支持: {current_path} ({type(value).__name__})')
+
+            # 递归验证嵌套对象
+            if isinstance(value, (dict, list)):
+                explain_invalid(value, current_path)
+
+    elif isinstance(obj, list):
+        # 验证数组元素类型一致性
+        if obj:
+            first_type = type(obj[0])
+            if not all(isinstance(item, first_type) for item in obj):
+                raise ValueError(f'数组元素类型不一致: {path}')
+
+            # 递归验证数组元素
+            for i, item in enumerate(obj):
+                explain_invalid(item, f'{path}[{i}]')
+
+
+def changed_sections(current: Dict[str, Any], update: Dict[str, Any]) -> List[str]:
+    """获取更新数据中与当前配置不同的顶层配置节"""
+    return [key for key, value in update.items() if current.get(key, _MISSING) != value]
+
+
+class ConfigSchema:
+    """
+    配置文件校验器
+
+    Args:
+        section_rules: 配置节专用规则，键为顶层配置节名称，值为接收该节数据的校验函数
+    """
+
+    def __init__(self, section_rules: Optional[Dict[str, SectionRule]] = None):
+        self.section_rules: Dict[str, SectionRule] = dict(section_rules or {})
+
+    def validate(self, data: Dict[str, Any], sections: Optional[Iterable[str]] = None) -> None:
+        """
+        校验配置数据
+
+        Args:
+            data: 配置数据
+            sections: 只校验这些顶层配置节，为 None 时校验全部
+
+        Raises:
+            ValueError: 校验失败
+        """
+        if not isinstance(data, dict):
+            raise ValueError('配置数据必须是一个对象')
+
+        if sections is not None:
+            data = {key: data[key] for key in sections if key in data}
+
+        # 配置节专用规则
+        for name, value in data.items():
+            rule = self.section_rules.get(name)
+            if rule is not None:
+                rule(value)
+
+        # 通用TOML结构校验
+        try:
+            _DOCUMENT_ADAPTER.validate_python(data)
+        except ValidationError as error:
+            explain_invalid(data)
+            # 两种校验理论上一致，兜底返回 pydantic 的错误描述
+            first = error.errors()[0]
+            location = '.'.join(str(part) for part in first['loc'])
+            raise ValueError(f'配置数据格式错误: {location} ({first["msg"]})')
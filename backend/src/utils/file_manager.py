@@ -3,12 +3,14 @@
 File Manager Utility
 """
 
+import asyncio
 import json
 import aiofiles
 from pathlib import Path
 from typing import Optional, TypeVar, Type
 from pydantic import BaseModel
 from core.logger import logger
+from utils.atomic_file import atomic_write_text
 
 T = TypeVar('T', bound=BaseModel)
 
@@ -85,9 +87,8 @@ class FileManager:
             json_data = data.model_dump(exclude_none=False)
             json_str = json.dumps(json_data, ensure_ascii=False, indent=2)
             
-            # 写入文件
-            async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
-                await f.write(json_str)
+            # 原子写入文件（临时文件 + fsync + rename），避免中途崩溃截断原文件
+            await asyncio.to_thread(atomic_write_text, file_path, json_str)
             
             logger.debug(f"JSON文件写入成功: {file_path}")
             return True
@@ -0,0 +1,197 @@
+"""
+Git对象缓存
+Git Object Cache
+按仓库地址在本地保存裸仓库，克隆时先把远程更新拉取到缓存，再从缓存本地克隆；
+缓存总大小超过上限时按最近使用时间淘汰（LRU）
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from core.logger import logger
+from utils.atomic_file import atomic_write_text
+
+GIT_OBJECT_CACHE_ROOT = Path('data') / 'git_cache'
+INDEX_FILE_NAME = 'index.json'
+
+
+def normalize_cache_key(repository_url: str) -> str:
+    """
+    规范化仓库地址作为缓存键
+
+    去掉镜像前缀、协议、大小写差异与结尾的 / 和 .git，
+    使同一仓库经不同镜像或写法得到相同的键。
+    """
+    url = repository_url.strip()
+    index = url.find('github.com/')
+    if index >= 0:
+        url = url[index:]
+    url = re.sub(r'^[a-z]+://', '', url, flags=re.IGNORECASE)
+    url = url.rstrip('/')
+    if url.endswith('.git'):
+        url = url[:-4]
+    return url.lower()
+
+
+def _directory_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class GitObjectCache:
+    """
+    Git裸仓库缓存
+
+    只负责缓存目录的定位、使用记录与淘汰，git 操作由调用方完成；
+    同一仓库的拉取与克隆需在 lock(url) 内进行，持有锁的仓库不会被淘汰；
+    record_use / remove / clear 在线程中调用，使用记录由线程锁保护。
+
+    Args:
+        root: 缓存根目录
+        max_bytes: 缓存总大小上限（字节）
+    """
+
+    def __init__(self, root: Path = GIT_OBJECT_CACHE_ROOT, max_bytes: int = 1024 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # 保护 _entries 与索引文件（多个线程可能同时记录使用或淘汰）
+        self._entries_lock = threading.RLock()
+
+    # ---------------- 索引 ----------------
+    @property
+    def _index_path(self) -> Path:
+        return self.root / INDEX_FILE_NAME
+
+    def _load_entries(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            try:
+                with open(self._index_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self._entries = data if isinstance(data, dict) else {}
+            except FileNotFoundError:
+                self._entries = {}
+            except Exception as e:
+                logger.warning(f'读取Git缓存索引失败，重新建立: {e}')
+                self._entries = {}
+        return self._entries
+
+    def _save_entries(self) -> None:
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(self._index_path, json.dumps(self._load_entries(), ensure_ascii=False, indent=2))
+        except Exception as e:
+            logger.warning(f'保存Git缓存索引失败: {e}')
+
+    # ---------------- 定位 ----------------
+    def path_for(self, repository_url: str) -> Path:
+        """仓库对应的缓存目录（可读的仓库名 + 键的哈希）"""
+        key = normalize_cache_key(repository_url)
+        slug = re.sub(r'[^a-z0-9._-]+', '-', key.split('/', 1)[-1]).strip('-')[:48] or 'repo'
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+        return self.root / f'{slug}-{digest}.git'
+
+    def lock(self, repository_url: str) -> asyncio.Lock:
+        """同一仓库缓存的操作锁"""
+        key = normalize_cache_key(repository_url)
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    # ---------------- 使用记录与淘汰 ----------------
+    def record_use(self, repository_url: str) -> None:
+        """记录一次使用并更新缓存大小，之后按需淘汰（阻塞操作，应在线程中调用）"""
+        key = normalize_cache_key(repository_url)
+        path = self.path_for(repository_url)
+        size = _directory_size(path) if path.exists() else 0
+        with self._entries_lock:
+            self._load_entries()[key] = {
+                'url': repository_url,
+                'path': path.name,
+                'size': size,
+                'lastUsed': time.time()
+            }
+            self._evict()
+            self._save_entries()
+
+    def remove(self, repository_url: str) -> None:
+        """删除仓库缓存（如缓存损坏时，阻塞操作）"""
+        key = normalize_cache_key(repository_url)
+        shutil.rmtree(self.path_for(repository_url), ignore_errors=True)
+        with self._entries_lock:
+            if self._load_entries().pop(key, None) is not None:
+                self._save_entries()
+
+    def clear(self) -> int:
+        """清空所有未在使用中的缓存，返回释放的字节数（阻塞操作）"""
+        with self._entries_lock:
+            entries = self._load_entries()
+            freed = 0
+            for key in list(entries):
+                if self._is_locked(key):
+                    continue
+                freed += entries[key].get('size', 0)
+                shutil.rmtree(self.root / entries[key]['path'], ignore_errors=True)
+                del entries[key]
+            self._save_entries()
+        return freed
+
+    def _is_locked(self, key: str) -> bool:
+        lock = self._locks.get(key)
+        return lock is not None and lock.locked()
+
+    def _evict(self) -> None:
+        # 调用方需持有 _entries_lock
+        entries = self._load_entries()
+        total = sum(entry.get('size', 0) for entry in entries.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(entries, key=lambda k: entries[k].get('lastUsed', 0)):
+            if total <= self.max_bytes:
+                break
+            # 正在拉取或克隆的仓库不淘汰
+            if self._is_locked(key):
+                continue
+            entry = entries.pop(key)
+            shutil.rmtree(self.root / entry['path'], ignore_errors=True)
+            total -= entry.get('size', 0)
+            logger.info(f'Git缓存超出上限，已淘汰: {entry["url"]}')
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计（按最近使用时间倒序）"""
+        with self._entries_lock:
+            snapshot = [{'key': key, **entry} for key, entry in self._load_entries().items()]
+        items: List[Dict[str, Any]] = sorted(
+            snapshot,
+            key=lambda item: item.get('lastUsed', 0),
+            reverse=True
+        )
+        return {
+            'totalSize': sum(item.get('size', 0) for item in items),
+            'maxSize': self.max_bytes,
+            'items': [
+                {
+                    'url': item['url'],
+                    'size': item.get('size', 0),
+                    'lastUsed': int(item.get('lastUsed', 0) * 1000)
+                }
+                for item in items
+            ]
+        }
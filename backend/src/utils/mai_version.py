@@ -0,0 +1,33 @@
+"""
+麦麦版本号读取
+MaiBot Version
+从麦麦根目录下的 src/config/config.py 中读取 MMC_VERSION
+"""
+
+import re
+from pathlib import Path
+from typing import Union
+
+_VERSION_PATTERN = re.compile(r'MMC_VERSION\s*=\s*["\']([^"\']+)["\']')
+
+
+def read_mai_version(main_root: Union[str, Path]) -> str:
+    """
+    读取麦麦版本号（预览版去掉 snapshot 后缀，如 0.10.1.snapshot.1 -> 0.10.1）
+
+    Raises:
+        FileNotFoundError: 麦麦配置文件不存在
+        ValueError: 配置文件中未找到版本号
+    """
+    config_file_path = Path(main_root) / "src" / "config" / "config.py"
+    with open(config_file_path, 'r', encoding='utf-8') as file:
+        content = file.read()
+
+    version_match = _VERSION_PATTERN.search(content)
+    if not version_match:
+        raise ValueError("在配置文件中未找到版本号")
+
+    raw_version = version_match.group(1)
+    if '.snapshot.' in raw_version:
+        return raw_version.split('.snapshot.')[0]
+    return raw_version
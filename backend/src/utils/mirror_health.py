@@ -0,0 +1,138 @@
+"""
+镜像健康度统计
+Mirror Health Tracker
+记录每个镜像的延迟与成功率（指数加权移动平均），连续失败时熔断一段时间，
+并据此对镜像排序，让下一次请求优先使用又快又稳定的镜像
+"""
+
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+# EWMA 平滑系数：越大越看重最近一次结果
+DEFAULT_ALPHA = 0.3
+# 连续失败达到该次数后熔断
+DEFAULT_FAILURE_THRESHOLD = 3
+# 熔断时长（秒），之后允许一次试探请求（半开）
+DEFAULT_OPEN_SECONDS = 60.0
+# 尚无统计数据的镜像按该延迟估算（秒）
+DEFAULT_LATENCY = 2.0
+
+
+class MirrorHealth:
+    """单个镜像的健康度"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.ewma_latency: Optional[float] = None
+        self.success_rate: float = 1.0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.last_latency: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.updated_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        """是否处于熔断状态"""
+        return self.open_until > time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'ewmaLatencyMs': round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+            'lastLatencyMs': round(self.last_latency * 1000, 1) if self.last_latency is not None else None,
+            'successRate': round(self.success_rate, 3),
+            'successes': self.successes,
+            'failures': self.failures,
+            'consecutiveFailures': self.consecutive_failures,
+            'circuitOpen': self.is_open,
+            'lastError': self.last_error,
+            'updatedAt': int(self.updated_at * 1000) if self.updated_at else None
+        }
+
+
+class MirrorHealthTracker:
+    """镜像健康度统计器"""
+
+    def __init__(
+        self,
+        alpha: float = DEFAULT_ALPHA,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        open_seconds: float = DEFAULT_OPEN_SECONDS,
+        default_latency: float = DEFAULT_LATENCY
+    ):
+        self.alpha = alpha
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.default_latency = default_latency
+        self._mirrors: Dict[str, MirrorHealth] = {}
+
+    def get(self, name: str) -> MirrorHealth:
+        health = self._mirrors.get(name)
+        if health is None:
+            health = MirrorHealth(name)
+            self._mirrors[name] = health
+        return health
+
+    def record_success(self, name: str, latency: Optional[float] = None) -> None:
+        """记录一次成功及其延迟（秒，为 None 时只更新成功率）"""
+        health = self.get(name)
+        health.successes += 1
+        health.consecutive_failures = 0
+        health.open_until = 0.0
+        health.last_error = None
+        if latency is not None:
+            health.last_latency = latency
+            health.ewma_latency = latency if health.ewma_latency is None else (
+                self.alpha * latency + (1 - self.alpha) * health.ewma_latency
+            )
+        health.success_rate = self.alpha + (1 - self.alpha) * health.success_rate
+        health.updated_at = time.time()
+
+    def record_failure(self, name: str, error: str = '', latency: Optional[float] = None) -> None:
+        """记录一次失败，连续失败达到阈值时熔断"""
+        health = self.get(name)
+        health.failures += 1
+        health.consecutive_failures += 1
+        health.last_error = error or None
+        if latency is not None:
+            health.last_latency = latency
+        health.success_rate = (1 - self.alpha) * health.success_rate
+        health.updated_at = time.time()
+        if health.consecutive_failures >= self.failure_threshold:
+            health.open_until = time.monotonic() + self.open_seconds
+
+    def is_available(self, name: str) -> bool:
+        """镜像是否可用（未熔断或熔断已到期）"""
+        health = self._mirrors.get(name)
+        return health is None or not health.is_open
+
+    def score(self, name: str) -> float:
+        """预期耗时评分，越小越好：平均延迟 / 成功率"""
+        health = self._mirrors.get(name)
+        if health is None:
+            return self.default_latency
+        latency = health.ewma_latency if health.ewma_latency is not None else self.default_latency
+        return latency / max(health.success_rate, 0.05)
+
+    def rank(self, names: Iterable[str]) -> List[str]:
+        """
+        按健康度排序镜像
+
+        可用镜像在前、按评分升序；评分相同时保持传入顺序（即配置的优先级）。
+        熔断中的镜像排在最后，只有其他镜像都失败时才会被尝试。
+        """
+        ordered = list(names)
+        position = {name: index for index, name in enumerate(ordered)}
+        return sorted(
+            ordered,
+            key=lambda name: (not self.is_available(name), self.score(name), position[name])
+        )
+
+    def snapshot(self, names: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """导出统计数据"""
+        if names is None:
+            return [health.to_dict() for health in self._mirrors.values()]
+        return [self.get(name).to_dict() for name in names]
@@ -0,0 +1,119 @@
+"""
+插件搜索索引
+Plugin Search Index
+为插件广场建立倒排索引（名称 / 关键词 / 描述），支持多词、前缀与中文检索并按相关度评分
+"""
+
+import bisect
+import re
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+# 英文与数字按词切分；中文按单字与相邻两字切分
+_WORD_PATTERN = re.compile(r'[a-z0-9]+|[\u3400-\u9fff\uf900-\ufaff]+')
+_CJK_PATTERN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]')
+
+# 字段权重：命中名称比命中描述更相关
+FIELD_WEIGHTS = {
+    'name': 5.0,
+    'keywords': 3.0,
+    'description': 1.0
+}
+# 完整匹配词（而非前缀）的额外得分倍数
+EXACT_MATCH_BONUS = 1.5
+
+
+def _index_tokens(text: str) -> Set[str]:
+    """建索引用的词：英文单词、中文单字与两字组合"""
+    tokens: Set[str] = set()
+    for word in _WORD_PATTERN.findall(text.lower()):
+        if _CJK_PATTERN.match(word):
+            tokens.update(word)
+            tokens.update(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.add(word)
+    return tokens
+
+
+def _query_tokens(text: str) -> List[str]:
+    """查询用的词：中文按两字组合切分（单字查询保留单字），英文单词作为前缀"""
+    tokens: List[str] = []
+    for word in _WORD_PATTERN.findall(text.lower()):
+        if _CJK_PATTERN.match(word) and len(word) > 1:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return list(dict.fromkeys(tokens))
+
+
+def _field_texts(manifest: dict) -> Dict[str, str]:
+    keywords = manifest.get('keywords') or []
+    return {
+        'name': str(manifest.get('name') or ''),
+        'keywords': ' '.join(str(keyword) for keyword in keywords),
+        'description': str(manifest.get('description') or '')
+    }
+
+
+class PluginSearchIndex:
+    """
+    插件倒排索引（随插件索引一起构建，只读）
+
+    Args:
+        items: 已标准化的插件列表（含 id 与 manifest）
+    """
+
+    def __init__(self, items: List[dict]):
+        # 词 -> {插件位置: 得分}
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for position, plugin in enumerate(items):
+            for field, text in _field_texts(plugin.get('manifest') or {}).items():
+                weight = FIELD_WEIGHTS[field]
+                for token in _index_tokens(text):
+                    postings = self._postings[token]
+                    postings[position] = max(postings.get(position, 0.0), weight)
+        self._postings = dict(self._postings)
+        self._vocabulary = sorted(self._postings)
+
+    def _match_token(self, token: str) -> Dict[int, float]:
+        """单个查询词命中的插件及得分（英文词按前缀匹配）"""
+        scores: Dict[int, float] = {}
+        for position, weight in self._postings.get(token, {}).items():
+            scores[position] = weight * EXACT_MATCH_BONUS
+        if _CJK_PATTERN.match(token):
+            return scores
+        start = bisect.bisect_left(self._vocabulary, token)
+        for term in self._vocabulary[start:]:
+            if not term.startswith(token):
+                break
+            if term == token:
+                continue
+            for position, weight in self._postings[term].items():
+                if weight > scores.get(position, 0.0):
+                    scores[position] = weight
+        return scores
+
+    def search(self, query: str) -> List[Tuple[int, float]]:
+        """
+        检索插件
+
+        Returns:
+            [(插件位置, 相关度)]，按相关度降序；所有查询词都需命中，查询为空时返回空列表
+        """
+        tokens = _query_tokens(query)
+        if not tokens:
+            return []
+        result: Dict[int, float] = {}
+        for index, token in enumerate(tokens):
+            matches = self._match_token(token)
+            if index == 0:
+                result = matches
+            else:
+                result = {
+                    position: score + matches[position]
+                    for position, score in result.items()
+                    if position in matches
+                }
+            if not result:
+                return []
+        return sorted(result.items(), key=lambda item: (-item[1], item[0]))
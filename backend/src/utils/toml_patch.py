@@ -0,0 +1,213 @@
+"""
+TOML 增量补丁工具
+TOML Patch Helpers
+把 JSON-Patch 或点分键差异应用到 tomlkit 文档上，只修改变化的键并保留注释与格式
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+import tomlkit
+
+from utils.atomic_file import atomic_write_text
+from utils.config_cache import config_file_cache, ConfigCacheEntry
+
+PatchPath = List[Union[str, int]]
+
+_SUPPORTED_OPS = ('add', 'replace', 'remove')
+
+
+@dataclass
+class PatchOperation:
+    """单条补丁操作"""
+    op: str
+    path: PatchPath
+    value: Any = None
+
+
+def _parse_json_pointer(pointer: str) -> PatchPath:
+    """解析 JSON Pointer (/a/b/0)，数组下标保持为字符串，应用时再按容器类型转换"""
+    if not pointer.startswith('/'):
+        raise ValueError(f'无效的补丁路径: {pointer}')
+    return [part.replace('~1', '/').replace('~0', '~') for part in pointer[1:].split('/')]
+
+
+def parse_patch(payload: Union[List[Dict[str, Any]], Dict[str, Any]]) -> List[PatchOperation]:
+    """
+    解析补丁数据
+
+    支持两种格式:
+        - JSON-Patch: [{"op": "replace", "path": "/bot/nickname", "value": "麦麦"}]
+        - 点分键差异: {"bot.nickname": "麦麦"}（值为替换内容）
+
+    Args:
+        payload: 补丁数据
+
+    Returns:
+        补丁操作列表
+    """
+    operations: List[PatchOperation] = []
+
+    if isinstance(payload, dict):
+        for key, value in payload.items():
+            if not isinstance(key, str) or not key.strip():
+                raise ValueError(f'配置项键名无效: {key}')
+            path = key.split('.')
+            if any(not part for part in path):
+                raise ValueError(f'配置项键名无效: {key}')
+            operations.append(PatchOperation(op='replace', path=path, value=value))
+    elif isinstance(payload, list):
+        for index, item in enumerate(payload):
+            if not isinstance(item, dict):
+                raise ValueError(f'补丁操作格式错误: 第{index + 1}项')
+            op = item.get('op')
+            if op not in _SUPPORTED_OPS:
+                raise ValueError(f'不支持的补丁操作: {op}')
+            pointer = item.get('path')
+            if not isinstance(pointer, str):
+                raise ValueError(f'补丁操作缺少path: 第{index + 1}项')
+            if op != 'remove' and 'value' not in item:
+                raise ValueError(f'补丁操作缺少value: {pointer}')
+            operations.append(PatchOperation(op=op, path=_parse_json_pointer(pointer), value=item.get('value')))
+    else:
+        raise ValueError('补丁数据必须是对象或数组')
+
+    if not operations:
+        raise ValueError('补丁数据不能为空')
+    return operations
+
+
+def _resolve_index(container: Any, segment: Union[str, int], allow_end: bool) -> int:
+    """把路径片段转换为数组下标"""
+    if segment == '-' and allow_end:
+        return len(container)
+    try:
+        index = int(segment)
+    except (TypeError, ValueError):
+        raise ValueError(f'数组下标无效: {segment}')
+    upper = len(container) if allow_end else len(container) - 1
+    if index < 0 or index > upper:
+        raise ValueError(f'数组下标越界: {segment}')
+    return index
+
+
+def _is_sequence(container: Any) -> bool:
+    return isinstance(container, list)
+
+
+def apply_operation(root: Any, operation: PatchOperation) -> None:
+    """
+    在 tomlkit 文档（或普通 dict）上应用单条补丁操作
+
+    缺失的中间表会自动创建，便于以点分键新增配置项。
+    """
+    if not operation.path:
+        raise ValueError('补丁路径不能为空')
+
+    container = root
+    for segment in operation.path[:-1]:
+        if _is_sequence(container):
+            container = container[_resolve_index(container, segment, allow_end=False)]
+            continue
+        if segment not in container:
+            if operation.op == 'remove':
+                raise ValueError(f'配置项不存在: {"/".join(map(str, operation.path))}')
+            container[segment] = tomlkit.table() if isinstance(root, tomlkit.TOMLDocument) else {}
+        container = container[segment]
+
+    last = operation.path[-1]
+    if _is_sequence(container):
+        if operation.op == 'add':
+            container.insert(_resolve_index(container, last, allow_end=True), operation.value)
+        elif operation.op == 'replace':
+            container[_resolve_index(container, last, allow_end=False)] = operation.value
+        else:
+            del container[_resolve_index(container, last, allow_end=False)]
+        return
+
+    if operation.op == 'remove':
+        if last not in container:
+            raise ValueError(f'配置项不存在: {"/".join(map(str, operation.path))}')
+        del container[last]
+    else:
+        container[last] = operation.value
+
+
+def touched_sections(operations: List[PatchOperation]) -> Set[str]:
+    """补丁涉及的顶层配置节"""
+    return {str(operation.path[0]) for operation in operations}
+
+
+def _updated_data(entry: ConfigCacheEntry, sections: Iterable[str]) -> Dict[str, Any]:
+    """缓存数据的浅拷贝，只重新展开修改过的顶层配置节（未修改的节沿用缓存，不展开整个文档）"""
+    document = entry.document
+    data = dict(entry.data)
+    for section in sections:
+        if section in document:
+            data[section] = document[section].unwrap()
+        else:
+            data.pop(section, None)
+    return data
+
+
+def write_toml_document(
+    config_path: str,
+    entry: ConfigCacheEntry,
+    sections: Iterable[str],
+    encoding: str = 'utf-8',
+    data: Optional[Dict[str, Any]] = None
+) -> ConfigCacheEntry:
+    """
+    把已修改的缓存文档原子写回文件并更新缓存
+
+    Args:
+        config_path: 配置文件路径
+        entry: 文档所属的缓存项（其 document 已被修改）
+        sections: 被修改的顶层配置节
+        encoding: 文件编码
+        data: 已按 sections 更新的配置数据，为 None 时据文档计算
+
+    Returns:
+        更新后的缓存项
+    """
+    if data is None:
+        data = _updated_data(entry, sections)
+    text = tomlkit.dumps(entry.document)
+    atomic_write_text(config_path, text, encoding)
+    return config_file_cache.store(config_path, text, data, entry.document)
+
+
+def patch_toml_file(
+    config_path: str,
+    operations: List[PatchOperation],
+    encoding: str = 'utf-8',
+    validator: Optional[Any] = None
+) -> ConfigCacheEntry:
+    """
+    把补丁应用到缓存的 tomlkit 文档并原子写回文件
+
+    Args:
+        config_path: 配置文件路径
+        operations: 补丁操作
+        encoding: 文件编码
+        validator: 可选的校验函数，参数为修改后涉及的顶层配置节 dict，校验失败应抛出 ValueError
+
+    Returns:
+        更新后的缓存项
+    """
+    entry = config_file_cache.load(config_path, encoding)
+    sections = touched_sections(operations)
+
+    try:
+        for operation in operations:
+            apply_operation(entry.document, operation)
+
+        data = _updated_data(entry, sections)
+        if validator is not None:
+            validator({key: data[key] for key in sections if key in data})
+
+        return write_toml_document(config_path, entry, sections, encoding, data)
+    except Exception:
+        # 缓存中的文档可能已被部分修改，丢弃后下次重新解析
+        config_file_cache.invalidate(config_path)
+        raise
@@ -0,0 +1,83 @@
+"""
+后台删除目录
+Trash
+删除目录时先在同一父目录下重命名到回收目录（瞬间完成），再在线程池中后台删除；
+启动时清理上次未删完的回收目录与中断的克隆临时目录
+"""
+
+import asyncio
+import os
+import re
+import shutil
+import uuid
+from pathlib import Path
+from typing import Iterable, Set
+
+from core.logger import logger
+
+TRASH_DIR_NAME = '.hmml-trash'
+
+# 克隆/更新过程中的临时目录（见 EnhancedGitCloneService），进程中断时会残留
+_STALE_TEMP_PATTERN = re.compile(r'^\..+\.(clone-\d+|update)$')
+
+# 后台删除任务（保留引用，避免任务被垃圾回收）
+_pending: Set[asyncio.Task] = set()
+
+
+def _move_to_trash(path: Path) -> Path:
+    trash_dir = path.parent / TRASH_DIR_NAME
+    trash_dir.mkdir(exist_ok=True)
+    destination = trash_dir / f'{path.name}-{uuid.uuid4().hex[:8]}'
+    os.replace(path, destination)
+    return destination
+
+
+def _delete_in_background(path: Path) -> None:
+    task = asyncio.create_task(asyncio.to_thread(shutil.rmtree, path, True))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def remove_tree(path: Path) -> None:
+    """
+    删除目录（不存在时忽略）
+
+    重命名到回收目录后立即返回，实际删除在后台进行；
+    无法重命名时（如文件被占用）在线程池中直接删除。
+    """
+    if not await asyncio.to_thread(os.path.lexists, path):
+        return
+    try:
+        trashed = await asyncio.to_thread(_move_to_trash, path)
+    except OSError as e:
+        logger.debug(f'无法移动到回收目录，直接删除: {path} ({e})')
+        await asyncio.to_thread(shutil.rmtree, path)
+        return
+    _delete_in_background(trashed)
+
+
+def _collect_stale(parent: Path) -> list:
+    if not parent.is_dir():
+        return []
+    stale = []
+    for entry in parent.iterdir():
+        if entry.name == TRASH_DIR_NAME and entry.is_dir():
+            # 只删除回收目录中的内容，回收目录本身保留给后续删除使用
+            stale.extend(entry.iterdir())
+        elif _STALE_TEMP_PATTERN.match(entry.name):
+            stale.append(entry)
+    return stale
+
+
+async def clean_stale_trash(parents: Iterable[Path]) -> None:
+    """后台清理这些目录下残留的回收目录与克隆临时目录（启动时调用）"""
+    for parent in parents:
+        try:
+            stale = await asyncio.to_thread(_collect_stale, parent)
+        except OSError as e:
+            logger.warning(f'检查残留临时目录失败: {parent} ({e})')
+            continue
+        for path in stale:
+            _delete_in_background(path)
+        if stale:
+            logger.info(f'清理残留临时目录: {parent}（{len(stale)} 个）')
@@ -0,0 +1,52 @@
+"""
+版本号比较
+Version Compare
+宽松解析插件与麦麦的版本号（如 "v1.2.3"、"0.8.1-beta"、"1.0"），按数字段逐段比较
+"""
+
+import re
+from typing import Optional, Tuple
+
+_VERSION_PATTERN = re.compile(r'(\d+(?:\.\d+)*)(.*)')
+
+ParsedVersion = Tuple[Tuple[int, ...], int, str]
+
+
+def parse_version(text: Optional[str]) -> Optional[ParsedVersion]:
+    """
+    解析版本号
+
+    Returns:
+        (数字段, 是否正式版, 预发布标记)；无法解析时返回 None。
+        数字段去掉结尾的 0，使 "1.0" 与 "1.0.0" 相等；
+        带预发布标记（如 "-beta"）的版本低于同号正式版。
+    """
+    if not text:
+        return None
+    match = _VERSION_PATTERN.search(str(text).strip())
+    if not match:
+        return None
+    numbers = [int(part) for part in match.group(1).split('.')]
+    while len(numbers) > 1 and numbers[-1] == 0:
+        numbers.pop()
+    suffix = match.group(2).split('+', 1)[0].strip(' -._').lower()
+    return tuple(numbers), 0 if suffix else 1, suffix
+
+
+def compare_versions(left: Optional[str], right: Optional[str]) -> Optional[int]:
+    """
+    比较两个版本号
+
+    Returns:
+        -1 / 0 / 1 分别表示 left 低于 / 等于 / 高于 right；任一无法解析时返回 None
+    """
+    parsed_left = parse_version(left)
+    parsed_right = parse_version(right)
+    if parsed_left is None or parsed_right is None:
+        return None
+    return (parsed_left > parsed_right) - (parsed_left < parsed_right)
+
+
+def is_newer_version(candidate: Optional[str], current: Optional[str]) -> bool:
+    """candidate 是否比 current 新（无法比较时返回 False）"""
+    return compare_versions(candidate, current) == 1
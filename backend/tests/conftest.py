@@ -0,0 +1,9 @@
+"""
+后端测试公共配置
+在 backend 目录下运行: python -m pytest -q
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
@@ -0,0 +1,33 @@
+"""
+客户端地址识别测试（反向代理下的 X-Forwarded-For）
+"""
+
+import pytest
+from starlette.requests import Request
+
+import core.auth as auth
+from core.config import ServerConfig
+
+
+class FakeConfig:
+    def __init__(self, **server):
+        self.server = ServerConfig(**server)
+
+
+def make_request(forwarded_for=None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for is not None else []
+    return Request({"type": "http", "headers": headers, "client": ("10.0.0.1", 5000)})
+
+
+@pytest.mark.parametrize("server, forwarded_for, expected", [
+    ({}, "1.1.1.1", "10.0.0.1"),
+    ({"reverse_proxy_mode": True}, None, "10.0.0.1"),
+    ({"reverse_proxy_mode": True}, "spoofed, 1.1.1.1", "1.1.1.1"),
+    ({"reverse_proxy_mode": True, "trusted_proxy_hops": 2}, "spoofed, 1.1.1.1, 2.2.2.2", "1.1.1.1"),
+    ({"reverse_proxy_mode": True, "trusted_proxy_hops": 3}, "1.1.1.1, 2.2.2.2", "1.1.1.1"),
+    ({"reverse_proxy_mode": True, "trusted_proxy_hops": 0}, "1.1.1.1", "10.0.0.1"),
+    ({"reverse_proxy_mode": True}, " , ", "10.0.0.1"),
+])
+def test_get_client_host(monkeypatch, server, forwarded_for, expected):
+    monkeypatch.setattr(auth.config_manager, "get", lambda: FakeConfig(**server))
+    assert auth.get_client_host(make_request(forwarded_for)) == expected
@@ -0,0 +1,209 @@
+"""
+插件批量安装测试：依赖排序、版本兼容性检查与依赖失败的传递
+"""
+
+import asyncio
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+
+import services.plugin_market_service as market
+from models.database import ApiResponse
+from services.plugin_job_service import PluginJobError, PluginJobService
+from services.plugin_market_service import PluginMarketService, _manifest_dependencies, _order_by_dependencies
+
+
+class FakeIndex:
+    def __init__(self, items: List[dict]):
+        self.by_id = {item["id"]: item for item in items}
+
+
+def plugin(plugin_id: str, dependencies: Optional[list] = None, **manifest) -> dict:
+    manifest.setdefault("repository_url", f"https://github.com/example/{plugin_id}")
+    if dependencies is not None:
+        manifest["dependencies"] = dependencies
+    return {"id": plugin_id, "manifest": manifest}
+
+
+# ---------------- 依赖解析与排序 ----------------
+def test_manifest_dependencies_accepts_ids_and_objects():
+    manifest = {"dependencies": ["a", {"id": "b"}, {"plugin_id": "c"}, " a ", "", 3, {"name": "d"}]}
+    assert _manifest_dependencies(manifest) == ["a", "b", "c"]
+    assert _manifest_dependencies({}) == []
+    assert _manifest_dependencies({"dependencies": "a"}) == []
+
+
+def test_order_puts_dependencies_first_and_keeps_request_order():
+    index = FakeIndex([plugin("a", ["b"]), plugin("b", ["c"]), plugin("c"), plugin("d")])
+
+    order, dependencies, cyclic = _order_by_dependencies(["d", "a"], index)
+
+    assert order == ["d", "c", "b", "a"]
+    assert dependencies["a"] == ["b"]
+    assert cyclic == set()
+
+
+def test_order_detects_cycles():
+    index = FakeIndex([plugin("a", ["b"]), plugin("b", ["a"]), plugin("c", ["a"]), plugin("d")])
+
+    order, _, cyclic = _order_by_dependencies(["c", "d"], index)
+
+    assert cyclic == {"a", "b"}
+    assert set(order) == {"a", "b", "c", "d"}
+    assert order.index("c") > order.index("a")
+
+
+def test_order_skips_dependencies_missing_from_index():
+    index = FakeIndex([plugin("a", ["external"])])
+
+    order, dependencies, _ = _order_by_dependencies(["a"], index)
+
+    assert order == ["a"]
+    assert dependencies["a"] == ["external"]
+
+
+# ---------------- 版本兼容性 ----------------
+@pytest.mark.parametrize("host_application, mai_version, compatible", [
+    ({"min_version": "0.8.0"}, "0.9.1", True),
+    ({"min_version": "0.10.0"}, "0.9.1", False),
+    ({"min_version": "0.8.0", "max_version": "0.9.0"}, "0.9.1", False),
+    ({"min_version": "0.8.0", "max_version": "0.9.1"}, "0.9.1", True),
+    ({"min_version": "0.10.0"}, None, True),
+    ({}, "0.9.1", True),
+])
+def test_host_compatibility(host_application, mai_version, compatible):
+    result = PluginMarketService._check_host_compatibility({"host_application": host_application}, mai_version)
+    assert (result is None) == compatible
+
+
+# ---------------- 批量安装 ----------------
+@pytest.fixture
+def batch_env(tmp_path, monkeypatch):
+    """把插件索引、麦麦目录与任务队列替换为测试实现，返回 (设置索引, 安装记录, 失败的插件)"""
+    maimai_root = tmp_path / "maibot"
+    (maimai_root / "plugins").mkdir(parents=True)
+    job_service = PluginJobService(state_path=tmp_path / "jobs.json")
+    state = {"index": FakeIndex([])}
+    started: List[str] = []
+    failing = set()
+
+    async def install(job, report):
+        started.append(job.plugin_id)
+        await asyncio.sleep(0.01)
+        if job.plugin_id in failing:
+            raise PluginJobError("安装失败")
+        Path(job.params["plugin_dir"]).mkdir()
+        return {}
+
+    job_service.register_handler("install", install)
+
+    class FakeIndexService:
+        async def get_index(self):
+            return state["index"]
+
+    async def onekey_environment():
+        return ApiResponse(status=200, message="", data={"isOneKeyEnv": False}, time=0)
+
+    async def get_maimai_root():
+        return str(maimai_root)
+
+    monkeypatch.setattr(market, "get_plugin_index_service", lambda: FakeIndexService())
+    monkeypatch.setattr(market, "get_plugin_job_service", lambda: job_service)
+    monkeypatch.setattr(market, "read_mai_version", lambda root: "0.9.1")
+    monkeypatch.setattr(PluginMarketService, "_check_onekey_environment", classmethod(lambda cls: onekey_environment()))
+    monkeypatch.setattr(PluginMarketService, "_get_maimai_root", classmethod(lambda cls: get_maimai_root()))
+
+    def set_index(*items: dict) -> None:
+        state["index"] = FakeIndex(list(items))
+
+    return set_index, started, failing, maimai_root
+
+
+def run_batch(plugin_ids: List[str], wait: bool = True) -> Dict[str, dict]:
+    async def run():
+        response = await PluginMarketService.batch_install_plugins(plugin_ids, wait)
+        assert response.status == 200, response.message
+        return {item["plugin_id"]: item for item in response.data["items"]}
+    return asyncio.run(run())
+
+
+def test_batch_installs_dependencies_before_dependents(batch_env):
+    set_index, started, _, _ = batch_env
+    set_index(plugin("a", ["b"]), plugin("b"), plugin("c"))
+
+    items = run_batch(["a", "c"])
+
+    assert {plugin_id: item["status"] for plugin_id, item in items.items()} == {
+        "a": "succeeded", "b": "succeeded", "c": "succeeded"
+    }
+    assert items["b"]["dependency"] is True
+    assert started.index("b") < started.index("a")
+
+
+def test_batch_without_wait_reports_waiting_dependents(batch_env):
+    set_index, _, _, _ = batch_env
+    set_index(plugin("a", ["b"]), plugin("b"))
+
+    items = run_batch(["a"], wait=False)
+
+    assert items["b"]["status"] == "queued"
+    assert items["a"]["status"] == "waiting"
+
+
+def test_batch_dependency_missing_or_installed(batch_env):
+    set_index, started, _, maimai_root = batch_env
+    (maimai_root / "plugins" / "present").mkdir()
+    set_index(plugin("a", ["present"]), plugin("b", ["absent"]))
+
+    items = run_batch(["a", "b"])
+
+    assert items["a"]["status"] == "succeeded"
+    assert items["b"]["status"] == "failed"
+    assert "absent" in items["b"]["message"]
+    assert started == ["a"]
+
+
+def test_batch_installed_dependency_in_index_is_skipped(batch_env):
+    set_index, started, _, maimai_root = batch_env
+    (maimai_root / "plugins" / "b").mkdir()
+    set_index(plugin("a", ["b"]), plugin("b"))
+
+    items = run_batch(["a"])
+
+    assert items["b"]["status"] == "skipped"
+    assert items["a"]["status"] == "succeeded"
+    assert started == ["a"]
+
+
+def test_batch_cycle_and_incompatible_plugins_are_not_installed(batch_env):
+    set_index, started, _, _ = batch_env
+    set_index(
+        plugin("a", ["b"]), plugin("b", ["a"]),
+        plugin("new", host_application={"min_version": "1.0.0"}),
+        plugin("old", host_application={"min_version": "0.1.0", "max_version": "0.5.0"}),
+        plugin("needs-new", ["new"])
+    )
+
+    items = run_batch(["a", "old", "needs-new"])
+
+    assert items["a"]["status"] == items["b"]["status"] == "failed"
+    assert items["new"]["status"] == "incompatible"
+    assert items["old"]["status"] == "incompatible"
+    assert items["needs-new"]["status"] == "failed"
+    assert started == []
+
+
+def test_batch_dependency_failure_cascades(batch_env):
+    set_index, started, failing, maimai_root = batch_env
+    failing.add("base")
+    set_index(plugin("top", ["middle"]), plugin("middle", ["base"]), plugin("base"), plugin("other"))
+
+    items = run_batch(["top", "other"])
+
+    assert items["base"]["status"] == "failed"
+    assert items["middle"]["status"] == "failed"
+    assert items["top"]["status"] == "failed"
+    assert items["other"]["status"] == "succeeded"
+    assert sorted(started) == ["base", "other"]
+    assert not (maimai_root / "plugins" / "top").exists()
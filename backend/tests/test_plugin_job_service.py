@@ -0,0 +1,31 @@
+"""
+插件任务队列测试
+"""
+
+import asyncio
+
+from services.plugin_job_service import PluginJobService
+
+
+def test_job_submitted_before_start_runs_once(tmp_path):
+    job_service = PluginJobService(state_path=tmp_path / "jobs.json")
+    runs = []
+
+    async def install(job, report):
+        runs.append(job.id)
+        await asyncio.sleep(0.01)
+        return {}
+
+    job_service.register_handler("install", install)
+
+    async def run():
+        job = await job_service.submit("install", "a", {})
+        await job_service.wait(job, 5)
+        await asyncio.sleep(0.05)
+        await job_service.stop()
+        return job
+
+    job = asyncio.run(run())
+
+    assert job.status == "succeeded"
+    assert runs == [job.id]
@@ -0,0 +1,67 @@
+"""
+插件搜索索引测试
+"""
+
+from utils.plugin_search_index import PluginSearchIndex, _index_tokens, _query_tokens
+
+
+def make_index():
+    items = [
+        {"id": "weather", "manifest": {"name": "Weather Report", "keywords": ["天气", "forecast"],
+                                       "description": "查询城市天气预报"}},
+        {"id": "music", "manifest": {"name": "点歌插件", "keywords": ["music"],
+                                     "description": "在群里点歌，支持网易云"}},
+        {"id": "webhook", "manifest": {"name": "Webhook", "keywords": [],
+                                       "description": "Forward weather alerts to a webhook"}},
+        {"id": "empty", "manifest": {}},
+    ]
+    return items, PluginSearchIndex(items)
+
+
+def ids(items, results):
+    return [items[position]["id"] for position, _ in results]
+
+
+def test_tokens():
+    assert _index_tokens("Hello 天气预报") == {"hello", "天", "气", "预", "报", "天气", "气预", "预报"}
+    assert _query_tokens("天气预报 Hello hello") == ["天气", "气预", "预报", "hello"]
+    assert _query_tokens("天") == ["天"]
+
+
+def test_name_matches_rank_above_description():
+    items, index = make_index()
+    assert ids(items, index.search("weather")) == ["weather", "webhook"]
+
+
+def test_english_words_match_as_prefix():
+    items, index = make_index()
+    assert ids(items, index.search("for")) == ["weather", "webhook"]
+    assert ids(items, index.search("we")) == ["weather", "webhook"]
+
+
+def test_exact_match_scores_above_prefix_match():
+    items, index = make_index()
+    exact = dict(index.search("webhook"))
+    prefix = dict(index.search("webh"))
+    position = [item["id"] for item in items].index("webhook")
+    assert exact[position] > prefix[position]
+
+
+def test_chinese_queries():
+    items, index = make_index()
+    assert ids(items, index.search("天气")) == ["weather"]
+    assert ids(items, index.search("点歌")) == ["music"]
+    assert ids(items, index.search("歌")) == ["music"]
+
+
+def test_all_query_terms_must_match():
+    items, index = make_index()
+    assert ids(items, index.search("weather alerts")) == ["webhook"]
+    assert index.search("weather 点歌") == []
+
+
+def test_empty_or_unknown_queries():
+    _, index = make_index()
+    assert index.search("") == []
+    assert index.search("!!!") == []
+    assert index.search("nothing") == []
@@ -0,0 +1,91 @@
+"""
+限流工具测试
+"""
+
+import pytest
+
+import core.rate_limiter as rate_limiter
+from core.rate_limiter import ConcurrencyLimiter, TokenBucketLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", fake.monotonic)
+    return fake
+
+
+def test_bucket_allows_burst_then_reports_retry_after(clock):
+    limiter = TokenBucketLimiter(rate=2, capacity=3)
+
+    assert [limiter.try_acquire("a")[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = limiter.try_acquire("a")
+
+    assert not allowed
+    assert retry_after == pytest.approx(0.5)
+
+
+def test_bucket_refills_over_time_up_to_capacity(clock):
+    limiter = TokenBucketLimiter(rate=2, capacity=3)
+    for _ in range(3):
+        limiter.try_acquire("a")
+
+    clock.now += 0.5
+    assert limiter.try_acquire("a") == (True, 0.0)
+    assert not limiter.try_acquire("a")[0]
+
+    clock.now += 100
+    assert [limiter.try_acquire("a")[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_buckets_are_per_key(clock):
+    limiter = TokenBucketLimiter(rate=1, capacity=1)
+
+    assert limiter.try_acquire("a")[0]
+    assert not limiter.try_acquire("a")[0]
+    assert limiter.try_acquire("b")[0]
+
+
+def test_bucket_keeps_only_recent_keys(clock):
+    limiter = TokenBucketLimiter(rate=1, capacity=1, max_keys=2)
+    limiter.try_acquire("a")
+    limiter.try_acquire("b")
+    limiter.try_acquire("c")
+
+    # 最久未使用的 a 被移除，重新获得满桶
+    assert limiter.try_acquire("a")[0]
+    assert not limiter.try_acquire("c")[0]
+
+
+def test_bucket_reset_and_zero_rate(clock):
+    limiter = TokenBucketLimiter(rate=0, capacity=1)
+    limiter.try_acquire("a")
+
+    allowed, retry_after = limiter.try_acquire("a")
+    assert not allowed and retry_after == float("inf")
+
+    limiter.reset("a")
+    assert limiter.try_acquire("a")[0]
+
+
+def test_concurrency_limiter():
+    limiter = ConcurrencyLimiter(2)
+
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+    assert limiter.active == 2
+
+    limiter.release()
+    assert limiter.try_acquire()
+
+    for _ in range(5):
+        limiter.release()
+    assert limiter.active == 0
@@ -0,0 +1,133 @@
+"""
+TOML 增量补丁测试
+"""
+
+import pytest
+import tomlkit
+
+from utils.config_cache import config_file_cache
+from utils.toml_patch import (
+    PatchOperation,
+    apply_operation,
+    parse_patch,
+    patch_toml_file,
+    touched_sections,
+)
+
+SAMPLE = '''# 顶部注释
+[bot]
+nickname = "麦麦" # 昵称
+qq = 1
+
+[chat]
+groups = [1, 2] # 群列表
+'''
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "bot_config.toml"
+    path.write_text(SAMPLE, encoding="utf-8")
+    yield str(path)
+    config_file_cache.invalidate(str(path))
+
+
+# ---------------- 解析 ----------------
+def test_parse_dotted_diff():
+    operations = parse_patch({"bot.nickname": "小麦", "chat.groups": [3]})
+    assert [(op.op, op.path, op.value) for op in operations] == [
+        ("replace", ["bot", "nickname"], "小麦"),
+        ("replace", ["chat", "groups"], [3]),
+    ]
+
+
+def test_parse_json_patch_unescapes_pointer():
+    operations = parse_patch([
+        {"op": "add", "path": "/a~1b/c~0d", "value": 1},
+        {"op": "remove", "path": "/bot/qq"},
+    ])
+    assert operations[0].path == ["a/b", "c~d"]
+    assert operations[1] == PatchOperation(op="remove", path=["bot", "qq"])
+
+
+@pytest.mark.parametrize("payload", [
+    {},
+    [],
+    "bot.nickname",
+    {"bot..nickname": 1},
+    [{"op": "move", "path": "/a"}],
+    [{"op": "replace", "path": "a", "value": 1}],
+    [{"op": "replace", "path": "/a"}],
+])
+def test_parse_rejects_invalid_patches(payload):
+    with pytest.raises(ValueError):
+        parse_patch(payload)
+
+
+# ---------------- 应用 ----------------
+def test_apply_operations_on_arrays_and_missing_tables():
+    document = tomlkit.parse(SAMPLE)
+    for operation in parse_patch([
+        {"op": "add", "path": "/chat/groups/-", "value": 3},
+        {"op": "add", "path": "/chat/groups/0", "value": 0},
+        {"op": "replace", "path": "/chat/groups/1", "value": 10},
+        {"op": "remove", "path": "/chat/groups/2"},
+        {"op": "add", "path": "/new/section/key", "value": True},
+    ]):
+        apply_operation(document, operation)
+
+    data = document.unwrap()
+    assert data["chat"]["groups"] == [0, 10, 3]
+    assert data["new"] == {"section": {"key": True}}
+
+
+@pytest.mark.parametrize("patch", [
+    [{"op": "remove", "path": "/bot/missing"}],
+    [{"op": "remove", "path": "/missing/key"}],
+    [{"op": "replace", "path": "/chat/groups/5", "value": 1}],
+    [{"op": "replace", "path": "/chat/groups/x", "value": 1}],
+])
+def test_apply_rejects_missing_targets(patch):
+    document = tomlkit.parse(SAMPLE)
+    with pytest.raises(ValueError):
+        apply_operation(document, parse_patch(patch)[0])
+
+
+def test_touched_sections():
+    assert touched_sections(parse_patch({"bot.qq": 2, "bot.nickname": "a", "chat.groups": []})) == {"bot", "chat"}
+
+
+# ---------------- 写回文件 ----------------
+def test_patch_file_keeps_comments_and_updates_cache(config_path):
+    entry = patch_toml_file(config_path, parse_patch({"bot.nickname": "小麦"}))
+
+    text = open(config_path, encoding="utf-8").read()
+    assert text == SAMPLE.replace('"麦麦"', '"小麦"')
+    assert entry.data["bot"]["nickname"] == "小麦"
+    assert entry.data["chat"] == {"groups": [1, 2]}
+    assert config_file_cache.load(config_path) is entry
+
+
+def test_patch_file_validates_only_touched_sections(config_path):
+    seen = []
+    patch_toml_file(config_path, parse_patch({"bot.qq": 2, "extra.flag": True}), validator=seen.append)
+    assert seen == [{"bot": {"nickname": "麦麦", "qq": 2}, "extra": {"flag": True}}]
+
+
+def test_patch_file_rejected_by_validator_leaves_file_unchanged(config_path):
+    config_file_cache.load(config_path)
+
+    def reject(sections):
+        raise ValueError("bad")
+
+    with pytest.raises(ValueError):
+        patch_toml_file(config_path, parse_patch({"bot.qq": "x"}), validator=reject)
+
+    assert open(config_path, encoding="utf-8").read() == SAMPLE
+    assert config_file_cache.load(config_path).data["bot"]["qq"] == 1
+
+
+def test_patch_file_remove_section(config_path):
+    entry = patch_toml_file(config_path, parse_patch([{"op": "remove", "path": "/chat"}]))
+    assert "chat" not in entry.data
+    assert "[chat]" not in open(config_path, encoding="utf-8").read()
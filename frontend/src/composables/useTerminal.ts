@@ -2,6 +2,7 @@ import { ref, onUnmounted, nextTick } from 'vue';
 import { Terminal } from '@xterm/xterm';
 import { FitAddon } from '@xterm/addon-fit';
 import { io, Socket } from 'socket.io-client';
+import { checkSessionResponse, sessionHeaders } from '@/utils/session';
 import '@xterm/xterm/css/xterm.css';
 
 export interface TerminalConfig {
@@ -233,7 +234,9 @@ export const useTerminal = () => {
   const getMaimaiRoot = async (): Promise<string> => {
     try {
       const config = currentConfig.value;
-      const response = await fetch(`http://${config.host}:${config.port}/api/pathCache/getMainRoot`);
+      const response = checkSessionResponse(await fetch(`http://${config.host}:${config.port}/api/pathCache/getMainRoot`, {
+        headers: sessionHeaders()
+      }));
       const data = await response.json();
       
       if (data.status === 200 && data.data && data.data.mainRoot) {
@@ -1,5 +1,6 @@
 import axios from 'axios'
 import type { ApiResponse, ApiError } from '@/types/api'
+import { handleSessionExpired, sessionHeaders } from '@/utils/session'
 
 // 动态解析 API 基础地址
 function resolveBaseURL(): string {
@@ -28,7 +29,11 @@ const api = axios.create({
 })
 
 api.interceptors.request.use(
-  (config) => config,
+  (config) => {
+    // 携带会话凭据（跨域请求不会附带 Cookie）
+    Object.assign(config.headers, sessionHeaders())
+    return config
+  },
   (error) => Promise.reject(error)
 )
 
@@ -47,6 +52,10 @@ api.interceptors.response.use(
     }
   },
   (error) => {
+    if (error.response?.status === 401) {
+      // 会话过期或后端重启后会话失效，要求重新验证 Token
+      handleSessionExpired()
+    }
     const apiError: ApiError = {
       code: error.response?.status?.toString() || 'NETWORK_ERROR',
       message: error.response?.data?.message || error.message || '网络错误',
@@ -1,6 +1,7 @@
 // 麦麦配置API工具函数
 
 import type { MaimaiConfig, ConfigApiResponse } from '@/types/maimaiConfig'
+import { checkSessionResponse, sessionHeaders } from '@/utils/session'
 
 const API_BASE_URL = 'http://localhost:7999/api/config'
 
@@ -44,7 +45,9 @@ export class MaimaiConfigAPI {
    */
   static async getMainConfig(): Promise<ConfigApiResponse<MaimaiConfig>> {
     try {
-      const response = await fetch(`${API_BASE_URL}/main/get`)
+      const response = checkSessionResponse(await fetch(`${API_BASE_URL}/main/get`, {
+        headers: sessionHeaders()
+      }))
       return await this.handleResponse<MaimaiConfig>(response)
     } catch (error) {
       throw new Error(`获取配置失败: ${error instanceof Error ? error.message : '未知错误'}`)
@@ -57,13 +60,14 @@ export class MaimaiConfigAPI {
    */
   static async updateMainConfig(config: Partial<MaimaiConfig>): Promise<ConfigApiResponse> {
     try {
-      const response = await fetch(`${API_BASE_URL}/main/update`, {
+      const response = checkSessionResponse(await fetch(`${API_BASE_URL}/main/update`, {
         method: 'POST',
         headers: {
-          'Content-Type': 'application/json'
+          'Content-Type': 'application/json',
+          ...sessionHeaders()
         },
         body: JSON.stringify(config)
-      })
+      }))
       return await this.handleResponse(response)
     } catch (error) {
       throw new Error(`保存配置失败: ${error instanceof Error ? error.message : '未知错误'}`)
@@ -0,0 +1,43 @@
+// 会话凭据管理
+// verifyToken 成功后后端签发会话凭据，之后的请求通过 x-hmml-session 请求头携带；
+// 使用 sessionStorage 保存，每次启动应用时都需要重新验证
+
+const SESSION_STORAGE_KEY = 'hmml_session'
+const SESSION_HEADER_NAME = 'x-hmml-session'
+// 会话失效（后端返回 401）时在 window 上派发的事件
+export const SESSION_EXPIRED_EVENT = 'hmml:session-expired'
+
+export function getSession(): string | null {
+  return sessionStorage.getItem(SESSION_STORAGE_KEY)
+}
+
+export function setSession(session: string): void {
+  sessionStorage.setItem(SESSION_STORAGE_KEY, session)
+}
+
+export function clearSession(): void {
+  sessionStorage.removeItem(SESSION_STORAGE_KEY)
+  // 清除旧版本保存的验证标记
+  sessionStorage.removeItem('access_token_valid')
+  localStorage.removeItem('access_token_valid')
+}
+
+// 供 fetch 等不经过 api 实例的请求使用
+export function sessionHeaders(): Record<string, string> {
+  const session = getSession()
+  return session ? { [SESSION_HEADER_NAME]: session } : {}
+}
+
+// 会话失效：清除本地凭据并通知界面重新验证 Token
+export function handleSessionExpired(): void {
+  clearSession()
+  window.dispatchEvent(new Event(SESSION_EXPIRED_EVENT))
+}
+
+// 处理 fetch 响应的 401
+export function checkSessionResponse(response: Response): Response {
+  if (response.status === 401) {
+    handleSessionExpired()
+  }
+  return response
+}